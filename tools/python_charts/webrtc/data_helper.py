@@ -21,7 +21,8 @@ class DataHelper(object):
     Args:
       data_list: List of one or more data lists in the format that the
         Google Visualization Python API expects (list of dictionaries, one
-        per row of data). See the gviz_api.DataTable documentation for more
+        per row of data), or webrtc.frame_data.FrameData objects, which are
+        read by column. See the gviz_api.DataTable documentation for more
         info.
       table_description: dictionary describing the data types of all
         columns in the data lists, as defined in the gviz_api.DataTable
@@ -88,8 +89,8 @@ class DataHelper(object):
     result_data_table = []
     # We're going to have one dictionary per row.
     # Create that and copy frame_number values from the first data set
-    for source_row in self.data_list[0]:
-      row_dict = {'frame_number': source_row['frame_number']}
+    for frame_number in self._GetColumn(0, 'frame_number'):
+      row_dict = {'frame_number': frame_number}
       result_data_table.append(row_dict)
 
     # Pick target field data points from the all data tables
@@ -97,18 +98,25 @@ class DataHelper(object):
       end_frame = self.number_of_frames
 
     for dataset_index in range(self.number_of_datasets):
+      column = self._GetColumn(dataset_index, field_name)
       for row_number in range(start_frame, end_frame):
         column_name = '%s_%s' % (field_name, dataset_index)
         # Stop if any of the data sets are missing the frame
         try:
-          result_data_table[row_number][column_name] = \
-          self.data_list[dataset_index][row_number][field_name]
+          result_data_table[row_number][column_name] = column[row_number]
         except IndexError:
           self.messages.append("Couldn't find frame data for row %d "
           "for %s" % (row_number, self.names_list[dataset_index]))
           break
     return result_table_description, result_data_table
 
+  def _GetColumn(self, dataset_index, field_name):
+    """ Returns the sequence of the values of a field in a data set. """
+    data = self.data_list[dataset_index]
+    if hasattr(data, 'GetColumn'):
+      return data.GetColumn(field_name)
+    return [row[field_name] for row in data]
+
   def GetOrdering(self, table_description):  # pylint: disable=R0201
     """ Creates a list of column names, ordered alphabetically except for the
       frame_number column which always will be the first column.
@@ -7,8 +7,12 @@
 #  in the file PATENTS.  All contributing project authors may
 #  be found in the AUTHORS file in the root of the source tree.
 
+import os
+import shutil
+import tempfile
 import unittest
 import webrtc.data_helper
+import webrtc.frame_data
 
 class Test(unittest.TestCase):
 
@@ -82,6 +86,28 @@ class Test(unittest.TestCase):
     self.assertEquals(30.55, row['psnr_0'])
     self.assertEquals(30.66, row['psnr_1'])
 
+  def testCreateDataFromFrameData(self):
+    temp_dir = tempfile.mkdtemp()
+    try:
+      all_data = []
+      for index, frame_data in enumerate(self.all_data):
+        filename = os.path.join(temp_dir, '%d.frames' % index)
+        webrtc.frame_data.WriteFrameData(filename, self.configurations[index],
+                                         self.type_description, frame_data)
+        all_data.append(webrtc.frame_data.FrameData(filename))
+
+      messages = []
+      helper = webrtc.data_helper.DataHelper(all_data, self.type_description,
+                                             self.names, messages)
+      expected_helper = webrtc.data_helper.DataHelper(
+          self.all_data, self.type_description, self.names, [])
+      for field_name in ['ssim', 'psnr']:
+        self.assertEqual(expected_helper.CreateData(field_name),
+                         helper.CreateData(field_name))
+      self.assertEqual(0, len(messages))
+    finally:
+      shutil.rmtree(temp_dir)
+
   def testGetOrdering(self):
     """ Tests that the ordering help method returns a list with frame_number
        first and the rest sorted alphabetically """
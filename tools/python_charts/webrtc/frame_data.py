@@ -0,0 +1,219 @@
+#!/usr/bin/env python
+#  Copyright (c) 2016 The WebRTC project authors. All Rights Reserved.
+#
+#  Use of this source code is governed by a BSD-style license
+#  that can be found in the LICENSE file in the root of the source
+#  tree. An additional intellectual property rights grant can be found
+#  in the file PATENTS.  All contributing project authors may
+#  be found in the AUTHORS file in the root of the source tree.
+
+"""Columnar binary format for the frame data of video_quality_measurement.
+
+A frame data file starts with a JSON header on a single line, holding the test
+configuration, the frame data types, the number of frames and the layout of
+the columns. It is followed by one little-endian typed array per metric,
+starting at the first multiple of 8 bytes after the header.
+
+Usage: frame_data.py <data file in Python format> <frame data file>
+converts the data files written by video_quality_measurement with the --python
+flag.
+"""
+
+import json
+import struct
+import sys
+
+try:
+  import mmap
+except ImportError:
+  mmap = None
+
+FORMAT_NAME = 'webrtc_frame_data'
+FORMAT_VERSION = 1
+_ALIGNMENT = 8
+
+
+class Column(object):
+  """ Read-only sequence of the values of a metric, decoded on access. """
+
+  def __init__(self, buf, offset, type_code, length, values=None,
+               is_boolean=False):
+    """ Initializes the column over a buffer.
+
+    Args:
+      buf: Buffer holding the column, e.g. a memory-mapped file.
+      offset: Offset of the first value of the column in buf.
+      type_code: struct format character of the values.
+      length: Number of values.
+      values: List of the distinct values of a string column. The column then
+        holds indexes into this list.
+      is_boolean: Whether the values are decoded as booleans.
+    """
+    self._buf = buf
+    self._offset = offset
+    self._format = '<' + type_code
+    self._size = struct.calcsize(self._format)
+    self._length = length
+    self._values = values
+    self._is_boolean = is_boolean
+
+  def __len__(self):
+    return self._length
+
+  def __getitem__(self, index):
+    if isinstance(index, slice):
+      return [self[i] for i in range(*index.indices(self._length))]
+    if index < 0:
+      index += self._length
+    if not 0 <= index < self._length:
+      raise IndexError('Column index out of range: %d' % index)
+    value = struct.unpack_from(self._format, self._buf,
+                               self._offset + index * self._size)[0]
+    if self._values is not None:
+      return self._values[value]
+    if self._is_boolean:
+      return bool(value)
+    return value
+
+
+class FrameData(object):
+  """ The frame data of a test run, read from a frame data file.
+
+  The file is memory-mapped and the values are only decoded when accessed, by
+  column with GetColumn(). Indexing a FrameData returns the dictionary of a
+  row, like the frame_data list of the data files in Python format.
+  """
+
+  def __init__(self, filename):
+    f = open(filename, 'rb')
+    header_line = f.readline()
+    self._buf = None
+    # Memory mapping isn't available everywhere, e.g. on App Engine.
+    if mmap is not None:
+      try:
+        self._buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+      except (EnvironmentError, ValueError):
+        pass
+    if self._buf is None:
+      f.seek(0)
+      self._buf = f.read()
+    f.close()
+
+    header = json.loads(header_line)
+    if header.get('format') != FORMAT_NAME:
+      raise ValueError('Not a frame data file: %s' % filename)
+    if header.get('version') != FORMAT_VERSION:
+      raise ValueError('Unsupported frame data version %s in %s' %
+                       (header.get('version'), filename))
+    data_start = _Align(len(header_line))
+
+    self.test_configuration = header['test_configuration']
+    self.frame_data_types = dict(
+        (name, tuple(description))
+        for name, description in header['frame_data_types'].items())
+    self.number_of_frames = header['number_of_frames']
+    self.columns = {}
+    for name, layout in header['columns'].items():
+      self.columns[name] = Column(
+          self._buf, data_start + layout['offset'], layout['type'],
+          self.number_of_frames, values=layout.get('values'),
+          is_boolean=self.frame_data_types[name][0] == 'boolean')
+
+  def GetColumn(self, field_name):
+    return self.columns[field_name]
+
+  def ConvertColumn(self, field_name, function):
+    """ Replaces the values of a column with a list of converted values. """
+    self.columns[field_name] = [function(value)
+                                for value in self.columns[field_name]]
+
+  def __len__(self):
+    return self.number_of_frames
+
+  def __getitem__(self, index):
+    if not -self.number_of_frames <= index < self.number_of_frames:
+      raise IndexError('Frame index out of range: %d' % index)
+    return dict((name, column[index])
+                for name, column in self.columns.items())
+
+
+def _Align(offset):
+  return (offset + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+
+def _GetTypeCode(values):
+  """ Returns the struct format character storing all the values. """
+  if all(isinstance(value, bool) for value in values):
+    return 'B'
+  if all(isinstance(value, (int, long)) and not isinstance(value, bool)
+         for value in values):
+    return 'q'
+  return 'd'
+
+
+def WriteFrameData(filename, test_configuration, frame_data_types,
+                   frame_data):
+  """ Writes a frame data file.
+
+  Args:
+    filename: Name of the frame data file to write.
+    test_configuration: List of dictionaries with the 'name' and the 'value'
+      of every configuration.
+    frame_data_types: Dictionary of the data type and the title of every
+      metric, as defined in the gviz_api.DataTable documentation.
+    frame_data: List of dictionaries mapping every metric to its value, one
+      per frame.
+  """
+  columns = {}
+  arrays = []
+  offset = 0
+  for name in sorted(frame_data_types):
+    values = [row[name] for row in frame_data]
+    layout = {}
+    if frame_data_types[name][0] == 'string':
+      layout['values'] = sorted(set(values))
+      indexes = dict((value, index)
+                     for index, value in enumerate(layout['values']))
+      values = [indexes[value] for value in values]
+      layout['type'] = 'I'
+    else:
+      layout['type'] = _GetTypeCode(values)
+    offset = _Align(offset)
+    layout['offset'] = offset
+    columns[name] = layout
+    array = struct.pack('<%d%s' % (len(values), layout['type']), *values)
+    arrays.append((offset, array))
+    offset += len(array)
+
+  header = {
+    'format': FORMAT_NAME,
+    'version': FORMAT_VERSION,
+    'test_configuration': test_configuration,
+    'frame_data_types': frame_data_types,
+    'number_of_frames': len(frame_data),
+    'columns': columns,
+  }
+  header_line = json.dumps(header, sort_keys=True) + '\n'
+  data_start = _Align(len(header_line))
+
+  f = open(filename, 'wb')
+  f.write(header_line)
+  for array_offset, array in arrays:
+    f.write('\0' * (data_start + array_offset - f.tell()))
+    f.write(array)
+  f.close()
+
+
+def ConvertPythonDataFile(input_filename, output_filename):
+  """ Converts a data file in Python format into a frame data file. """
+  read_vars = {}  # empty dictionary to load the data into.
+  execfile(input_filename, read_vars, read_vars)
+  WriteFrameData(output_filename, read_vars['test_configuration'],
+                 read_vars['frame_data_types'], read_vars['frame_data'])
+
+
+if __name__ == '__main__':
+  if len(sys.argv) != 3:
+    print __doc__
+    sys.exit(1)
+  ConvertPythonDataFile(sys.argv[1], sys.argv[2])
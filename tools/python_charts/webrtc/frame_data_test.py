@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+#  Copyright (c) 2016 The WebRTC project authors. All Rights Reserved.
+#
+#  Use of this source code is governed by a BSD-style license
+#  that can be found in the LICENSE file in the root of the source
+#  tree. An additional intellectual property rights grant can be found
+#  in the file PATENTS.  All contributing project authors may
+#  be found in the AUTHORS file in the root of the source tree.
+
+import os
+import shutil
+import tempfile
+import unittest
+import webrtc.frame_data
+
+class Test(unittest.TestCase):
+
+  def setUp(self):
+    self.temp_dir = tempfile.mkdtemp()
+    self.filename = os.path.join(self.temp_dir, 'test.frames')
+    self.configuration = [{'name': 'name', 'value': 'Test 0'},
+                          {'name': 'bit_rate_in_kbps', 'value': '500'}]
+    self.type_description = {
+                             'frame_number': ('number', 'Frame number'),
+                             'encoding_successful': ('boolean', 'Encoded?'),
+                             'frame_type': ('string', 'Frame type'),
+                             'encode_time': ('number', 'Encode time (us)'),
+                             'psnr': ('number', 'PSNR (dB)'),
+    }
+    self.frame_data = [
+        {'frame_number': 0, 'encoding_successful': True, 'frame_type': 'Key',
+         'encode_time': 12427, 'psnr': 38.33282},
+        {'frame_number': 1, 'encoding_successful': False,
+         'frame_type': 'Delta', 'encode_time': 3292, 'psnr': 35.88351},
+        {'frame_number': 2, 'encoding_successful': True,
+         'frame_type': 'Delta', 'encode_time': -1, 'psnr': 36},
+    ]
+
+  def tearDown(self):
+    shutil.rmtree(self.temp_dir)
+
+  def testWriteAndRead(self):
+    webrtc.frame_data.WriteFrameData(self.filename, self.configuration,
+                                     self.type_description, self.frame_data)
+    data = webrtc.frame_data.FrameData(self.filename)
+    self.assertEqual(self.configuration, data.test_configuration)
+    self.assertEqual(self.type_description, data.frame_data_types)
+    self.assertEqual(3, len(data))
+    for index, row in enumerate(self.frame_data):
+      self.assertEqual(row, data[index])
+    self.assertEqual(self.frame_data[-1], data[-1])
+    self.assertRaises(IndexError, data.__getitem__, 3)
+
+    self.assertEqual([True, False, True],
+                     list(data.GetColumn('encoding_successful')))
+    self.assertEqual(['Delta', 'Delta'], data.GetColumn('frame_type')[1:])
+    self.assertEqual([12427, 3292, -1], list(data.GetColumn('encode_time')))
+    self.assertEqual([38.33282, 35.88351, 36.0], list(data.GetColumn('psnr')))
+
+  def testReadWithoutMmap(self):
+    webrtc.frame_data.WriteFrameData(self.filename, self.configuration,
+                                     self.type_description, self.frame_data)
+    mmap = webrtc.frame_data.mmap
+    webrtc.frame_data.mmap = None
+    try:
+      data = webrtc.frame_data.FrameData(self.filename)
+    finally:
+      webrtc.frame_data.mmap = mmap
+    self.assertEqual(self.frame_data, [data[i] for i in range(len(data))])
+
+  def testConvertColumn(self):
+    webrtc.frame_data.WriteFrameData(self.filename, self.configuration,
+                                     self.type_description, self.frame_data)
+    data = webrtc.frame_data.FrameData(self.filename)
+    data.ConvertColumn('frame_number', str)
+    self.assertEqual(['0', '1', '2'], data.GetColumn('frame_number'))
+    self.assertEqual('2', data[2]['frame_number'])
+
+  def testEmptyFrameData(self):
+    webrtc.frame_data.WriteFrameData(self.filename, self.configuration,
+                                     self.type_description, [])
+    data = webrtc.frame_data.FrameData(self.filename)
+    self.assertEqual(0, len(data))
+    self.assertEqual([], list(data.GetColumn('psnr')))
+
+  def testConvertPythonDataFile(self):
+    python_filename = os.path.join(self.temp_dir, 'test.py')
+    f = open(python_filename, 'w')
+    f.write('test_configuration = %r\n' % self.configuration)
+    f.write('frame_data_types = %r\n' % self.type_description)
+    f.write('frame_data = %r\n' % self.frame_data)
+    f.close()
+    webrtc.frame_data.ConvertPythonDataFile(python_filename, self.filename)
+    data = webrtc.frame_data.FrameData(self.filename)
+    self.assertEqual(self.frame_data, [data[i] for i in range(len(data))])
+
+  def testInvalidFile(self):
+    f = open(self.filename, 'w')
+    f.write('{"format": "something_else"}\n')
+    f.close()
+    self.assertRaises(ValueError, webrtc.frame_data.FrameData, self.filename)
+
+if __name__ == "__main__":
+  unittest.main()
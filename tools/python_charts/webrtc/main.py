@@ -10,6 +10,7 @@
 import os
 import gviz_api
 import webrtc.data_helper
+import webrtc.frame_data
 
 def main():
   """
@@ -31,13 +32,18 @@ def main():
   The HTML file is shipped with the script, while the data file must be
   generated by running video_quality_measurement with the --python flag
   specified.
+
+  When a data file has been converted into the columnar binary format of
+  webrtc/frame_data.py, the <name>.frames file is read instead of <name>.py,
+  as it is memory-mapped and faster to load. Data files are converted with:
+    webrtc/frame_data.py data/vp8_sw.py data/vp8_sw.frames
   """
   print 'Content-type: text/html\n' # the newline is required!
 
   page_template_filename = '../templates/chart_page_template.html'
   # The data files must be located in the project tree for app engine being
   # able to access them.
-  data_filenames = ['../data/vp8_sw.py', '../data/vp8_hw.py']
+  data_names = ['../data/vp8_sw', '../data/vp8_hw']
   # Will contain info/error messages to be displayed on the resulting page.
   messages = []
   # Load the page HTML template.
@@ -50,11 +56,16 @@ def main():
                   (page_template_filename, e))
     return
 
-  # Read data from external Python script files. First check that they exist.
-  for filename in data_filenames:
-    if not os.path.exists(filename):
-      messages.append('Cannot open data file: %s' % filename)
-      data_filenames.remove(filename)
+  # Read data from the frame data files, or from external Python script files
+  # if they weren't converted. First check that they exist.
+  data_filenames = []
+  for name in data_names:
+    for filename in [name + '.frames', name + '.py']:
+      if os.path.exists(filename):
+        data_filenames.append(filename)
+        break
+    else:
+      messages.append('Cannot open data file: %s.py' % name)
 
   # Read data from all existing input files.
   data_list = []
@@ -62,12 +73,21 @@ def main():
   names = []
 
   for filename in data_filenames:
-    read_vars = {} # empty dictionary to load the data into.
-    execfile(filename, read_vars, read_vars)
-
-    test_configuration = read_vars['test_configuration']
-    table_description = read_vars['frame_data_types']
-    table_data = read_vars['frame_data']
+    if filename.endswith('.frames'):
+      try:
+        table_data = webrtc.frame_data.FrameData(filename)
+      except (IOError, ValueError) as e:
+        messages.append('Invalid input file: %s. Details: %s' % (filename, e))
+        continue
+      test_configuration = table_data.test_configuration
+      table_description = table_data.frame_data_types
+    else:
+      read_vars = {} # empty dictionary to load the data into.
+      execfile(filename, read_vars, read_vars)
+
+      test_configuration = read_vars['test_configuration']
+      table_description = read_vars['frame_data_types']
+      table_data = read_vars['frame_data']
 
     # Verify the data in the file loaded properly.
     if not table_description or not table_data:
@@ -80,8 +100,11 @@ def main():
     # Change the frame_number column data type:
     table_description['frame_number'] = ('string', 'Frame number')
     # Convert all the values to string types:
-    for row in table_data:
-      row['frame_number'] = str(row['frame_number'])
+    if isinstance(table_data, webrtc.frame_data.FrameData):
+      table_data.ConvertColumn('frame_number', str)
+    else:
+      for row in table_data:
+        row['frame_number'] = str(row['frame_number'])
 
     # Store the unique data from this file in the high level lists.
     test_configurations.append(test_configuration)
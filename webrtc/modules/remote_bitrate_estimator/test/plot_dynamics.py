@@ -10,16 +10,51 @@
 # This script is used to plot simulation dynamics.
 # Able to plot each flow separately. Other plot boxes can be added,
 # currently one for Throughput, one for Latency and one for Packet Loss.
-
+#
+# With --split_tests, the log of a whole test suite is split by test and the
+# figure of every test is saved as <test>.png, in parallel and without a
+# display. The slashes of the test names are replaced by underscores.
+#
+# With --metrics_json or --metrics_csv, the throughput, delay, loss and
+# convergence metrics of every flow of every test are saved instead of being
+# plotted.
+
+from array import array
+import argparse
+import csv
+import json
 import matplotlib
 import matplotlib.pyplot as plt
+import multiprocessing
 import numpy
+import os
 import re
 import sys
 
 # Change this to True to save the figure to a file. Look below for details.
 save_figure = False
 
+# PLOT lines look like:
+#   PLOT\t<figure>\t<context>_<flow ids>_<variable ID>#<axis>@<algorithm>\t
+#   <time>\t<value>
+# The groups are the variable name (flow ids and variable ID), the flow ids,
+# the variable ID, the algorithm, the time and the value. Some variable IDs are
+# logged with a trailing underscore, e.g. Packet_Loss_#1.
+_PLOT_LINE = re.compile(
+    r'_((\d+(?:,\d+)*)_(\D+))#\d@(\S+)\t(\d+\.\d+)\t([-]?\d+\.\d+)')
+# The full gtest name, e.g. VideoSendersTest/BweSimulation.SprintUplinkTest/0
+# for the instances of parameterized tests.
+_TEST_NAME = re.compile(r'\]\s+(\S+)')
+
+# ID, x label, y label, subplot, y max (negative to autoscale).
+VARIABLES = [
+    ('Throughput_kbps', "Time (s)", "Throughput (kbps)", 1, 4000),
+    ('Delay_ms', "Time (s)", "One-way Delay (ms)", 2, 500),
+    ('Packet_Loss', "Time (s)", "Packet Loss Ratio", 3, 1.0),
+    # ('Sending_Estimate_kbps', "Time (s)", "Sending Estimate (kbps)",
+    #                                                        4, 4000),
+    ]
+
 class Variable(object):
   def __init__(self, variable):
     self._ID = variable[0]
@@ -49,24 +84,110 @@ class Variable(object):
 
 
   def addSample(self, line):
-    groups = re.search(r'_(((\d)+((,(\d)+)*))_(\D+))#\d@(\S+)', line)
+    groups = _PLOT_LINE.search(line)
+    self.addParsedSample(groups.group(1), groups.group(4),
+                         float(groups.group(5)), float(groups.group(6)))
 
-    # Each variable will be plotted in a separated box.
-    var_name = groups.group(1)
-    alg_name = groups.group(8)
+  def addParsedSample(self, var_name, alg_name, x, y):
+    series = self.getSeries(var_name, alg_name)
+    series[0].append(x)
+    series[1].append(y)
 
+  def getSeries(self, var_name, alg_name):
+    """Returns the buffers of the times and the values of a series."""
+    # Each variable will be plotted in a separated box.
     alg_name = alg_name.replace('_', ' ')
 
-    if alg_name not in self.samples.keys():
-      self.samples[alg_name] = {}
-
-    if var_name not in self.samples[alg_name].keys():
-      self.samples[alg_name][var_name] = []
-
-    sample = re.search(r'(\d+\.\d+)\t([-]?\d+\.\d+)', line)
-
-    s = (sample.group(1), sample.group(2))
-    self.samples[alg_name][var_name].append(s)
+    series = self.samples.setdefault(alg_name, {}).get(var_name)
+    if series is None:
+      series = (array('d'), array('d'))
+    elif isinstance(series, numpy.ndarray):
+      # Samples are added after finalize().
+      series = (array('d', series[0]), array('d', series[1]))
+    else:
+      return series
+    self.samples[alg_name][var_name] = series
+    return series
+
+  def finalize(self):
+    """Converts the buffers of every series into a 2xN float64 array.
+
+    The first row has the times, the second one the values of the samples.
+    """
+    for alg_samples in self.samples.values():
+      for var_name, series in alg_samples.items():
+        if not isinstance(series, numpy.ndarray):
+          alg_samples[var_name] = numpy.array(
+              [numpy.frombuffer(series[0]), numpy.frombuffer(series[1])])
+
+def findVariable(variables, var_name, var_id):
+  """Returns the variable of a logged variable name and ID, or None.
+
+  The ID is matched without its trailing underscores. Other IDs are matched
+  against the IDs of the variables contained in the variable name.
+  """
+  var_id = var_id.rstrip('_')
+  for v in variables:
+    if v.getID() == var_id:
+      return v
+  for v in variables:
+    if v.getID() in var_name:
+      return v
+  return None
+
+def parseLog(lines, variables, new_test=None):
+  """Adds the samples of the PLOT lines to their variables.
+
+  If new_test is given, it is called with the name of every test run and
+  returns the variables of the samples of that test. The samples of every set
+  of variables are finalized once all their lines are parsed.
+
+  Returns the name of the last test run, or None.
+  """
+  # The series of every (variable name, variable ID, algorithm), or None for
+  # variables that aren't plotted.
+  series_by_key = {}
+  test_name = None
+  for line in lines:
+    if line.startswith("PLOT"):
+      groups = _PLOT_LINE.search(line)
+      if groups is None:
+        continue
+      key = groups.group(1, 3, 4)
+      if key not in series_by_key:
+        v = findVariable(variables, key[0], key[1])
+        series_by_key[key] = v and v.getSeries(key[0], key[2])
+      series = series_by_key[key]
+      if series is not None:
+        series[0].append(float(groups.group(5)))
+        series[1].append(float(groups.group(6)))
+    elif line.startswith("[ RUN      ]"):
+      test_name = _TEST_NAME.search(line).group(1)
+      if new_test:
+        for v in variables:
+          v.finalize()
+        variables = new_test(test_name)
+        series_by_key = {}
+  for v in variables:
+    v.finalize()
+  return test_name
+
+def parseLogByTest(lines, variable_definitions):
+  """Splits the samples of the PLOT lines by test.
+
+  Returns a list of (test name, variables) tuples, in the order of the tests.
+  The test name of the samples logged before any test run is None. Tests
+  without samples are left out.
+  """
+  tests = [(None, [Variable(d) for d in variable_definitions])]
+
+  def newTest(test_name):
+    tests.append((test_name, [Variable(d) for d in variable_definitions]))
+    return tests[-1][1]
+
+  parseLog(lines, tests[0][1], newTest)
+  return [(test_name, variables) for test_name, variables in tests
+          if any(v.samples for v in variables)]
 
 def plotVar(v, ax, show_legend, show_x_label):
   if show_x_label:
@@ -77,10 +198,7 @@ def plotVar(v, ax, show_legend, show_x_label):
 
     for series in v.samples[alg].keys():
 
-      x = [sample[0] for sample in v.samples[alg][series]]
-      y = [sample[1] for sample in v.samples[alg][series]]
-      x = numpy.array(x)
-      y = numpy.array(y)
+      x, y = v.samples[alg][series]
 
       line = plt.plot(x, y, label=alg, linewidth=4.0)
 
@@ -121,31 +239,9 @@ def plotVar(v, ax, show_legend, show_x_label):
       plt.legend(loc='upper center', bbox_to_anchor=(0.5, 1.40),
                  shadow=True, fontsize='large', ncol=len(v.samples))
 
-def main():
-  variables = [
-          ('Throughput_kbps', "Time (s)", "Throughput (kbps)", 1, 4000),
-          ('Delay_ms', "Time (s)", "One-way Delay (ms)", 2, 500),
-          ('Packet_Loss', "Time (s)", "Packet Loss Ratio", 3, 1.0),
-          # ('Sending_Estimate_kbps', "Time (s)", "Sending Estimate (kbps)",
-          #                                                        4, 4000),
-          ]
-
-  var = []
-
-  # Create objects.
-  for variable in variables:
-    var.append(Variable(variable))
-
-  # Add samples to the objects.
-  for line in sys.stdin:
-    if line.startswith("[ RUN      ]"):
-      test_name = re.search(r'\.(\w+)', line).group(1)
-    if line.startswith("PLOT"):
-      for v in var:
-        if v.getID() in line:
-          v.addSample(line)
-
-  matplotlib.rcParams.update({'font.size': 48/len(variables)})
+def plotVariables(var):
+  """Plots the variables in a new figure, one box per variable."""
+  matplotlib.rcParams.update({'font.size': 48/len(var)})
 
   # Plot variables.
   fig = plt.figure()
@@ -157,9 +253,197 @@ def main():
     ax = fig.add_subplot(n, 1, v.getSubplot())
     plotVar(v, ax, i == 0, i == n - 1)
     i += 1
+  return fig
+
+def getFigureFilename(test_name):
+  """Returns the name of the figure file of a test."""
+  return re.sub(r'[^\w.-]', '_', test_name or 'unnamed') + '.png'
+
+def initTestFigureWorker(tests):
+  """Keeps the tests of saveTestFigures in a worker process."""
+  saveTestFigure.tests = tests
+
+def saveTestFigure(index):
+  """Saves the figure of a test of saveTestFigures, in a worker process."""
+  _, var, output_filename = saveTestFigure.tests[index]
+  fig = plotVariables(var)
+  # The fonts and the legend are sized for a maximized window.
+  fig.set_size_inches(20, 15)
+  fig.savefig(output_filename)
+  plt.close(fig)
+  return output_filename
+
+def saveTestFigures(tests, output_directory, processes=None):
+  """Saves the figure of every test as <test>.png, on the Agg backend.
+
+  The figures are saved by a pool of processes, forked once the tests are
+  parsed. The tests are passed to the pool initializer, so the workers share
+  the samples.
+  """
+  plt.switch_backend('Agg')
+  tests = [(test_name, var,
+            os.path.join(output_directory, getFigureFilename(test_name)))
+           for test_name, var in tests]
+  pool = multiprocessing.Pool(processes, initTestFigureWorker, (tests,))
+  try:
+    for output_filename in pool.imap(saveTestFigure, range(len(tests))):
+      print 'Saved', output_filename
+  finally:
+    pool.terminate()
+
+# The columns of the metrics of a flow, see computeFlowMetrics().
+METRICS_COLUMNS = [
+    'test', 'algorithm', 'flow', 'samples',
+    'throughput_mean_kbps', 'throughput_p95_kbps',
+    'delay_p5_ms', 'delay_p50_ms', 'delay_p95_ms', 'delay_mean_ms',
+    'loss_ratio', 'convergence_time_s',
+    ]
+
+def _getSeriesByFlow(var, var_id):
+  """Returns the series of a variable by (algorithm, flow ids).
+
+  A flow logging several series of the variable, e.g. Delay_ms#2 and
+  Delay_ms_#1, gets the one logged with the exact ID.
+  """
+  series_by_flow = {}
+  for v in var:
+    if v.getID() != var_id:
+      continue
+    for alg, alg_samples in v.samples.items():
+      for var_name in sorted(alg_samples):
+        # Variable names start with the flow ids, see _PLOT_LINE.
+        flow_ids = var_name.split('_', 1)[0]
+        series_by_flow.setdefault((alg, flow_ids), alg_samples[var_name])
+  return series_by_flow
+
+def _getConvergenceTime(throughput, available, tolerance):
+  """Returns the time after which the throughput stays within the tolerance
+  of the available capacity, or None if it never does.
+  """
+  times, values = throughput
+  capacity = numpy.interp(times, available[0], available[1])
+  outside = numpy.flatnonzero(
+      numpy.abs(values - capacity) > tolerance * capacity)
+  if len(outside) == 0:
+    return float(times[0])
+  if outside[-1] == len(times) - 1:
+    return None
+  return float(times[outside[-1] + 1])
+
+def _percentile(series, percentile):
+  if series is None or not series.shape[1]:
+    return None
+  return float(numpy.percentile(series[1], percentile))
+
+def _mean(series):
+  if series is None or not series.shape[1]:
+    return None
+  return float(series[1].mean())
+
+def computeFlowMetrics(test_name, var, tolerance=0.1):
+  """Computes the metrics of every flow of every algorithm of a test.
+
+  The convergence time is the time after which the throughput of a flow stays
+  within the given tolerance of the available capacity per flow of the same
+  flow ids, or None if it never does or the capacity isn't logged.
+
+  Returns a list of dicts with the METRICS_COLUMNS as keys, None standing for
+  missing metrics.
+  """
+  throughput = _getSeriesByFlow(var, 'Throughput_kbps')
+  delay = _getSeriesByFlow(var, 'Delay_ms')
+  loss = _getSeriesByFlow(var, 'Packet_Loss')
+
+  metrics = []
+  for alg, flow_ids in sorted(throughput):
+    if alg.startswith('Available'):
+      continue
+    series = throughput[(alg, flow_ids)]
+    available = throughput.get(('Available per flow', flow_ids))
+    flow_delay = delay.get((alg, flow_ids))
+    convergence_time = None
+    if available is not None and series.shape[1] and available.shape[1]:
+      convergence_time = _getConvergenceTime(series, available, tolerance)
+    metrics.append({
+        'test': test_name,
+        'algorithm': alg,
+        'flow': flow_ids,
+        'samples': series.shape[1],
+        'throughput_mean_kbps': _mean(series),
+        'throughput_p95_kbps': _percentile(series, 95),
+        'delay_p5_ms': _percentile(flow_delay, 5),
+        'delay_p50_ms': _percentile(flow_delay, 50),
+        'delay_p95_ms': _percentile(flow_delay, 95),
+        'delay_mean_ms': _mean(flow_delay),
+        'loss_ratio': _mean(loss.get((alg, flow_ids))),
+        'convergence_time_s': convergence_time,
+        })
+  return metrics
+
+def writeMetricsJson(metrics, filename):
+  with open(filename, 'w') as f:
+    json.dump(metrics, f, indent=2, sort_keys=True)
+
+def writeMetricsCsv(metrics, filename):
+  with open(filename, 'wb') as f:
+    writer = csv.DictWriter(f, METRICS_COLUMNS)
+    writer.writeheader()
+    writer.writerows(metrics)
+
+def main():
+  parser = argparse.ArgumentParser(
+      description='Plots the dynamics of the bandwidth estimation '
+                  'simulations logged to stdin.')
+  parser.add_argument('--split_tests', action='store_true',
+                      help='Save one figure per test instead of showing the '
+                           'samples of all the tests in one figure.')
+  parser.add_argument('--output_dir', default='.',
+                      help='Directory of the figures of --split_tests.')
+  parser.add_argument('--processes', type=int, default=None,
+                      help='Number of processes saving the figures of '
+                           '--split_tests. Default: one per CPU.')
+  parser.add_argument('--metrics_json',
+                      help='File to save the metrics of every flow of every '
+                           'test to, as JSON, instead of plotting them.')
+  parser.add_argument('--metrics_csv',
+                      help='File to save the metrics of every flow of every '
+                           'test to, as CSV, instead of plotting them.')
+  parser.add_argument('--convergence_tolerance', type=float, default=0.1,
+                      help='Relative distance to the available capacity of '
+                           'a converged flow. Default: %(default)s.')
+  args = parser.parse_args()
+
+  variables = VARIABLES
+
+  if args.metrics_json or args.metrics_csv:
+    metrics = []
+    for test_name, var in parseLogByTest(sys.stdin, variables):
+      metrics.extend(computeFlowMetrics(test_name, var,
+                                        args.convergence_tolerance))
+    if args.metrics_json:
+      writeMetricsJson(metrics, args.metrics_json)
+    if args.metrics_csv:
+      writeMetricsCsv(metrics, args.metrics_csv)
+    return
+
+  if args.split_tests:
+    saveTestFigures(parseLogByTest(sys.stdin, variables), args.output_dir,
+                    args.processes)
+    return
+
+  var = []
+
+  # Create objects.
+  for variable in variables:
+    var.append(Variable(variable))
+
+  # Add samples to the objects.
+  test_name = parseLog(sys.stdin, var)
+
+  fig = plotVariables(var)
 
   if save_figure:
-    fig.savefig(test_name + ".png")
+    fig.savefig(getFigureFilename(test_name))
   plt.show()
 
 if __name__ == '__main__':
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# Copyright (c) 2016 The WebRTC project authors. All Rights Reserved.
+#
+# Use of this source code is governed by a BSD-style license
+# that can be found in the LICENSE file in the root of the source
+# tree. An additional intellectual property rights grant can be found
+# in the file PATENTS.  All contributing project authors may
+# be found in the AUTHORS file in the root of the source tree.
+
+# This script measures how fast plot_dynamics.py parses simulation logs.
+# Synthetic logs of increasing sizes are written to a temporary directory,
+# with PLOT lines of the plotted variables, of other variables and log lines.
+#
+# Usage example:
+#   ./plot_dynamics_benchmark.py --lines 100000 1000000
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+import plot_dynamics
+
+# The tags logged by PacketReceiver and MetricRecorder.
+_TAGS = [
+    'Receiver_%s_Throughput_kbps#1',
+    'Receiver_%s_Delay_ms#2',
+    'Receiver_%s_Delay_ms_#1',
+    'Receiver_%s_Packet_Loss_#1',
+    'Receiver_%s_Sending_Estimate_kbps#1',
+    'RateCounterFilter_%s_Throughput_kbps#1',
+]
+_ALGORITHMS = ['GCC', 'NADA', 'TCP', 'Available_per_flow']
+
+
+def writeSyntheticLog(filename, lines, flows=5, seed=0):
+  rand = random.Random(seed)
+  f = open(filename, 'w')
+  f.write('[ RUN      ] BweSimulation.Synthetic\n')
+  for i in range(lines):
+    if i % 50 == 0:
+      f.write('Max Delay\t%d ms\n' % rand.randint(0, 500))
+      continue
+    tag = rand.choice(_TAGS) % rand.randint(0, flows - 1)
+    f.write('PLOT\t0\t%s@%s\t%f\t%f\n' % (tag, rand.choice(_ALGORITHMS),
+                                          i * 0.001, rand.uniform(0, 4000)))
+  f.write('[       OK ] BweSimulation.Synthetic (1 ms)\n')
+  f.close()
+
+
+def benchmarkParsing(line_counts, working_directory):
+  print '%10s %10s %10s %14s' % ('lines', 'MB', 'seconds', 'lines/s')
+  for lines in line_counts:
+    filename = os.path.join(working_directory, '%d.log' % lines)
+    writeSyntheticLog(filename, lines)
+    size_mb = os.path.getsize(filename) / 1e6
+
+    variables = [plot_dynamics.Variable(v) for v in plot_dynamics.VARIABLES]
+    start_time = time.time()
+    with open(filename) as f:
+      plot_dynamics.parseLog(f, variables)
+    seconds = time.time() - start_time
+    print '%10d %10.1f %10.3f %14.0f' % (lines, size_mb, seconds,
+                                         lines / seconds)
+    os.remove(filename)
+
+
+def main():
+  parser = argparse.ArgumentParser()
+  parser.add_argument('--lines', nargs='+', type=int,
+                      default=[100000, 1000000],
+                      help='Line counts of the logs to parse.')
+  args = parser.parse_args()
+
+  working_directory = tempfile.mkdtemp()
+  try:
+    benchmarkParsing(args.lines, working_directory)
+  finally:
+    shutil.rmtree(working_directory)
+  return 0
+
+if __name__ == '__main__':
+  sys.exit(main())
@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+# Copyright (c) 2016 The WebRTC project authors. All Rights Reserved.
+#
+# Use of this source code is governed by a BSD-style license
+# that can be found in the LICENSE file in the root of the source
+# tree. An additional intellectual property rights grant can be found
+# in the file PATENTS.  All contributing project authors may
+# be found in the AUTHORS file in the root of the source tree.
+
+import unittest
+
+import numpy
+
+import plot_dynamics
+
+# PLOT lines as logged by PacketReceiver and MetricRecorder.
+_LOG = [
+    '[ RUN      ] VideoSendersTest/BweSimulation.SprintUplinkTest/0\n',
+    'PLOT\t0\tSprintUplinkTest_Receiver_0_Throughput_kbps#1@GCC\t'
+    '0.100000\t300.000000\n',
+    'PLOT\t0\tSprintUplinkTest_Receiver_0_Throughput_kbps#1@GCC\t'
+    '0.200000\t500.000000\n',
+    'PLOT\t0\tSprintUplinkTest_Receiver_0_Delay_ms#2@GCC\t'
+    '0.100000\t40.000000\n',
+    'PLOT\t1\tSprintUplinkTest_Receiver_0_Delay_ms_#1@GCC\t'
+    '0.200000\t60.000000\n',
+    'PLOT\t2\tSprintUplinkTest_Receiver_0_Packet_Loss_#1@GCC\t'
+    '0.200000\t0.100000\n',
+    'PLOT\t0\tSprintUplinkTest_Receiver_0_Sending_Estimate_kbps#1@GCC\t'
+    '0.200000\t600.000000\n',
+    'Max Delay\t60 ms\n',
+    ]
+
+
+class Test(unittest.TestCase):
+
+  def setUp(self):
+    self.var = [plot_dynamics.Variable(v) for v in plot_dynamics.VARIABLES]
+    self.throughput, self.delay, self.loss = self.var
+
+  def testParseLog(self):
+    test_name = plot_dynamics.parseLog(_LOG, self.var)
+    self.assertEqual('VideoSendersTest/BweSimulation.SprintUplinkTest/0',
+                     test_name)
+
+    self.assertEqual(['0_Throughput_kbps'],
+                     self.throughput.samples['GCC'].keys())
+    self.assertEqual([[0.1, 0.2], [300, 500]],
+                     self.throughput.samples['GCC']['0_Throughput_kbps']
+                     .tolist())
+    self.assertEqual([[0.1], [40]],
+                     self.delay.samples['GCC']['0_Delay_ms'].tolist())
+    self.assertEqual([[0.2], [60]],
+                     self.delay.samples['GCC']['0_Delay_ms_'].tolist())
+    self.assertEqual([[0.2], [0.1]],
+                     self.loss.samples['GCC']['0_Packet_Loss_'].tolist())
+
+  def testParseLogMatchesAddSample(self):
+    plot_dynamics.parseLog(_LOG, self.var)
+    expected = [plot_dynamics.Variable(v) for v in plot_dynamics.VARIABLES]
+    for line in _LOG:
+      if line.startswith('PLOT'):
+        for v in expected:
+          if v.getID() in line:
+            v.addSample(line)
+    for v, expected_v in zip(self.var, expected):
+      expected_v.finalize()
+      self.assertEqual(
+          dict((alg, dict((name, series.tolist())
+                          for name, series in samples.items()))
+               for alg, samples in expected_v.samples.items()),
+          dict((alg, dict((name, series.tolist())
+                          for name, series in samples.items()))
+               for alg, samples in v.samples.items()))
+
+  def testParseLogByTest(self):
+    lines = []
+    for i in range(3):
+      lines.extend(line.replace('Test/0', 'Test/%d' % i) for line in _LOG)
+    tests = plot_dynamics.parseLogByTest(lines, plot_dynamics.VARIABLES)
+    self.assertEqual(['VideoSendersTest/BweSimulation.SprintUplinkTest/%d' % i
+                      for i in range(3)],
+                     [test_name for test_name, _ in tests])
+    self.assertEqual(
+        ['VideoSendersTest_BweSimulation.SprintUplinkTest_%d.png' % i
+         for i in range(3)],
+        [plot_dynamics.getFigureFilename(test_name) for test_name, _ in tests])
+    for _, var in tests:
+      self.assertEqual([[0.1, 0.2], [300, 500]],
+                       var[0].samples['GCC']['0_Throughput_kbps'].tolist())
+
+  def testFindVariable(self):
+    self.assertIs(self.loss, plot_dynamics.findVariable(
+        self.var, '0_Packet_Loss_', 'Packet_Loss_'))
+    self.assertIs(self.delay, plot_dynamics.findVariable(
+        self.var, '1,2_Delay_ms', 'Delay_ms'))
+    self.assertIs(self.throughput, plot_dynamics.findVariable(
+        self.var, '0_Throughput_kbps_Total', 'Throughput_kbps_Total'))
+    self.assertIsNone(plot_dynamics.findVariable(
+        self.var, '0_Sending_Estimate_kbps', 'Sending_Estimate_kbps'))
+
+  def testGetConvergenceTime(self):
+    available = numpy.array([[0.0, 10.0], [1000.0, 1000.0]])
+    times = [1.0, 2.0, 3.0, 4.0]
+    self.assertEqual(3.0, plot_dynamics._getConvergenceTime(
+        numpy.array([times, [200, 1200, 950, 1050]]), available, 0.1))
+    self.assertEqual(1.0, plot_dynamics._getConvergenceTime(
+        numpy.array([times, [950, 1000, 1050, 1000]]), available, 0.1))
+    self.assertIsNone(plot_dynamics._getConvergenceTime(
+        numpy.array([times, [1000, 1000, 1000, 500]]), available, 0.1))
+    self.assertEqual(2.0, plot_dynamics._getConvergenceTime(
+        numpy.array([times, [200, 1200, 950, 1050]]), available, 0.25))
+
+  def testComputeFlowMetrics(self):
+    log = _LOG + [
+        'PLOT\t0\tSprintUplinkTest_Receiver_0_Throughput_kbps#1'
+        '@Available_per_flow\t0.100000\t500.000000\n',
+        'PLOT\t0\tSprintUplinkTest_Receiver_0_Throughput_kbps#1'
+        '@Available_per_flow\t0.200000\t500.000000\n',
+        'PLOT\t2\tSprintUplinkTest_Receiver_0_Packet_Loss_#1@GCC\t'
+        '0.300000\t0.300000\n',
+        'PLOT\t0\tSprintUplinkTest_Receiver_1,2_Throughput_kbps#1@NADA\t'
+        '0.100000\t100.000000\n',
+        ]
+    plot_dynamics.parseLog(log, self.var)
+    metrics = plot_dynamics.computeFlowMetrics('Test/0', self.var, 0.1)
+    self.assertEqual(2, len(metrics))
+    self.assertEqual(set(plot_dynamics.METRICS_COLUMNS), set(metrics[0]))
+
+    gcc = metrics[0]
+    self.assertEqual(('Test/0', 'GCC', '0', 2),
+                     (gcc['test'], gcc['algorithm'], gcc['flow'],
+                      gcc['samples']))
+    self.assertEqual(400, gcc['throughput_mean_kbps'])
+    self.assertAlmostEqual(490, gcc['throughput_p95_kbps'])
+    # The delay of the flow is the one logged as Delay_ms.
+    self.assertEqual(40, gcc['delay_p50_ms'])
+    self.assertEqual(40, gcc['delay_mean_ms'])
+    self.assertAlmostEqual(0.2, gcc['loss_ratio'])
+    self.assertEqual(0.2, gcc['convergence_time_s'])
+
+    nada = metrics[1]
+    self.assertEqual(('NADA', '1,2', 100),
+                     (nada['algorithm'], nada['flow'],
+                      nada['throughput_mean_kbps']))
+    self.assertIsNone(nada['delay_p50_ms'])
+    self.assertIsNone(nada['loss_ratio'])
+    self.assertIsNone(nada['convergence_time_s'])
+
+if __name__ == '__main__':
+  unittest.main()
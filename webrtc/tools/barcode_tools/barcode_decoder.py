@@ -7,9 +7,12 @@
 # in the file PATENTS.  All contributing project authors may
 # be found in the AUTHORS file in the root of the source tree.
 
+import itertools
+import multiprocessing
 import optparse
 import os
 import sys
+import time
 
 if __name__ == '__main__':
   # Make sure we always can import helper_functions.
@@ -17,9 +20,36 @@ if __name__ == '__main__':
 
 import helper_functions
 
+try:
+  import numpy
+except ImportError:
+  numpy = None
+
 # Chrome browsertests will throw away stderr; avoid that output gets lost.
 sys.stderr = sys.stdout
 
+_DEFAULT_BARCODE_HEIGHT = 32
+_DEFAULT_FRAMES_PER_TASK = 256
+_DEFAULT_FILES_PER_ZXING_INVOCATION = 32
+# Number of bars and spaces in a UPC-A barcode: three guard patterns and four
+# runs per digit.
+_UPCA_RUNS = 3 + 6 * 4 + 5 + 6 * 4 + 3
+# Maximum average deviation, in modules, of the widths of the bars and spaces
+# of a digit from the closest digit pattern. Same as Zxing uses.
+_MAX_AVERAGE_VARIANCE = 0.48
+# Minimum luma difference between bars and spaces for a barcode to be decoded.
+_MIN_CONTRAST = 32
+
+
+def _get_run_lengths(modules):
+  """Returns the lengths of the runs of equal modules, e.g. [3, 2] for 00011."""
+  return [len(list(run)) for _, run in itertools.groupby(modules)]
+
+
+# Widths of the bars and spaces of every digit, in modules.
+_UPCA_DIGIT_WIDTHS = [_get_run_lengths(code)
+                      for code in helper_functions.UPCA_LEFT_DIGIT_CODES]
+
 
 def convert_yuv_to_png_files(yuv_file_name, yuv_frame_width, yuv_frame_height,
                              output_directory, ffmpeg_path):
@@ -61,7 +91,8 @@ def convert_yuv_to_png_files(yuv_file_name, yuv_frame_width, yuv_frame_height,
   return True
 
 
-def decode_frames(input_directory, zxing_path):
+def decode_frames(input_directory, zxing_path, fail_fast=True,
+                  files_per_invocation=_DEFAULT_FILES_PER_ZXING_INVOCATION):
   """Decodes the barcodes overlaid in each frame.
 
   The function uses the Zxing command-line tool from the Zxing C++ distribution
@@ -71,85 +102,330 @@ def decode_frames(input_directory, zxing_path):
   The decoding results in a frame_xxxx.txt file for every successfully decoded
   barcode. This file contains the decoded barcode as 12-digit string (UPC-A
   format: 11 digits content + one check digit).
+  Zxing is given several frames per invocation, and at most one invocation runs
+  per CPU.
 
   Args:
     input_directory(string): The input directory from where the PNG frames are
       read.
     zxing_path(string): The path to the zxing binary. If specified as None,
       the PATH will be searched for it.
+    fail_fast(bool): Whether to stop decoding at the first frame that fails.
+    files_per_invocation(int): The maximum number of frames decoded by one
+      zxing process.
   Return:
     (bool): True if the decoding succeeded.
   """
   if not zxing_path:
     zxing_path = 'zxing.exe' if sys.platform == 'win32' else 'zxing'
   print 'Decoding barcodes from PNG files with %s...' % zxing_path
-  return helper_functions.perform_action_on_all_files(
-      directory=input_directory, file_pattern='frame_',
-      file_extension='png', start_number=1, action=_decode_barcode_in_file,
-      command_line_decoder=zxing_path)
+  file_names = helper_functions.list_numbered_files(input_directory, 'frame_',
+                                                    'png', 1)
+  command = [zxing_path, '--try-harder', '--dump-raw']
+  successful = True
+  try:
+    for file_name, out in helper_functions.run_command_on_files(
+        command, file_names, files_per_command=files_per_invocation):
+      if out is None:
+        print 'Barcode in %s cannot be decoded.' % file_name
+        successful = False
+        if fail_fast:
+          break
+        continue
+      text_file = open('%s.txt' % file_name[:-4], 'w')
+      text_file.write(out)
+      text_file.close()
+  except OSError:
+    print 'Did not find %s. Have you installed it?' % zxing_path
+    return False
+  return successful
 
 
-def _decode_barcode_in_file(file_name, command_line_decoder):
-  """Decodes the barcode in the upper left corner of a PNG file.
+def _decode_digit(widths):
+  """Decodes one UPC-A digit from the widths of its bars and spaces.
 
   Args:
-    file_name(string): File name of the PNG file.
-    command_line_decoder(string): The ZXing command-line decoding tool.
+    widths(numpy.ndarray): The widths, in pixels, of the four bars and spaces
+      encoding the digit.
+  Return:
+    (string): The decoded digit or None if the widths don't match any digit.
+  """
+  modules = widths * 7.0 / widths.sum()
+  variances = numpy.abs(numpy.array(_UPCA_DIGIT_WIDTHS) - modules).sum(
+      axis=1) / 7.0
+  digit = variances.argmin()
+  if variances[digit] > _MAX_AVERAGE_VARIANCE:
+    return None
+  return str(digit)
+
 
+def decode_barcode_in_luma(luma_rows):
+  """Decodes the UPC-A barcode in the upper left corner of a luma plane.
+
+  The rows are averaged into one scan line, which is binarized halfway between
+  its darkest and brightest values. The widths of the bars and spaces, starting
+  from the first bar, are then matched against the UPC-A guard and digit
+  patterns.
+
+  Args:
+    luma_rows(numpy.ndarray): The rows of the Y plane spanned by the barcode.
   Return:
-    (bool): True upon success, False otherwise.
+    (string): The decoded barcode as 12-digit string (11 digits content + one
+      check digit), or None if no valid barcode could be decoded.
   """
-  command = [command_line_decoder, '--try-harder', '--dump-raw', file_name]
-  try:
-    out = helper_functions.run_shell_command(
-        command, fail_msg='Error during decoding of %s' % file_name)
-    text_file = open('%s.txt' % file_name[:-4], 'w')
-    text_file.write(out)
-    text_file.close()
-  except helper_functions.HelperError, err:
-    print 'Barcode in %s cannot be decoded.' % file_name
-    print err
-    return False
-  except OSError:
-    print 'Did not find %s. Have you installed it?' % command_line_decoder
-    return False
-  return True
+  scan_line = luma_rows.mean(axis=0)
+  darkest = scan_line.min()
+  brightest = scan_line.max()
+  if brightest - darkest < _MIN_CONTRAST:
+    return None
+  bars = scan_line < (darkest + brightest) / 2.0
+
+  run_starts = numpy.flatnonzero(bars[1:] != bars[:-1]) + 1
+  runs = numpy.diff(numpy.concatenate(([0], run_starts, [bars.size])))
+  first_bar = 0 if bars[0] else 1
+  runs = runs[first_bar:first_bar + _UPCA_RUNS]
+  if runs.size < _UPCA_RUNS:
+    return None
+
+  # All the runs of the guard patterns are one module wide.
+  module_width = runs.sum() / float(helper_functions.UPCA_MODULES)
+  guards = numpy.concatenate((runs[:3], runs[27:32], runs[-3:]))
+  if (numpy.abs(guards - module_width) > module_width / 2.0).any():
+    return None
+
+  barcode = ''
+  for digit_index in range(12):
+    # The right half starts after the five runs of the middle guard.
+    offset = 3 + 4 * digit_index + (5 if digit_index >= 6 else 0)
+    digit = _decode_digit(runs[offset:offset + 4])
+    if digit is None:
+      return None
+    barcode += digit
+
+  if not _check_barcode(barcode):
+    return None
+  return barcode
 
 
-def _generate_stats_file(stats_file_name, input_directory='.'):
-  """Generate statistics file.
+def decode_barcodes_in_yuv_file(yuv_file_name, yuv_frame_width,
+                                yuv_frame_height, barcode_height,
+                                start_frame=0, end_frame=None):
+  """Decodes the barcodes overlaid in the frames of a YUV file in-process.
 
-  The function generates a statistics file. The contents of the file are in the
-  format <frame_name> <barcode>, where frame name is the name of every frame
-  (effectively the frame number) and barcode is the decoded barcode. The frames
-  and the helper .txt files are removed after they have been used.
+  Only the rows of the Y planes spanned by the barcodes are read, straight from
+  the memory-mapped YUV file. The middle half of those rows is used to avoid
+  the edges, which are blurred by the video coding. Requires NumPy.
+
+  Args:
+    yuv_file_name(string): The name of the YUV file.
+    yuv_frame_width(int): The width of one YUV frame.
+    yuv_frame_height(int): The height of one YUV frame.
+    barcode_height(int): The height of the barcodes in pixels.
+    start_frame(int): The first frame to decode.
+    end_frame(int): The frame after the last frame to decode, or None to decode
+      until the end of the file.
+  Return:
+    (list): The decoded 12-digit barcode of every frame in the range, or None
+      for the frames where no barcode could be decoded.
+  """
+  yuv_file = helper_functions.YuvFile(yuv_file_name, yuv_frame_width,
+                                      yuv_frame_height)
+  first_row = barcode_height / 4
+  last_row = max(barcode_height * 3 / 4, first_row + 1)
+  y_planes = yuv_file.get_planes(slice(start_frame, end_frame))[0]
+
+  barcodes = [decode_barcode_in_luma(y_plane[first_row:last_row])
+              for y_plane in y_planes]
+  yuv_file.close()
+  return barcodes
+
+
+def _decode_frame_range(task):
+  """Decodes a range of frames in a worker process.
+
+  Args:
+    task(tuple): The arguments to decode_barcodes_in_yuv_file.
+  Return:
+    (tuple): The first frame of the range, the barcodes decoded in the range,
+      the time it took in seconds and the id of the worker process.
+  """
+  start_time = time.time()
+  barcodes = decode_barcodes_in_yuv_file(*task)
+  return task[4], barcodes, time.time() - start_time, os.getpid()
+
+
+def decode_barcodes_in_parallel(yuv_file_name, yuv_frame_width,
+                                yuv_frame_height, barcode_height,
+                                processes=None,
+                                frames_per_task=_DEFAULT_FRAMES_PER_TASK):
+  """Decodes the barcodes of a YUV file in a pool of processes.
+
+  The file is split into ranges of frames_per_task frames. Every worker maps the
+  YUV file itself and decodes its ranges with decode_barcodes_in_yuv_file, so
+  only the decoded barcodes are sent between processes. The ranges are merged
+  back in frame order as they complete. The progress and the throughput of
+  every worker are printed. Requires NumPy.
+
+  Args:
+    yuv_file_name(string): The name of the YUV file.
+    yuv_frame_width(int): The width of one YUV frame.
+    yuv_frame_height(int): The height of one YUV frame.
+    barcode_height(int): The height of the barcodes in pixels.
+    processes(int): The number of worker processes. Defaults to the number of
+      CPUs.
+    frames_per_task(int): The number of frames decoded by a worker at a time.
+  Return:
+    (list): The decoded 12-digit barcode of every frame, or None for the frames
+      where no barcode could be decoded.
+  """
+  number_of_frames = (os.path.getsize(yuv_file_name) /
+                      helper_functions.get_i420_frame_size(yuv_frame_width,
+                                                           yuv_frame_height))
+  tasks = [(yuv_file_name, yuv_frame_width, yuv_frame_height, barcode_height,
+            start, min(start + frames_per_task, number_of_frames))
+           for start in range(0, number_of_frames, frames_per_task)]
+
+  barcodes = [None] * number_of_frames
+  # Frames decoded and seconds spent by every worker process.
+  worker_stats = {}
+  decoded_frames = 0
+  start_time = time.time()
+  process_pool = multiprocessing.Pool(processes=processes)
+  for start, range_barcodes, seconds, worker in process_pool.imap_unordered(
+      _decode_frame_range, tasks):
+    barcodes[start:start + len(range_barcodes)] = range_barcodes
+    frames, total_seconds = worker_stats.get(worker, (0, 0.0))
+    worker_stats[worker] = (frames + len(range_barcodes),
+                            total_seconds + seconds)
+    decoded_frames += len(range_barcodes)
+    print 'Decoded %d of %d frames (%.1f fps).' % (
+        decoded_frames, number_of_frames,
+        decoded_frames / max(time.time() - start_time, 1e-6))
+  process_pool.close()
+  process_pool.join()
+
+  for worker, (frames, seconds) in sorted(worker_stats.iteritems()):
+    print 'Worker %d decoded %d frames in %.2f s (%.1f fps).' % (
+        worker, frames, seconds, frames / max(seconds, 1e-6))
+  return barcodes
+
+
+def _decode_frames_with_zxing(yuv_file_name, yuv_frame_width,
+                              yuv_frame_height, frame_numbers,
+                              working_directory, ffmpeg_path, zxing_path,
+                              files_per_invocation=(
+                                  _DEFAULT_FILES_PER_ZXING_INVOCATION)):
+  """Decodes the barcodes of some frames of a YUV file with Zxing.
+
+  The frames are copied to a temporary YUV file, converted to PNG frames and
+  decoded with Zxing, all in the working directory.
+
+  Args:
+    yuv_file_name(string): The name of the YUV file.
+    yuv_frame_width(int): The width of one YUV frame.
+    yuv_frame_height(int): The height of one YUV frame.
+    frame_numbers(list of int): The (zero based) frames to decode.
+    working_directory(string): The directory for the temporary files.
+    ffmpeg_path(string): The path to the ffmpeg executable or None.
+    zxing_path(string): The path to the zxing binary or None.
+    files_per_invocation(int): The maximum number of frames decoded by one
+      zxing process.
+  Return:
+    (dict): The decoded barcode, or None, for every frame number.
+  """
+  frames_file_name = os.path.join(working_directory, 'zxing_frames.yuv')
+  yuv_file = helper_functions.YuvFile(yuv_file_name, yuv_frame_width,
+                                      yuv_frame_height)
+  yuv_file[frame_numbers].tofile(frames_file_name)
+  yuv_file.close()
+
+  barcodes = [None] * len(frame_numbers)
+  if convert_yuv_to_png_files(frames_file_name, yuv_frame_width,
+                              yuv_frame_height, working_directory,
+                              ffmpeg_path):
+    # Frames Zxing fails to decode are reported as barcode errors.
+    decode_frames(working_directory, zxing_path, fail_fast=False,
+                  files_per_invocation=files_per_invocation)
+    barcodes = _read_barcodes_from_text_files(working_directory)
+  os.remove(frames_file_name)
+  return dict(zip(frame_numbers, barcodes))
+
+
+def get_stats_lines(barcodes):
+  """Generates the lines of the statistics file.
+
+  The lines are in the format <frame_name> <barcode>, where frame name is the
+  name of every frame (effectively the frame number, starting from 0) and
+  barcode is the content of the decoded barcode.
+
+  Args:
+    barcodes(list): The decoded 12-digit barcode of every frame, or None if it
+      couldn't be decoded.
+  Return:
+    (list of strings): The lines, each ending with a newline.
+  """
+  lines = []
+  for i, barcode in enumerate(barcodes):
+    entry = 'frame_' + helper_functions.zero_pad(i) + ' '
+    if barcode is not None and _check_barcode(barcode):
+      entry += (helper_functions.zero_pad(int(barcode[0:11])) + '\n')
+    else:
+      entry += 'Barcode error\n'  # Barcode is missing or wrongly detected.
+    lines.append(entry)
+  return lines
+
+
+def _write_stats_file(stats_file_name, barcodes):
+  """Writes the statistics file, see get_stats_lines.
+
+  Args:
+    stats_file_name(string): The name of the statistics file.
+    barcodes(list): The decoded 12-digit barcode of every frame, or None if it
+      couldn't be decoded.
   """
-  file_prefix = os.path.join(input_directory, 'frame_')
   stats_file = open(stats_file_name, 'w')
 
   print 'Generating stats file: %s' % stats_file_name
+  stats_file.writelines(get_stats_lines(barcodes))
+
+  stats_file.close()
+
+
+def _read_barcodes_from_text_files(input_directory='.'):
+  """Reads the barcodes decoded by Zxing for every PNG frame.
+
+  The frames and the helper .txt files are removed after they have been read.
+
+  Args:
+    input_directory(string): The directory with the PNG frames and .txt files.
+  Return:
+    (list): The barcode of every frame, or None if it couldn't be decoded.
+  """
+  file_prefix = os.path.join(input_directory, 'frame_')
+  barcodes = []
   for i in range(1, _count_frames_in(input_directory=input_directory) + 1):
     frame_number = helper_functions.zero_pad(i)
     barcode_file_name = file_prefix + frame_number + '.txt'
     png_frame = file_prefix + frame_number + '.png'
-    entry_frame_number = helper_functions.zero_pad(i-1)
-    entry = 'frame_' + entry_frame_number + ' '
 
     if os.path.isfile(barcode_file_name):
-      barcode = _read_barcode_from_text_file(barcode_file_name)
+      barcodes.append(_read_barcode_from_text_file(barcode_file_name))
       os.remove(barcode_file_name)
-
-      if _check_barcode(barcode):
-        entry += (helper_functions.zero_pad(int(barcode[0:11])) + '\n')
-      else:
-        entry += 'Barcode error\n'  # Barcode is wrongly detected.
     else:  # Barcode file doesn't exist.
-      entry += 'Barcode error\n'
-
-    stats_file.write(entry)
+      barcodes.append(None)
     os.remove(png_frame)
+  return barcodes
 
-  stats_file.close()
+
+def _generate_stats_file(stats_file_name, input_directory='.'):
+  """Generate statistics file.
+
+  The function generates a statistics file from the barcodes Zxing decoded from
+  the PNG frames in the input directory, see _write_stats_file. The frames and
+  the helper .txt files are removed after they have been used.
+  """
+  _write_stats_file(stats_file_name,
+                    _read_barcodes_from_text_files(input_directory))
 
 
 def _read_barcode_from_text_file(barcode_file_name):
@@ -212,16 +488,10 @@ def _count_frames_in(input_directory='.'):
   Return:
     (int): The number of frames.
   """
-  file_prefix = os.path.join(input_directory, 'frame_')
-  file_exists = True
+  file_names = set(os.listdir(input_directory))
   num = 1
-
-  while file_exists:
-    file_name = (file_prefix + helper_functions.zero_pad(num) + '.png')
-    if os.path.isfile(file_name):
-      num += 1
-    else:
-      file_exists = False
+  while 'frame_' + helper_functions.zero_pad(num) + '.png' in file_names:
+    num += 1
   return num - 1
 
 
@@ -252,6 +522,28 @@ def _parse_args():
                           'decoded. If using Windows and a Cygwin-compiled '
                           'zxing.exe, you should keep the default value to '
                           'avoid problems. Default: %default'))
+  parser.add_option('--barcode_height', type='int',
+                    default=_DEFAULT_BARCODE_HEIGHT,
+                    help=('Height of the barcodes overlaid on the frames. '
+                          'Default: %default'))
+  parser.add_option('--use_zxing', action='store_true', default=False,
+                    help=('Decode all the barcodes with ffmpeg and Zxing '
+                          'instead of in-process. This is always done if NumPy '
+                          'is not available.'))
+  parser.add_option('--zxing_fallback', action='store_true', default=False,
+                    help=('Decode the barcodes that cannot be decoded '
+                          'in-process with ffmpeg and Zxing.'))
+  parser.add_option('--processes', type='int',
+                    help=('Number of processes decoding barcodes in-process. '
+                          'Default: the number of CPUs.'))
+  parser.add_option('--frames_per_task', type='int',
+                    default=_DEFAULT_FRAMES_PER_TASK,
+                    help=('Number of frames a process decodes at a time. '
+                          'Default: %default'))
+  parser.add_option('--files_per_zxing_invocation', type='int',
+                    default=_DEFAULT_FILES_PER_ZXING_INVOCATION,
+                    help=('Maximum number of PNG frames decoded by one zxing '
+                          'process. Default: %default'))
   options, _ = parser.parse_args()
   return options
 
@@ -267,6 +559,45 @@ def _main():
   """
   options = _parse_args()
 
+  if numpy is None or options.use_zxing:
+    return _decode_with_zxing(options)
+
+  print 'Decoding barcodes from %s...' % options.yuv_file
+  if options.processes == 1:
+    barcodes = decode_barcodes_in_yuv_file(options.yuv_file,
+                                           options.yuv_frame_width,
+                                           options.yuv_frame_height,
+                                           options.barcode_height)
+  else:
+    barcodes = decode_barcodes_in_parallel(
+        options.yuv_file, options.yuv_frame_width, options.yuv_frame_height,
+        options.barcode_height, processes=options.processes,
+        frames_per_task=options.frames_per_task)
+  failed_frames = [i for i, barcode in enumerate(barcodes) if barcode is None]
+  if failed_frames:
+    print '%d of %d barcodes could not be decoded.' % (len(failed_frames),
+                                                       len(barcodes))
+    if options.zxing_fallback:
+      print 'Decoding them with Zxing...'
+      zxing_barcodes = _decode_frames_with_zxing(
+          options.yuv_file, options.yuv_frame_width, options.yuv_frame_height,
+          failed_frames, options.png_working_dir, options.ffmpeg_path,
+          options.zxing_path, options.files_per_zxing_invocation)
+      for frame_number, barcode in zxing_barcodes.iteritems():
+        barcodes[frame_number] = barcode
+
+  # Generate statistics file.
+  _write_stats_file(options.stats_file, barcodes)
+  print 'Completed barcode decoding.'
+  return 0
+
+
+def _decode_with_zxing(options):
+  """Decodes all the barcodes with ffmpeg and Zxing.
+
+  Return:
+    (int): The exit code of the decoder.
+  """
   # Convert the overlaid YUV video into a set of PNG frames.
   if not convert_yuv_to_png_files(options.yuv_file, options.yuv_frame_width,
                                   options.yuv_frame_height,
@@ -276,8 +607,9 @@ def _main():
     return -1
 
   # Decode the barcodes from the PNG frames.
-  if not decode_frames(input_directory=options.png_working_dir,
-                       zxing_path=options.zxing_path):
+  if not decode_frames(
+      input_directory=options.png_working_dir, zxing_path=options.zxing_path,
+      files_per_invocation=options.files_per_zxing_invocation):
     print 'An error occurred decoding barcodes from PNG frames.'
     return -2
 
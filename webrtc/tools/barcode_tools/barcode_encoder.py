@@ -7,14 +7,31 @@
 # in the file PATENTS.  All contributing project authors may
 # be found in the AUTHORS file in the root of the source tree.
 
+import itertools
 import optparse
 import os
 import sys
 
 import helper_functions
 
+try:
+  import numpy
+except ImportError:
+  numpy = None
+
 _DEFAULT_BARCODE_WIDTH = 352
 _DEFAULT_BARCODES_FILE = 'barcodes.yuv'
+_DEFAULT_OVERLAY_FRAMES_PER_CHUNK = 16
+
+# Quiet zone added around the rendered barcodes, in modules (both sides in
+# total). Like the Zxing UPC/EAN writer, the length of the start/end guard is
+# added on each side.
+_UPCA_QUIET_ZONE_MODULES = 6
+# Luma and chroma values a black and white PNG barcode gets when converted to
+# yuv420p by ffmpeg.
+_BARCODE_BAR_LUMA = 16
+_BARCODE_SPACE_LUMA = 235
+_BARCODE_CHROMA = 128
 
 
 def generate_upca_barcodes(number_of_barcodes, barcode_width, barcode_height,
@@ -44,7 +61,7 @@ def generate_upca_barcodes(number_of_barcodes, barcode_width, barcode_height,
   barcode_width = str(barcode_width)
   barcode_height = str(barcode_height)
 
-  errors = False
+  commands = []
   for i in range(number_of_barcodes):
     suffix = helper_functions.zero_pad(i)
     # Barcodes starting from 0
@@ -55,107 +72,131 @@ def generate_upca_barcodes(number_of_barcodes, barcode_width, barcode_height,
                "--barcode_format=UPC_A", "--height=%s" % barcode_height,
                "--width=%s" % barcode_width,
                "--output=%s" % (output_file_name), "%s" % (content)]
-    try:
-      helper_functions.run_shell_command(
-          command, fail_msg=('Error during barcode %s generation' % content))
-    except helper_functions.HelperError as err:
-      print >> sys.stderr, err
+    commands.append(command)
+
+  # The encoder takes a single content per invocation, so the invocations are
+  # run concurrently instead.
+  errors = False
+  for i, returncode, output, error in helper_functions.run_shell_commands(
+      commands):
+    if returncode != 0:
+      print >> sys.stderr, ('Error during barcode %s generation: command '
+                            'returned %d and printed %s and %s' %
+                            (helper_functions.zero_pad(i, 11), returncode,
+                             output, error))
       errors = True
   return not errors
 
 
-def convert_png_to_yuv_barcodes(input_directory='.', output_directory='.'):
-  """Converts PNG barcodes to YUV barcode images.
+def render_upca_barcode(content, barcode_width, barcode_height):
+  """Renders a UPC-A barcode directly into YUV planes.
 
-  This function reads all the PNG files from the input directory which are in
-  the format frame_xxxx.png, where xxxx is the number of the frame, starting
-  from 0000. The frames should be consecutive numbers. The output YUV file is
-  named frame_xxxx.yuv. The function uses ffmpeg to do the conversion.
+  The barcode is laid out like the Zxing encoder does it: every module gets the
+  same integral number of pixels and the barcode is centered horizontally.
+  Requires NumPy.
 
   Args:
-    input_directory(string): The input direcotry to read the PNG barcodes from.
-    output_directory(string): The putput directory to write the YUV files to.
+    content(string): The 11 content digits of the barcode.
+    barcode_width(int): Width of barcode in pixels.
+    barcode_height(int): Height of barcode in pixels.
   Return:
-    (bool): True if the conversion was without errors.
-  """
-  return helper_functions.perform_action_on_all_files(
-      input_directory, 'barcode_', 'png', 0, _convert_to_yuv_and_delete,
-      output_directory=output_directory, pattern='barcode_')
-
+    (tuple of numpy.ndarray): The Y, U and V planes of the barcode.
 
-def _convert_to_yuv_and_delete(output_directory, file_name, pattern):
-  """Converts a PNG file to a YUV file and deletes the PNG file.
+  Raise:
+    HelperError: If the barcode doesn't fit into barcode_width.
+  """
+  module_width = barcode_width / (helper_functions.UPCA_MODULES +
+                                  _UPCA_QUIET_ZONE_MODULES)
+  if module_width < 1:
+    raise helper_functions.HelperError(
+        'A UPC-A barcode needs to be at least %d pixels wide' %
+        (helper_functions.UPCA_MODULES + _UPCA_QUIET_ZONE_MODULES))
+  left_padding = (barcode_width -
+                  helper_functions.UPCA_MODULES * module_width) / 2
+
+  modules = numpy.fromstring(helper_functions.encode_upca_modules(content),
+                             dtype=numpy.uint8) == ord('1')
+  y_row = numpy.empty(barcode_width, dtype=numpy.uint8)
+  y_row.fill(_BARCODE_SPACE_LUMA)
+  y_row[left_padding:left_padding + modules.size * module_width] = numpy.where(
+      modules.repeat(module_width), _BARCODE_BAR_LUMA, _BARCODE_SPACE_LUMA)
+
+  y_plane = numpy.tile(y_row, (barcode_height, 1))
+  u_plane = numpy.empty((barcode_height/2, barcode_width/2), dtype=numpy.uint8)
+  u_plane.fill(_BARCODE_CHROMA)
+  return y_plane, u_plane, u_plane.copy()
+
+
+def generate_upca_barcode_frames(number_of_barcodes, barcode_width,
+                                 barcode_height):
+  """Generates UPC-A barcode frames in-process.
+
+  The barcodes are rendered one at a time, when the next frame is requested.
+  Requires NumPy.
 
   Args:
-    output_directory(string): The output directory for the YUV file.
-    file_name(string): The PNG file name.
-    pattern(string): The file pattern of the PNG/YUV file. The PNG/YUV files are
-      named patternxx..x.png/yuv, where xx..x are digits starting from 00..0.
+    number_of_barcodes(int): The number of barcodes to generate.
+    barcode_width(int): Width of barcode in pixels.
+    barcode_height(int): Height of barcode in pixels.
   Return:
-    (bool): True upon successful conversion, false otherwise.
+    (generator of strings): The barcodes as raw I420 frames, starting from 0.
   """
-  # Pattern should be in file name
-  if not pattern in file_name:
-    return False
-  pattern_position = file_name.rfind(pattern)
-
-  # Strip the path to the PNG file and replace the png extension with yuv
-  yuv_file_name = file_name[pattern_position:-3] + 'yuv'
-  yuv_file_name = os.path.join(output_directory, yuv_file_name)
-
-  command = ['ffmpeg', '-i', '%s' % (file_name), '-pix_fmt', 'yuv420p',
-             '%s' % (yuv_file_name)]
-  try:
-    helper_functions.run_shell_command(
-        command, fail_msg=('Error during PNG to YUV conversion of %s' %
-                           file_name))
-    os.remove(file_name)
-  except helper_functions.HelperError as err:
-    print >> sys.stderr, err
-    return False
-  return True
+  for i in range(number_of_barcodes):
+    # Barcodes starting from 0
+    content = helper_functions.zero_pad(i, 11)
+    yield ''.join(plane.tostring() for plane in
+                  render_upca_barcode(content, barcode_width, barcode_height))
 
 
-def combine_yuv_frames_into_one_file(output_file_name, input_directory='.'):
-  """Combines several YUV frames into one YUV video file.
+def write_upca_barcodes_yuv(number_of_barcodes, barcode_width, barcode_height,
+                            output_file_name):
+  """Renders UPC-A barcodes in-process and writes them as a YUV video file.
 
-  The function combines the YUV frames from input_directory into one YUV video
-  file. The frames should be named in the format frame_xxxx.yuv where xxxx
-  stands for the frame number. The numbers have to be consecutive and start from
-  0000. The YUV frames are removed after they have been added to the video.
+  This produces the same file as generate_upca_barcodes and
+  convert_png_to_yuv_file do together, without the intermediate PNG files.
+  Requires NumPy.
 
   Args:
-    output_file_name(string): The name of the file to produce.
-    input_directory(string): The directory from which the YUV frames are read.
-  Return:
-    (bool): True if the frame stitching went OK.
+    number_of_barcodes(int): The number of barcodes to generate.
+    barcode_width(int): Width of barcode in pixels.
+    barcode_height(int): Height of barcode in pixels.
+    output_file_name(string): The name of the YUV file to produce.
   """
-  output_file = open(output_file_name, "wb")
-  success = helper_functions.perform_action_on_all_files(
-      input_directory, 'barcode_', 'yuv', 0, _add_to_file_and_delete,
-      output_file=output_file)
+  output_file = open(output_file_name, 'wb')
+  for frame in generate_upca_barcode_frames(number_of_barcodes, barcode_width,
+                                            barcode_height):
+    output_file.write(frame)
   output_file.close()
-  return success
 
-def _add_to_file_and_delete(output_file, file_name):
-  """Adds the contents of a file to a previously opened file.
 
-  Args:
-    output_file(file): The ouput file, previously opened.
-    file_name(string): The file name of the file to add to the output file.
+def convert_png_to_yuv_file(output_file_name, input_directory='.'):
+  """Converts PNG barcodes to one YUV video file.
 
+  The PNG barcodes from input_directory, named barcode_xxxx.png where xxxx is
+  the barcode number starting from 0000, are converted by a single ffmpeg
+  process reading them as an image sequence. The PNG files are removed after
+  the conversion.
+
+  Args:
+    output_file_name(string): The name of the YUV file to produce.
+    input_directory(string): The directory to read the PNG barcodes from.
   Return:
-    (bool): True if successful, False otherwise.
+    (bool): True if the conversion was without errors.
   """
-  input_file = open(file_name, "rb")
-  input_file_contents = input_file.read()
-  output_file.write(input_file_contents)
-  input_file.close()
+  png_file_names = helper_functions.list_numbered_files(
+      input_directory, 'barcode_', 'png', 0)
+  input_files_pattern = os.path.join(input_directory, 'barcode_%04d.png')
+  command = ['ffmpeg', '-y', '-f', 'image2', '-start_number', '0', '-i',
+             input_files_pattern, '-frames:v', str(len(png_file_names)),
+             '-pix_fmt', 'yuv420p', '-f', 'rawvideo', output_file_name]
   try:
-    os.remove(file_name)
-  except OSError as e:
-    print >> sys.stderr, 'Error deleting file %s.\nError: %s' % (file_name, e)
+    helper_functions.run_shell_command(
+        command, fail_msg='Error during PNG to YUV conversion')
+  except helper_functions.HelperError as err:
+    print >> sys.stderr, err
     return False
+  for file_name in png_file_names:
+    os.remove(file_name)
   return True
 
 
@@ -201,29 +242,65 @@ def _overlay_barcode_and_base_frames(barcodes_file, base_file, output_file,
   return True
 
 
-def overlay_yuv_files(barcode_width, barcode_height, base_width, base_height,
-                      barcodes_file_name, base_file_name, output_file_name):
-  """Overlays two YUV files starting from the upper left corner of both.
+def _overlay_frames_in_memory(barcode_frames, barcode_width, barcode_height,
+                              base_yuv_file, output_file_name,
+                              frames_per_chunk):
+  """Overlays barcode frames over a memory-mapped YUV file.
+
+  The base file is processed a chunk of frames at a time: the chunk is copied
+  into memory once, the barcode planes are assigned over the upper left corner
+  of each plane and the whole chunk is written with a single call. Only one
+  chunk of barcode frames is taken from barcode_frames at a time, so it can be
+  a generator.
 
   Args:
-    barcode_width(int): The width of the barcode (to be overlaid).
-    barcode_height(int): The height of the barcode (to be overlaid).
-    base_width(int): The width of a frame of the base file.
-    base_height(int): The height of a frame of the base file.
-    barcodes_file_name(string): The name of the YUV file containing the YUV
-      barcodes.
-    base_file_name(string): The name of the base YUV file.
-    output_file_name(string): The name of the output file where the overlaid
-      video will be written.
+    barcode_frames(iterable): The barcode frames as raw I420 data (strings or
+      NumPy arrays).
+    barcode_width(int): The width of the barcode frames.
+    barcode_height(int): The height of the barcode frames.
+    base_yuv_file(helper_functions.YuvFile): The base YUV file.
+    output_file_name(string): The name of the output file.
+    frames_per_chunk(int): The number of frames written at a time.
   """
-  # Component sizes = [Y_sizes, U_sizes, V_sizes]
-  barcodes_component_sizes = [(barcode_width, barcode_height),
-                              (barcode_width/2, barcode_height/2),
-                              (barcode_width/2, barcode_height/2)]
-  base_component_sizes = [(base_width, base_height),
-                          (base_width/2, base_height/2),
-                          (base_width/2, base_height/2)]
+  barcode_frames = iter(barcode_frames)
 
+  output_file = open(output_file_name, 'wb')
+  for start in range(0, len(base_yuv_file), frames_per_chunk):
+    end = min(start + frames_per_chunk, len(base_yuv_file))
+    chunk = numpy.array(base_yuv_file[start:end])
+    barcodes = [numpy.frombuffer(frame, dtype=numpy.uint8)
+                for frame in itertools.islice(barcode_frames, end - start)]
+    # Frames after the last barcode are written as they are.
+    if barcodes:
+      barcode_planes = helper_functions.split_frames_into_planes(
+          numpy.array(barcodes), barcode_width, barcode_height)
+      output_planes = helper_functions.split_frames_into_planes(
+          chunk, base_yuv_file.width, base_yuv_file.height)
+      for barcode_plane, output_plane in zip(barcode_planes, output_planes):
+        height = min(barcode_plane.shape[1], output_plane.shape[1])
+        width = min(barcode_plane.shape[2], output_plane.shape[2])
+        output_plane[:len(barcodes), :height, :width] = (
+            barcode_plane[:, :height, :width])
+    chunk.tofile(output_file)
+  output_file.close()
+
+
+def _overlay_yuv_files_by_rows(barcodes_file_name, base_file_name,
+                               output_file_name, barcodes_component_sizes,
+                               base_component_sizes):
+  """Overlays two YUV files reading and writing one plane row at a time.
+
+  This is used when NumPy is not available.
+
+  Args:
+    barcodes_file_name(string): The name of the YUV file with the barcodes.
+    base_file_name(string): The name of the base YUV file.
+    output_file_name(string): The name of the output file.
+    barcodes_component_sizes(list of tuples): The width and height of each Y, U
+      and V plane of the barcodes YUV file.
+    base_component_sizes(list of tuples): The width and height of each Y, U and
+      V plane of the base YUV file.
+  """
   barcodes_file = open(barcodes_file_name, 'rb')
   base_file = open(base_file_name, 'rb')
   output_file = open(output_file_name, 'wb')
@@ -240,6 +317,72 @@ def overlay_yuv_files(barcode_width, barcode_height, base_width, base_height,
   output_file.close()
 
 
+def overlay_yuv_files(barcode_width, barcode_height, base_width, base_height,
+                      barcodes_file_name, base_file_name, output_file_name,
+                      frames_per_chunk=_DEFAULT_OVERLAY_FRAMES_PER_CHUNK):
+  """Overlays two YUV files starting from the upper left corner of both.
+
+  If NumPy is available both files are memory-mapped and the output is written
+  frames_per_chunk frames at a time. Otherwise the files are processed one
+  plane row at a time.
+
+  Args:
+    barcode_width(int): The width of the barcode (to be overlaid).
+    barcode_height(int): The height of the barcode (to be overlaid).
+    base_width(int): The width of a frame of the base file.
+    base_height(int): The height of a frame of the base file.
+    barcodes_file_name(string): The name of the YUV file containing the YUV
+      barcodes.
+    base_file_name(string): The name of the base YUV file.
+    output_file_name(string): The name of the output file where the overlaid
+      video will be written.
+    frames_per_chunk(int): The number of frames overlaid and written at a time
+      when NumPy is available.
+  """
+  if numpy is None:
+    # Component sizes = [Y_sizes, U_sizes, V_sizes]
+    _overlay_yuv_files_by_rows(
+        barcodes_file_name, base_file_name, output_file_name,
+        helper_functions.get_i420_component_sizes(barcode_width,
+                                                  barcode_height),
+        helper_functions.get_i420_component_sizes(base_width, base_height))
+  else:
+    _overlay_frames_in_memory(
+        helper_functions.YuvFile(barcodes_file_name, barcode_width,
+                                 barcode_height),
+        barcode_width, barcode_height,
+        helper_functions.YuvFile(base_file_name, base_width, base_height),
+        output_file_name, frames_per_chunk)
+
+
+def overlay_barcode_frames(barcode_frames, barcode_width, barcode_height,
+                           base_width, base_height, base_file_name,
+                           output_file_name,
+                           frames_per_chunk=_DEFAULT_OVERLAY_FRAMES_PER_CHUNK):
+  """Overlays a stream of barcode frames over a YUV file.
+
+  Like overlay_yuv_files, but the barcodes are taken from an iterable instead
+  of a file, for instance from generate_upca_barcode_frames. At most
+  frames_per_chunk barcode and base frames are held in memory at a time.
+  Requires NumPy.
+
+  Args:
+    barcode_frames(iterable): The barcode frames as raw I420 data.
+    barcode_width(int): The width of the barcode (to be overlaid).
+    barcode_height(int): The height of the barcode (to be overlaid).
+    base_width(int): The width of a frame of the base file.
+    base_height(int): The height of a frame of the base file.
+    base_file_name(string): The name of the base YUV file.
+    output_file_name(string): The name of the output file where the overlaid
+      video will be written.
+    frames_per_chunk(int): The number of frames overlaid and written at a time.
+  """
+  _overlay_frames_in_memory(
+      barcode_frames, barcode_width, barcode_height,
+      helper_functions.YuvFile(base_file_name, base_width, base_height),
+      output_file_name, frames_per_chunk)
+
+
 def calculate_frames_number_from_yuv(yuv_width, yuv_height, file_name):
   """Calculates the number of frames of a YUV video.
 
@@ -251,10 +394,7 @@ def calculate_frames_number_from_yuv(yuv_width, yuv_height, file_name):
     (int): The number of frames in the YUV file.
   """
   file_size = os.path.getsize(file_name)
-
-  y_plane_size = yuv_width * yuv_height
-  u_plane_size = (yuv_width/2) * (yuv_height/2)  # Equals to V plane size too
-  frame_size = y_plane_size + (2 * u_plane_size)
+  frame_size = helper_functions.get_i420_frame_size(yuv_width, yuv_height)
   return int(file_size/frame_size)  # Should be int anyway
 
 
@@ -308,11 +448,19 @@ def _parse_args():
                     help=('Input directory from where the PNG barcodes will be '
                           'read. Default: %default'))
   parser.add_option('--yuv_barcodes_output_dir', type='string', default='.',
-                    help=('Output directory where the YUV barcodes will be '
-                          'generated. Default: %default'))
+                    help=('Deprecated and ignored: the PNG barcodes are '
+                          'converted straight into --barcodes_yuv.'))
   parser.add_option('--yuv_frames_input_dir', type='string', default='.',
-                    help=('Input directory from where the YUV will be '
-                          'read before combination. Default: %default'))
+                    help=('Deprecated and ignored: the PNG barcodes are '
+                          'converted straight into --barcodes_yuv.'))
+  parser.add_option('--overlay_frames_per_chunk', type='int',
+                    default=_DEFAULT_OVERLAY_FRAMES_PER_CHUNK,
+                    help=('Number of frames overlaid and written at a time. '
+                          'Default: %default'))
+  parser.add_option('--use_zxing', action='store_true', default=False,
+                    help=('Generate the barcodes with the Zxing Java encoder '
+                          'instead of rendering them in-process. This is '
+                          'always done if NumPy is not available.'))
   parser.add_option('--zxing_dir', type='string', default='zxing',
                     help=('Path to the Zxing barcodes library. '
                           'Default: %default'))
@@ -345,23 +493,48 @@ def _main():
   number_of_barcodes = calculate_frames_number_from_yuv(
       options.base_frame_width, options.base_frame_height, options.base_yuv)
 
-  script_dir = os.path.dirname(os.path.abspath(sys.argv[0]))
-  zxing_dir = os.path.join(script_dir, 'third_party', 'zxing')
-  # Generate barcodes - will generate them in PNG.
-  generate_upca_barcodes(number_of_barcodes, options.barcode_width,
-                         options.barcode_height,
-                         output_directory=options.png_barcodes_output_dir,
-                         path_to_zxing=zxing_dir)
-  # Convert the PNG barcodes to to YUV format.
-  convert_png_to_yuv_barcodes(options.png_barcodes_input_dir,
-                              options.yuv_barcodes_output_dir)
-  # Combine the YUV barcodes into one YUV file.
-  combine_yuv_frames_into_one_file(options.barcodes_yuv,
-                                   input_directory=options.yuv_frames_input_dir)
+  render_in_process = numpy is not None and not options.use_zxing
+  if render_in_process:
+    # Fail before writing any file if the barcodes don't fit.
+    try:
+      render_upca_barcode(helper_functions.zero_pad(0, 11),
+                          options.barcode_width, options.barcode_height)
+    except helper_functions.HelperError as err:
+      print >> sys.stderr, err
+      return 1
+
+  if render_in_process and not keep_barcodes_yuv_file:
+    # Stream the rendered barcodes straight into the overlay, no intermediate
+    # files are needed.
+    overlay_barcode_frames(
+        generate_upca_barcode_frames(number_of_barcodes, options.barcode_width,
+                                     options.barcode_height),
+        options.barcode_width, options.barcode_height,
+        options.base_frame_width, options.base_frame_height,
+        options.base_yuv, options.output_yuv,
+        frames_per_chunk=options.overlay_frames_per_chunk)
+    return
+
+  if render_in_process:
+    # Render the barcodes straight into the barcodes YUV file.
+    write_upca_barcodes_yuv(number_of_barcodes, options.barcode_width,
+                            options.barcode_height, options.barcodes_yuv)
+  else:
+    script_dir = os.path.dirname(os.path.abspath(sys.argv[0]))
+    zxing_dir = os.path.join(script_dir, 'third_party', 'zxing')
+    # Generate barcodes - will generate them in PNG.
+    generate_upca_barcodes(number_of_barcodes, options.barcode_width,
+                           options.barcode_height,
+                           output_directory=options.png_barcodes_output_dir,
+                           path_to_zxing=zxing_dir)
+    # Convert the PNG barcodes into one YUV file.
+    convert_png_to_yuv_file(options.barcodes_yuv,
+                            input_directory=options.png_barcodes_input_dir)
   # Overlay the barcodes over the base file.
   overlay_yuv_files(options.barcode_width, options.barcode_height,
                     options.base_frame_width, options.base_frame_height,
-                    options.barcodes_yuv, options.base_yuv, options.output_yuv)
+                    options.barcodes_yuv, options.base_yuv, options.output_yuv,
+                    frames_per_chunk=options.overlay_frames_per_chunk)
 
   if not keep_barcodes_yuv_file:
     # Remove the temporary barcodes YUV file
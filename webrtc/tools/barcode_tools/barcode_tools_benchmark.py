@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+# Copyright (c) 2016 The WebRTC project authors. All Rights Reserved.
+#
+# Use of this source code is governed by a BSD-style license
+# that can be found in the LICENSE file in the root of the source
+# tree. An additional intellectual property rights grant can be found
+# in the file PATENTS.  All contributing project authors may
+# be found in the AUTHORS file in the root of the source tree.
+
+"""Measures the throughput of the barcode tools on synthetic YUV files."""
+
+import optparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import barcode_encoder
+import helper_functions
+
+
+def _write_random_yuv_file(file_name, width, height, number_of_frames):
+  """Writes a YUV file with random content.
+
+  Args:
+    file_name(string): The name of the file to write.
+    width(int): The width of the frames.
+    height(int): The height of the frames.
+    number_of_frames(int): The number of frames to write.
+  """
+  frame_size = helper_functions.get_i420_frame_size(width, height)
+  output_file = open(file_name, 'wb')
+  for _ in range(number_of_frames):
+    output_file.write(os.urandom(frame_size))
+  output_file.close()
+
+
+def _files_are_equal(first_file_name, second_file_name):
+  first_file = open(first_file_name, 'rb')
+  second_file = open(second_file_name, 'rb')
+  equal = first_file.read() == second_file.read()
+  first_file.close()
+  second_file.close()
+  return equal
+
+
+def _time_call(function, *args, **kwargs):
+  """Returns the wall time in seconds it takes to call function."""
+  start_time = time.time()
+  function(*args, **kwargs)
+  return time.time() - start_time
+
+
+def benchmark_overlay(options, working_directory):
+  """Compares the row based overlay with the memory-mapped overlay.
+
+  Return:
+    (bool): True if both implementations produced the same output.
+  """
+  base_file_name = os.path.join(working_directory, 'base.yuv')
+  barcodes_file_name = os.path.join(working_directory, 'barcodes.yuv')
+  rows_output_file_name = os.path.join(working_directory, 'output_rows.yuv')
+  chunks_output_file_name = os.path.join(working_directory,
+                                         'output_chunks.yuv')
+  _write_random_yuv_file(base_file_name, options.width, options.height,
+                         options.frames)
+  _write_random_yuv_file(barcodes_file_name, options.width,
+                         options.barcode_height, options.frames)
+
+  rows_time = _time_call(
+      barcode_encoder._overlay_yuv_files_by_rows, barcodes_file_name,
+      base_file_name, rows_output_file_name,
+      helper_functions.get_i420_component_sizes(options.width,
+                                                options.barcode_height),
+      helper_functions.get_i420_component_sizes(options.width, options.height))
+  chunks_time = _time_call(barcode_encoder.overlay_yuv_files, options.width,
+                           options.barcode_height, options.width,
+                           options.height, barcodes_file_name, base_file_name,
+                           chunks_output_file_name,
+                           frames_per_chunk=options.frames_per_chunk)
+
+  print 'Overlay of %d %dx%d frames:' % (options.frames, options.width,
+                                          options.height)
+  print '  row by row:      %8.1f fps' % (options.frames / rows_time)
+  print '  chunks of %4d:  %8.1f fps' % (options.frames_per_chunk,
+                                          options.frames / chunks_time)
+  return _files_are_equal(rows_output_file_name, chunks_output_file_name)
+
+
+def benchmark_barcode_rendering(options, working_directory):
+  """Measures how many barcodes per second are generated.
+
+  The in-process renderer is always measured. The Zxing Java encoder is only
+  measured if the path to Zxing is given.
+  """
+  rendering_time = _time_call(barcode_encoder.write_upca_barcodes_yuv,
+                              options.barcodes, options.width,
+                              options.barcode_height,
+                              os.path.join(working_directory, 'barcodes.yuv'))
+  print 'Generation of %d %dx%d barcodes:' % (options.barcodes, options.width,
+                                               options.barcode_height)
+  print '  in-process:      %8.1f barcodes/s' % (options.barcodes /
+                                                  rendering_time)
+
+  if options.zxing_dir:
+    zxing_time = _time_call(barcode_encoder.generate_upca_barcodes,
+                            options.zxing_barcodes, options.width,
+                            options.barcode_height,
+                            output_directory=working_directory,
+                            path_to_zxing=options.zxing_dir)
+    print '  Zxing (PNG):     %8.1f barcodes/s' % (options.zxing_barcodes /
+                                                    zxing_time)
+
+
+def _parse_args():
+  """Registers the command-line options."""
+  usage = "usage: %prog [options]"
+  parser = optparse.OptionParser(usage=usage)
+
+  parser.add_option('--width', type='int', default=1920,
+                    help='Width of the YUV frames. Default: %default')
+  parser.add_option('--height', type='int', default=1080,
+                    help='Height of the YUV frames. Default: %default')
+  parser.add_option('--barcode_height', type='int', default=32,
+                    help='Height of the barcodes. Default: %default')
+  parser.add_option('--frames', type='int', default=100,
+                    help='Number of frames to process. Default: %default')
+  parser.add_option('--frames_per_chunk', type='int', default=16,
+                    help=('Number of frames written at a time by the memory-'
+                          'mapped overlay. Default: %default'))
+  parser.add_option('--barcodes', type='int', default=1000,
+                    help=('Number of barcodes to render in-process. '
+                          'Default: %default'))
+  parser.add_option('--zxing_dir', type='string',
+                    help=('Path to the Zxing barcodes library. If given, the '
+                          'Zxing encoder is benchmarked too.'))
+  parser.add_option('--zxing_barcodes', type='int', default=20,
+                    help=('Number of barcodes to generate with Zxing. '
+                          'Default: %default'))
+  options = parser.parse_args()[0]
+  return options
+
+
+def _main():
+  """Runs the benchmarks in a temporary directory.
+
+  A simple invocation is:
+  ./webrtc/tools/barcode_tools/barcode_tools_benchmark.py --width=1280
+  --height=720 --frames=300
+  """
+  options = _parse_args()
+  if barcode_encoder.numpy is None:
+    print 'NumPy is required to run the benchmarks.'
+    return 1
+
+  working_directory = tempfile.mkdtemp()
+  try:
+    if not benchmark_overlay(options, working_directory):
+      print 'The overlay implementations produced different output.'
+      return 1
+    benchmark_barcode_rendering(options, working_directory)
+  finally:
+    shutil.rmtree(working_directory)
+  return 0
+
+
+if __name__ == '__main__':
+  sys.exit(_main())
@@ -7,12 +7,33 @@
 # in the file PATENTS.  All contributing project authors may
 # be found in the AUTHORS file in the root of the source tree.
 
+import functools
+import itertools
 import multiprocessing
+import multiprocessing.pool
 import os
+import string
 import subprocess
 import sys
 
+try:
+  import numpy
+except ImportError:
+  numpy = None
+
 _DEFAULT_PADDING = 4
+_DEFAULT_FILES_PER_COMMAND = 32
+
+# Modules of the UPC-A encoding of every digit, '1' being a bar and '0' a space.
+# These are the codes of the digits on the left half of the barcode; the codes
+# of the right half are their complement.
+UPCA_LEFT_DIGIT_CODES = ['0001101', '0011001', '0010011', '0111101', '0100011',
+                         '0110001', '0101111', '0111011', '0110111', '0001011']
+UPCA_START_END_GUARD = '101'
+UPCA_MIDDLE_GUARD = '01010'
+UPCA_MODULES = 95
+
+_COMPLEMENT_MODULES = string.maketrans('01', '10')
 
 
 class HelperError(Exception):
@@ -35,6 +56,39 @@ def zero_pad(number, padding=_DEFAULT_PADDING):
   return str(number).zfill(padding)
 
 
+def calculate_upca_check_digit(content):
+  """Calculates the check digit of a UPC-A barcode.
+
+  Args:
+    content(string): The 11 content digits of the barcode.
+  Return:
+    (int): The check digit.
+  """
+  odd_sum = sum(int(digit) for digit in content[0:11:2])
+  even_sum = sum(int(digit) for digit in content[1:11:2])
+  return (10 - (3 * odd_sum + even_sum) % 10) % 10
+
+
+def encode_upca_modules(content):
+  """Encodes the content of a UPC-A barcode into its 95 modules.
+
+  Args:
+    content(string): The 11 content digits of the barcode. The check digit is
+      calculated and appended.
+  Return:
+    (string): The modules of the barcode, '1' being a bar and '0' a space.
+  """
+  digits = content + str(calculate_upca_check_digit(content))
+  left_half = ''.join(UPCA_LEFT_DIGIT_CODES[int(digit)]
+                      for digit in digits[:6])
+  left_codes_of_right_half = ''.join(UPCA_LEFT_DIGIT_CODES[int(digit)]
+                                     for digit in digits[6:])
+  # The right half codes are the left half codes with bars and spaces swapped.
+  right_half = left_codes_of_right_half.translate(_COMPLEMENT_MODULES)
+  return (UPCA_START_END_GUARD + left_half + UPCA_MIDDLE_GUARD + right_half +
+          UPCA_START_END_GUARD)
+
+
 def run_shell_command(cmd_list, fail_msg=None):
   """Executes a command.
 
@@ -48,58 +102,250 @@ def run_shell_command(cmd_list, fail_msg=None):
   Raise:
     HelperError: If command fails.
   """
-  process = subprocess.Popen(cmd_list, stdout=subprocess.PIPE,
-                             stderr=subprocess.PIPE)
-  output, error = process.communicate()
-  if process.returncode != 0:
+  returncode, output, error = _run_process(cmd_list)
+  if returncode != 0:
     if fail_msg:
       print >> sys.stderr, fail_msg
     raise HelperError('Failed to run %s: command returned %d and printed '
-                      '%s and %s' % (' '.join(cmd_list), process.returncode,
+                      '%s and %s' % (' '.join(cmd_list), returncode,
                                      output, error))
   return output.strip()
 
 
-def perform_action_on_all_files(directory, file_pattern, file_extension,
-                                start_number, action, **kwargs):
-  """Function that performs a given action on all files matching a pattern.
+def _run_process(cmd_list):
+  """Runs a command and returns its return code, stdout and stderr."""
+  process = subprocess.Popen(cmd_list, stdout=subprocess.PIPE,
+                             stderr=subprocess.PIPE)
+  output, error = process.communicate()
+  return process.returncode, output, error
+
+
+def _run_indexed_process(indexed_cmd_list):
+  index, cmd_list = indexed_cmd_list
+  return (index,) + _run_process(cmd_list)
+
+
+def run_shell_commands(cmd_lists, processes=None):
+  """Executes commands concurrently.
 
-  It is assumed that the files are named file_patternxxxx.file_extension, where
-  xxxx are digits starting from start_number.
+  At most processes commands run at the same time. The commands are started
+  from threads, which only wait for them, so no Python process is forked.
 
   Args:
-    directory(string): The directory where the files live.
-    file_pattern(string): The name pattern of the files.
-    file_extension(string): The files' extension.
-    start_number(int): From where to start to count frames.
-    action(function): The action to be performed over the files. Must return
-        False if the action failed, True otherwise. It should take a file name
-        as the first argument and **kwargs as arguments. The function must be
-        possible to pickle, so it cannot be a bound function (for instance).
+    cmd_lists(iterable): The command lists to execute.
+    processes(int): The maximum number of commands running at the same time.
+      Defaults to the number of CPUs.
+
+  Yield:
+    (tuple): The index of a command in cmd_lists, its return code, standard
+      output and standard error, as soon as the command has finished.
+
+  Raise:
+    OSError: If a command cannot be executed.
+  """
+  thread_pool = multiprocessing.pool.ThreadPool(
+      processes or multiprocessing.cpu_count())
+  try:
+    for result in thread_pool.imap_unordered(_run_indexed_process,
+                                             enumerate(cmd_lists)):
+      yield result
+  finally:
+    # Stops submitting commands if the caller stopped early.
+    thread_pool.terminate()
+
+
+def _split_into_batches(items, batch_size):
+  iterator = iter(items)
+  while True:
+    batch = list(itertools.islice(iterator, batch_size))
+    if not batch:
+      return
+    yield batch
+
+
+def _run_command_on_batch(cmd_list, file_names):
+  """Runs a command on a batch of files and splits its output per file.
+
+  The command is expected to print one line per file, in the order of the
+  files. If it fails, or the number of lines doesn't match, the batch is split
+  in two halves which are run again. Only the failing files end up being run on
+  their own, so a few failures cost a few more processes per batch.
 
   Return:
-    (bool): Whether performing the action over all files was successful or not.
+    (list of tuples): The file names with the output of the command for them,
+      or None if the command failed for a file.
   """
-  file_prefix = os.path.join(directory, file_pattern)
-  file_number = start_number
+  returncode, output, _ = _run_process(cmd_list + file_names)
+  lines = output.strip().splitlines()
+  if returncode == 0 and len(lines) == len(file_names):
+    return zip(file_names, [line.strip() for line in lines])
+  if len(file_names) == 1:
+    return [(file_names[0], None if returncode != 0 else output.strip())]
+  middle = len(file_names) / 2
+  return (_run_command_on_batch(cmd_list, file_names[:middle]) +
+          _run_command_on_batch(cmd_list, file_names[middle:]))
+
+
+def run_command_on_files(cmd_list, file_names,
+                         files_per_command=_DEFAULT_FILES_PER_COMMAND,
+                         processes=None):
+  """Runs a command line tool on many files with few processes.
 
-  process_pool = multiprocessing.Pool(processes=multiprocessing.cpu_count())
-  results = []
+  The file names are appended to cmd_list in batches of files_per_command, so
+  one process handles a whole batch. The batches run concurrently, at most one
+  per CPU. For tools that print one line per file, such as zxing, this saves
+  creating a process for every file.
+
+  Args:
+    cmd_list(list): The command list to execute, without the file names.
+    file_names(list of strings): The files to run the command on.
+    files_per_command(int): The maximum number of files per process.
+    processes(int): The maximum number of processes running at the same time.
+      Defaults to the number of CPUs.
+
+  Yield:
+    (tuple): A file name and the output of the command for it, or None if the
+      command failed on it, as soon as the batch of the file has finished.
+      When a batch fails, only its failing files are run on their own, see
+      _run_command_on_batch.
+
+  Raise:
+    OSError: If the command cannot be executed.
+  """
+  thread_pool = multiprocessing.pool.ThreadPool(
+      processes or multiprocessing.cpu_count())
+  try:
+    for results in thread_pool.imap_unordered(
+        functools.partial(_run_command_on_batch, cmd_list),
+        _split_into_batches(file_names, files_per_command)):
+      for result in results:
+        yield result
+  finally:
+    # Stops submitting batches if the caller stopped early.
+    thread_pool.terminate()
+
+
+def list_numbered_files(directory, file_pattern, file_extension,
+                        start_number):
+  """Lists the files named file_patternxxxx.file_extension in a directory.
+
+  The numbers xxxx start from start_number and must be consecutive.
+
+  Return:
+    (list of strings): The paths to the files, in order.
+  """
+  existing_file_names = set(os.listdir(directory))
+  file_names = []
+  file_number = start_number
   while True:
-    zero_padded_file_number = zero_pad(file_number)
-    file_name = file_prefix + zero_padded_file_number + '.' + file_extension
-    if not os.path.isfile(file_name):
-      break
-    future = process_pool.apply_async(action, args=(file_name,), kwds=kwargs)
-    results.append(future)
+    file_name = (file_pattern + zero_pad(file_number) + '.' + file_extension)
+    if file_name not in existing_file_names:
+      return file_names
+    file_names.append(os.path.join(directory, file_name))
     file_number += 1
 
-  successful = True
-  for result in results:
-    if not result.get():
-      print "At least one action %s failed for files %sxxxx.%s." % (
-          action, file_pattern, file_extension)
-      successful = False
 
-  process_pool.close()
-  return successful
+def get_i420_component_sizes(width, height):
+  """Returns the width and height of each Y, U and V plane of an I420 frame.
+
+  Args:
+    width(int): The width of the frame.
+    height(int): The height of the frame.
+  Return:
+    (list of tuples): The width and height of the Y, U and V planes.
+  """
+  return [(width, height), (width/2, height/2), (width/2, height/2)]
+
+
+def get_i420_frame_size(width, height):
+  """Returns the size in bytes of an I420 frame.
+
+  Args:
+    width(int): The width of the frame.
+    height(int): The height of the frame.
+  Return:
+    (int): The size of the Y, U and V planes together.
+  """
+  return sum(comp_width * comp_height for comp_width, comp_height in
+             get_i420_component_sizes(width, height))
+
+
+def split_frames_into_planes(frames, width, height):
+  """Splits I420 frames into Y, U and V plane views.
+
+  Args:
+    frames(numpy.ndarray): One frame, of shape (frame_size,), or several frames,
+      of shape (frames, frame_size).
+    width(int): The width of the frames.
+    height(int): The height of the frames.
+  Return:
+    (list of numpy.ndarray): One view per plane, of shape (height, width) for
+      one frame or (frames, height, width) for several frames. No data is
+      copied, so writing to the views writes to the frames.
+  """
+  planes = []
+  offset = 0
+  for comp_width, comp_height in get_i420_component_sizes(width, height):
+    plane_size = comp_width * comp_height
+    planes.append(frames[..., offset:offset + plane_size].reshape(
+        frames.shape[:-1] + (comp_height, comp_width)))
+    offset += plane_size
+  return planes
+
+
+class YuvFile(object):
+  """A memory-mapped I420 YUV video file.
+
+  The file is mapped once and its frames are exposed as NumPy views, so any
+  frame or range of frames can be accessed in O(1) without reading the frames
+  before it. Indexing works like for a list: yuv_file[n] is frame n, as an
+  array of shape (frame_size,), and yuv_file[start:end] is an array of shape
+  (frames, frame_size). An incomplete frame at the end of the file is ignored.
+  Requires NumPy.
+  """
+
+  def __init__(self, file_name, width, height, mode='r'):
+    """Maps the file.
+
+    Args:
+      file_name(string): The name of the YUV file.
+      width(int): The width of the frames.
+      height(int): The height of the frames.
+      mode(string): The numpy.memmap mode: 'r' for read-only access or 'r+' to
+        be able to modify the frames.
+    """
+    self.file_name = file_name
+    self.width = width
+    self.height = height
+    self.frame_size = get_i420_frame_size(width, height)
+    number_of_frames = os.path.getsize(file_name) / self.frame_size
+    if number_of_frames == 0:
+      # Empty files cannot be memory-mapped.
+      self.frames = numpy.zeros((0, self.frame_size), dtype=numpy.uint8)
+    else:
+      self.frames = numpy.memmap(file_name, dtype=numpy.uint8, mode=mode,
+                                 shape=(number_of_frames, self.frame_size))
+
+  def __len__(self):
+    return len(self.frames)
+
+  def __getitem__(self, index):
+    return self.frames[index]
+
+  def __iter__(self):
+    return iter(self.frames)
+
+  def get_planes(self, index):
+    """Returns the Y, U and V planes of a frame or a range of frames.
+
+    Args:
+      index(int or slice): The frame number or range of frame numbers.
+    Return:
+      (list of numpy.ndarray): The planes as views, see
+        split_frames_into_planes.
+    """
+    return split_frames_into_planes(self.frames[index], self.width, self.height)
+
+  def close(self):
+    """Unmaps the file. The frames taken from it must not be used anymore."""
+    self.frames = None
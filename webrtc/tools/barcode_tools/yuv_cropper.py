@@ -7,48 +7,88 @@
 # in the file PATENTS.  All contributing project authors may
 # be found in the AUTHORS file in the root of the source tree.
 
+import io
 import optparse
 import os
 import sys
 
+import helper_functions
 
-def _crop_one_frame(yuv_file, output_file, component_sizes):
-  """Crops one frame.
+_DEFAULT_FRAMES_PER_BATCH = 8
 
-  This function crops one frame going through all the YUV planes and cropping
-  respective amount of rows.
+
+def _crop_yuv_file(yuv_file, output_file, crop_height, frames_per_batch):
+  """Crops all frames of a memory-mapped YUV file.
+
+  The rows to keep are plane views of the mapped file, so nothing is copied
+  before a whole batch of frames is written with a single call.
+
+  Args:
+    yuv_file(helper_functions.YuvFile): The YUV file.
+    output_file(file): The opened (for binary writing) file.
+    crop_height(int): The height (the number of pixel rows) to be cropped from
+      the frames.
+    frames_per_batch(int): The number of frames written at a time.
+  """
+  crop_heights = [crop_height, crop_height/2, crop_height/2]
+  for start in range(0, len(yuv_file), frames_per_batch):
+    planes = yuv_file.get_planes(slice(start, start + frames_per_batch))
+    kept_parts = []
+    for frame in range(len(planes[0])):
+      for plane, comp_crop_height in zip(planes, crop_heights):
+        kept_parts.append(plane[frame, comp_crop_height:])
+    output_file.writelines(kept_parts)
+
+
+def _crop_frames_in_batches(yuv_file, output_file, component_sizes,
+                            frames_per_batch):
+  """Crops all frames, reading and writing a batch of frames at a time.
+
+  Every batch of frames is read into one reusable buffer. The rows to keep are
+  referenced through memoryview slices of that buffer, so nothing is copied
+  before the whole batch is written with a single call. An incomplete frame at
+  the end of the file is dropped. This is used when NumPy is not available.
 
   Args:
-    yuv_file(file): The opened (for binary reading) YUV file.
+    yuv_file(file): The opened (for binary reading) YUV file. It must support
+      readinto().
     output_file(file): The opened (for binary writing) file.
     component_sizes(list of 3 3-ples): The list contains the sizes for all the
       planes (Y, U, V) of the YUV file plus the crop_height scaled for every
       plane. The sizes equal width, height and crop_height for the Y plane,
       and are equal to width/2, height/2 and crop_height/2 for the U and V
       planes.
-  Return:
-    (bool): True if there are more frames to crop, False otherwise.
+    frames_per_batch(int): The number of frames read and written at a time.
   """
+  # The part of every plane that is kept, as offsets into the frame.
+  kept_ranges = []
+  frame_size = 0
   for comp_width, comp_height, comp_crop_height in component_sizes:
-    for row in range(comp_height):
-      # Read the plane data for this row.
-      yuv_plane = yuv_file.read(comp_width)
-
-      # If the plane is empty, we have reached the end of the file.
-      if yuv_plane == "":
-        return False
-
-      # Only write the plane data for the rows bigger than crop_height.
-      if row >= comp_crop_height:
-        output_file.write(yuv_plane)
-  return True
-
-
-def crop_frames(yuv_file_name, output_file_name, width, height, crop_height):
+    kept_ranges.append((frame_size + comp_width * comp_crop_height,
+                        frame_size + comp_width * comp_height))
+    frame_size += comp_width * comp_height
+
+  frames_buffer = bytearray(frame_size * frames_per_batch)
+  frames_view = memoryview(frames_buffer)
+  while True:
+    bytes_read = yuv_file.readinto(frames_buffer)
+    kept_parts = []
+    for frame in range(bytes_read / frame_size):
+      frame_offset = frame * frame_size
+      for start, end in kept_ranges:
+        kept_parts.append(frames_view[frame_offset + start:frame_offset + end])
+    output_file.writelines(kept_parts)
+    if bytes_read < len(frames_buffer):
+      break
+
+
+def crop_frames(yuv_file_name, output_file_name, width, height, crop_height,
+                frames_per_batch=_DEFAULT_FRAMES_PER_BATCH):
   """Crops rows of pixels from the top of the YUV frames.
 
   This function goes through all the frames in a video and crops the crop_height
-  top pixel rows of every frame.
+  top pixel rows of every frame. The YUV file is memory-mapped if NumPy is
+  available.
 
   Args:
     yuv_file_name(string): The name of the YUV file to be cropped.
@@ -58,20 +98,24 @@ def crop_frames(yuv_file_name, output_file_name, width, height, crop_height):
     height(int): The height of the original YUV file.
     crop_height(int): The height (the number of pixel rows) to be cropped from
       the frames.
+    frames_per_batch(int): The number of frames read and written at a time.
   """
-  # Component sizes = [Y_sizes, U_sizes, V_sizes].
-  component_sizes = [(width, height, crop_height),
-                     (width/2, height/2, crop_height/2),
-                     (width/2, height/2, crop_height/2)]
-
-  yuv_file = open(yuv_file_name, 'rb')
-  output_file = open(output_file_name, 'wb')
+  output_file = io.open(output_file_name, 'wb')
+
+  if helper_functions.numpy is not None:
+    yuv_file = helper_functions.YuvFile(yuv_file_name, width, height)
+    _crop_yuv_file(yuv_file, output_file, crop_height, frames_per_batch)
+    yuv_file.close()
+  else:
+    # Component sizes = [Y_sizes, U_sizes, V_sizes].
+    component_sizes = [(width, height, crop_height),
+                       (width/2, height/2, crop_height/2),
+                       (width/2, height/2, crop_height/2)]
+    yuv_file = io.open(yuv_file_name, 'rb')
+    _crop_frames_in_batches(yuv_file, output_file, component_sizes,
+                            frames_per_batch)
+    yuv_file.close()
 
-  data_left = True
-  while data_left:
-    data_left = _crop_one_frame(yuv_file, output_file, component_sizes)
-
-  yuv_file.close()
   output_file.close()
 
 
@@ -95,6 +139,10 @@ def _parse_args():
   parser.add_option('--output_file', type='string', default='output.yuv',
                     help=('The output YUV file containing the cropped YUV. '
                           'Default: %default'))
+  parser.add_option('--frames_per_batch', type='int',
+                    default=_DEFAULT_FRAMES_PER_BATCH,
+                    help=('Number of frames read and written at a time. '
+                          'Default: %default'))
   options = parser.parse_args()[0]
   if not options.yuv_file:
     parser.error('yuv_file argument missing. Please specify input YUV file!')
@@ -117,7 +165,8 @@ def _main():
     return -1
 
   crop_frames(options.yuv_file, options.output_file, options.width,
-              options.height, options.crop_height)
+              options.height, options.crop_height,
+              frames_per_batch=options.frames_per_batch)
   return 0
 
 
@@ -7,12 +7,15 @@
 # in the file PATENTS.  All contributing project authors may
 # be found in the AUTHORS file in the root of the source tree.
 
+import multiprocessing
 import optparse
 import os
 import shutil
 import subprocess
 import sys
 import tempfile
+import time
+import traceback
 
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -36,6 +39,10 @@ def _ParseArgs():
                           'video (YUV).'))
   parser.add_option('--frame_analyzer', type='string',
                     help='Path to the frame analyzer executable.')
+  parser.add_option('--python_analyzer', action='store_true', default=False,
+                    help=('Compute PSNR and SSIM with the NumPy analyzer, '
+                          'frame_analyzer/video_quality_analysis.py, instead '
+                          'of the frame analyzer executable.'))
   parser.add_option('--barcode_decoder', type='string',
                     help=('Path to the barcode decoder script. By default, we '
                           'will assume we can find it in barcode_tools/'
@@ -50,13 +57,47 @@ def _ParseArgs():
                           'PATH with the name zxing[.exe].'))
   parser.add_option('--stats_file', type='string', default='stats.txt',
                     help=('Path to the temporary stats file to be created and '
-                          'used. Default: %default'))
+                          'used. Not used with --in_process. '
+                          'Default: %default'))
   parser.add_option('--yuv_frame_width', type='int', default=640,
                     help='Width of the YUV file\'s frames. Default: %default')
   parser.add_option('--yuv_frame_height', type='int', default=480,
                     help='Height of the YUV file\'s frames. Default: %default')
+  parser.add_option('--barcode_height', type='int', default=32,
+                    help=('Height of the barcodes overlaid on the frames of '
+                          'the test video. Default: %default'))
+  parser.add_option('--in_process', action='store_true', default=False,
+                    help=('Decode the barcodes in this process, with the '
+                          'barcode decoder imported as a library, and pipe the '
+                          'stats to the frame analyzer. Requires NumPy; no '
+                          'temporary files are created.'))
+  parser.add_option('--align_frames', action='store_true', default=False,
+                    help=('With the Python analyzer, fill the barcode errors '
+                          'deduced from the neighboring frames and compare '
+                          'every reference frame once, see '
+                          'frame_analyzer/frame_alignment.py.'))
+  parser.add_option('--manifest', type='string',
+                    help=('File listing comparisons to run in a process pool, '
+                          'one per line as: <label> <ref_video> <test_video>. '
+                          'The barcodes are decoded in-process and the Python '
+                          'analyzer is used, so NumPy is required. '
+                          '--ref_video, --test_video and --label are ignored.'))
+  parser.add_option('--processes', type='int',
+                    help=('Number of processes running the comparisons of the '
+                          'manifest. Default: the number of CPUs.'))
+  parser.add_option('--cache_dir', type='string',
+                    help=('Directory to cache the statistics of the reference '
+                          'videos of the manifest in, halving the time of the '
+                          'comparisons sharing a reference. The statistics '
+                          'take about half the size of the reference video. '
+                          'By default, nothing is cached.'))
   options, _ = parser.parse_args()
 
+  if options.manifest:
+    if not os.path.exists(options.manifest):
+      parser.error('Cannot find the manifest at %s' % options.manifest)
+    return options
+
   if not options.ref_video:
     parser.error('You must provide a path to the reference video!')
   if not os.path.exists(options.ref_video):
@@ -67,6 +108,8 @@ def _ParseArgs():
   if not os.path.exists(options.test_video):
     parser.error('Cannot find the test video at %s' % options.test_video)
 
+  if options.python_analyzer:
+    return options
   if not options.frame_analyzer:
     parser.error('You must provide the path to the frame analyzer executable!')
   if not os.path.exists(options.frame_analyzer):
@@ -88,8 +131,16 @@ def main():
   script. The means the following executables have to be available in the PATH:
   * zxing
   * ffmpeg
+  With --python_analyzer, the frame analyzer executable is not needed, but NumPy
+  is.
+
+  To run many comparisons, list them in a manifest file:
+  ./webrtc/tools/compare_videos.py --manifest=<path_and_name_of_manifest>
+  --yuv_frame_width=640 --yuv_frame_height=480
   """
   options = _ParseArgs()
+  if options.manifest:
+    return _RunManifest(options)
 
   if options.barcode_decoder:
     path_to_decoder = options.barcode_decoder
@@ -102,6 +153,88 @@ def main():
   null_filehandle = open(os.devnull, 'r')
 
   # Run barcode decoder on the test video to identify frame numbers.
+  start_time = time.time()
+  stats_lines = None
+  if options.in_process:
+    stats_lines = _DecodeBarcodesInProcess(options, path_to_decoder)
+  if stats_lines is None:
+    if not _RunBarcodeDecoder(options, path_to_decoder, null_filehandle):
+      print 'Failed to run barcode decoder script.'
+      return 1
+  decoding_time = time.time() - start_time
+
+  # Run frame analyzer to compare the videos and print output.
+  start_time = time.time()
+  if options.python_analyzer:
+    _RunPythonAnalyzer(options, stats_lines)
+  elif not _RunFrameAnalyzer(options, stats_lines, null_filehandle):
+    print 'Failed to run frame analyzer.'
+    return 1
+  analysis_time = time.time() - start_time
+
+  print 'Barcode decoding took %.2f s.' % decoding_time
+  print 'Frame analysis took %.2f s.' % analysis_time
+  print 'Total: %.2f s.' % (decoding_time + analysis_time)
+  return 0
+
+
+def _RunFrameAnalyzer(options, stats_lines, null_filehandle):
+  """Runs the frame analyzer executable, which prints the results.
+
+  Args:
+    stats_lines(list of strings): The stats, or None to use the stats file.
+  Return:
+    (bool): True if the frame analyzer succeeded.
+  """
+  cmd = [
+    options.frame_analyzer,
+    '--label=%s' % options.label,
+    '--reference_file=%s' % options.ref_video,
+    '--test_file=%s' % options.test_video,
+    '--width=%d' % options.yuv_frame_width,
+    '--height=%d' % options.yuv_frame_height,
+  ]
+  if stats_lines is None:
+    cmd.append('--stats_file=%s' % options.stats_file)
+    frame_analyzer = subprocess.Popen(cmd, stdin=null_filehandle,
+                                      stdout=sys.stdout, stderr=sys.stderr)
+    frame_analyzer.wait()
+  else:
+    # The frame analyzer reads the stats from its standard input.
+    cmd.append('--stats_file=-')
+    frame_analyzer = subprocess.Popen(cmd, stdin=subprocess.PIPE,
+                                      stdout=sys.stdout, stderr=sys.stderr)
+    frame_analyzer.communicate(''.join(stats_lines))
+  return frame_analyzer.returncode == 0
+
+
+def _RunPythonAnalyzer(options, stats_lines):
+  """Runs the NumPy analyzer in this process, which prints the results.
+
+  Args:
+    stats_lines(list of strings): The stats, or None to use the stats file.
+  """
+  sys.path.insert(0, os.path.join(SCRIPT_DIR, 'frame_analyzer'))
+  import video_quality_analysis  # pylint: disable=import-error
+  if stats_lines is None:
+    stats_file = open(options.stats_file)
+    stats_lines = stats_file.readlines()
+    stats_file.close()
+  results = video_quality_analysis.run_analysis(
+      options.ref_video, options.test_video, stats_lines,
+      options.yuv_frame_width, options.yuv_frame_height,
+      align_frames=options.align_frames)
+  video_quality_analysis.print_analysis_results(options.label, results)
+  video_quality_analysis.print_max_repeated_and_skipped_frames(options.label,
+                                                               stats_lines)
+
+
+def _RunBarcodeDecoder(options, path_to_decoder, null_filehandle):
+  """Runs the barcode decoder script, which writes the stats file.
+
+  Return:
+    (bool): True if the decoder succeeded.
+  """
   png_working_directory = tempfile.mkdtemp()
   cmd = [
     sys.executable,
@@ -111,6 +244,7 @@ def main():
     '--yuv_frame_height=%d' % options.yuv_frame_height,
     '--stats_file=%s' % options.stats_file,
     '--png_working_dir=%s' % png_working_directory,
+    '--barcode_height=%d' % options.barcode_height,
   ]
   if options.zxing_path:
     cmd.append('--zxing_path=%s' % options.zxing_path)
@@ -121,28 +255,143 @@ def main():
   barcode_decoder.wait()
 
   shutil.rmtree(png_working_directory)
-  if barcode_decoder.returncode != 0:
-    print 'Failed to run barcode decoder script.'
-    return 1
+  return barcode_decoder.returncode == 0
 
-  # Run frame analyzer to compare the videos and print output.
-  cmd = [
-    options.frame_analyzer,
-    '--label=%s' % options.label,
-    '--reference_file=%s' % options.ref_video,
-    '--test_file=%s' % options.test_video,
-    '--stats_file=%s' % options.stats_file,
-    '--width=%d' % options.yuv_frame_width,
-    '--height=%d' % options.yuv_frame_height,
-  ]
-  frame_analyzer = subprocess.Popen(cmd, stdin=null_filehandle,
-                                    stdout=sys.stdout, stderr=sys.stderr)
-  frame_analyzer.wait()
-  if frame_analyzer.returncode != 0:
-    print 'Failed to run frame analyzer.'
+
+def _DecodeBarcodesInProcess(options, path_to_decoder):
+  """Decodes the barcodes of the test video with the imported decoder.
+
+  Return:
+    (list of strings): The lines of the stats file, or None if the decoder
+      cannot decode in-process because NumPy is not available.
+  """
+  sys.path.insert(0, os.path.dirname(os.path.abspath(path_to_decoder)))
+  import barcode_decoder  # pylint: disable=import-error
+  if barcode_decoder.numpy is None:
+    print 'NumPy is not available, running the barcode decoder script.'
+    return None
+
+  barcodes = barcode_decoder.decode_barcodes_in_parallel(
+      options.test_video, options.yuv_frame_width, options.yuv_frame_height,
+      options.barcode_height)
+  return barcode_decoder.get_stats_lines(barcodes)
+
+
+def _ReadManifest(manifest_file_name):
+  """Reads the comparisons listed in a manifest file.
+
+  Every line holds a label, a reference video and a test video, separated by
+  whitespace. Empty lines and lines starting with # are ignored.
+
+  Return:
+    (list of tuples): The label, reference video and test video of every
+      comparison.
+  """
+  comparisons = []
+  manifest_file = open(manifest_file_name)
+  for line_number, line in enumerate(manifest_file, 1):
+    line = line.strip()
+    if not line or line.startswith('#'):
+      continue
+    fields = line.split()
+    if len(fields) != 3:
+      raise ValueError('Line %d of %s should be <label> <ref_video> '
+                       '<test_video>: %s' % (line_number, manifest_file_name,
+                                             line))
+    comparisons.append(tuple(fields))
+  manifest_file.close()
+  return comparisons
+
+
+def _CacheReferenceStatistics(task):
+  """Computes the statistics of a reference video in a worker process."""
+  reference_video, width, height, cache_directory = task
+  import video_quality_analysis  # pylint: disable=import-error
+  video_quality_analysis.ReferenceStatistics(reference_video, width, height,
+                                             cache_directory)
+
+
+def _CompareVideos(task):
+  """Runs one comparison of a manifest in a worker process.
+
+  Return:
+    (tuple): The label, the analysis results, the stats lines, the error if
+      the comparison failed or None, and the duration in seconds.
+  """
+  (label, reference_video, test_video, width, height, barcode_height,
+   cache_directory, align_frames) = task
+  import barcode_decoder  # pylint: disable=import-error
+  import video_quality_analysis  # pylint: disable=import-error
+  start_time = time.time()
+  try:
+    barcodes = barcode_decoder.decode_barcodes_in_yuv_file(
+        test_video, width, height, barcode_height)
+    stats_lines = barcode_decoder.get_stats_lines(barcodes)
+    results = video_quality_analysis.run_analysis(
+        reference_video, test_video, stats_lines, width, height, processes=1,
+        cache_directory=cache_directory, align_frames=align_frames)
+  except Exception:  # pylint: disable=broad-except
+    return label, None, None, traceback.format_exc(), time.time() - start_time
+  return label, results, stats_lines, None, time.time() - start_time
+
+
+def _RunManifest(options):
+  """Runs the comparisons of a manifest in a process pool.
+
+  If options.cache_dir is set, the statistics of every reference video are
+  computed once, before the comparisons using them start, and cached in it.
+  The results are printed in the order of the manifest.
+
+  Return:
+    (int): The exit code, 1 if any comparison failed.
+  """
+  comparisons = _ReadManifest(options.manifest)
+  decoder_directory = os.path.join(SCRIPT_DIR, 'barcode_tools')
+  if options.barcode_decoder:
+    decoder_directory = os.path.dirname(
+        os.path.abspath(options.barcode_decoder))
+  sys.path.insert(0, decoder_directory)
+  sys.path.insert(0, os.path.join(SCRIPT_DIR, 'frame_analyzer'))
+  import barcode_decoder  # pylint: disable=import-error
+  if barcode_decoder.numpy is None:
+    print 'NumPy is required to run the comparisons of a manifest.'
     return 1
+  import video_quality_analysis  # pylint: disable=import-error
 
-  return 0
+  width = options.yuv_frame_width
+  height = options.yuv_frame_height
+  process_pool = multiprocessing.Pool(processes=options.processes)
+
+  start_time = time.time()
+  if options.cache_dir:
+    reference_videos = sorted(set(reference_video for _, reference_video, _ in
+                                  comparisons))
+    process_pool.map(_CacheReferenceStatistics,
+                     [(reference_video, width, height, options.cache_dir)
+                      for reference_video in reference_videos])
+    print 'Caching the statistics of %d reference videos took %.2f s.' % (
+        len(reference_videos), time.time() - start_time)
+
+  tasks = [(label, reference_video, test_video, width, height,
+            options.barcode_height, options.cache_dir, options.align_frames)
+           for label, reference_video, test_video in comparisons]
+  failures = 0
+  for label, results, stats_lines, error, seconds in process_pool.imap(
+      _CompareVideos, tasks):
+    if error:
+      print 'Comparison %s failed:\n%s' % (label, error)
+      failures += 1
+      continue
+    video_quality_analysis.print_analysis_results(label, results)
+    video_quality_analysis.print_max_repeated_and_skipped_frames(label,
+                                                                 stats_lines)
+    print 'Comparison %s took %.2f s.' % (label, seconds)
+  process_pool.close()
+  process_pool.join()
+
+  print 'Ran %d comparisons in %.2f s, %d failed.' % (
+      len(comparisons), time.time() - start_time, failures)
+  return 1 if failures else 0
 
 if __name__ == '__main__':
   sys.exit(main())
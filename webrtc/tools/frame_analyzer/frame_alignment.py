@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+# Copyright (c) 2016 The WebRTC project authors. All Rights Reserved.
+#
+# Use of this source code is governed by a BSD-style license
+# that can be found in the LICENSE file in the root of the source
+# tree. An additional intellectual property rights grant can be found
+# in the file PATENTS.  All contributing project authors may
+# be found in the AUTHORS file in the root of the source tree.
+
+"""Aligns the frames of a test video with the frames of the reference video.
+
+The barcode decoder gives the reference frame shown by every test frame, or a
+barcode error. The alignment fills the barcode errors that can be deduced from
+their neighbors and describes the result as a compact table of segments, in
+which the reference frame either advances by one or repeats with every test
+frame:
+
+  <test_frame> <reference_frame> <length> <step>
+
+Test frames left out of the table couldn't be aligned.
+"""
+
+import collections
+import optparse
+import sys
+
+# A run of length test frames from test_frame on, showing the reference frames
+# reference_frame + step * i.
+AlignmentSegment = collections.namedtuple(
+    'AlignmentSegment', ['test_frame', 'reference_frame', 'length', 'step'])
+
+
+def read_decoded_frames(stats_lines):
+  """Reads the reference frame decoded in every test frame from a stats file.
+
+  Args:
+    stats_lines(iterable): The lines of the stats file, in the format
+      frame_xxxx yyyy.
+  Return:
+    (list): The reference frame number of every test frame, or None for a
+      barcode error.
+  """
+  decoded_frames = []
+  for line in stats_lines:
+    if not line.strip():
+      continue
+    frame_name, decoded_frame = line.split(' ', 1)
+    test_frame = int(frame_name[len('frame_'):])
+    if test_frame >= len(decoded_frames):
+      decoded_frames.extend([None] * (test_frame + 1 - len(decoded_frames)))
+    decoded_frame = decoded_frame.strip()
+    if decoded_frame != 'Barcode error':
+      decoded_frames[test_frame] = int(decoded_frame)
+  return decoded_frames
+
+
+def interpolate_missing_frames(decoded_frames):
+  """Fills the barcode errors that the neighboring frames determine.
+
+  A run of missing frames between two decoded frames is filled when the
+  reference frames advance by exactly one per test frame across the run, or
+  don't advance at all. Any other run could hide drops or repeats anywhere, so
+  it is left missing, as are the runs at the start and the end of the video.
+
+  Args:
+    decoded_frames(list): The reference frame number of every test frame, or
+      None if it is missing.
+  Return:
+    (list): The reference frame numbers with the deduced frames filled.
+  """
+  aligned_frames = list(decoded_frames)
+  previous_index = None
+  for index, reference_frame in enumerate(decoded_frames):
+    if reference_frame is None:
+      continue
+    if previous_index is not None and index - previous_index > 1:
+      previous_frame = decoded_frames[previous_index]
+      gap = index - previous_index - 1
+      if reference_frame - previous_frame == gap + 1:
+        aligned_frames[previous_index + 1:index] = range(
+            previous_frame + 1, reference_frame)
+      elif reference_frame == previous_frame:
+        aligned_frames[previous_index + 1:index] = [previous_frame] * gap
+    previous_index = index
+  return aligned_frames
+
+
+def build_alignment_table(aligned_frames):
+  """Compacts the reference frame numbers of the test frames into segments.
+
+  Args:
+    aligned_frames(list): The reference frame number of every test frame, or
+      None if it is unknown.
+  Return:
+    (list of AlignmentSegments): The segments, in test frame order.
+  """
+  table = []
+  segment = None
+  for test_frame, reference_frame in enumerate(aligned_frames):
+    if reference_frame is None:
+      segment = None
+      continue
+    if segment is not None:
+      step = reference_frame - (segment.reference_frame +
+                                segment.step * (segment.length - 1))
+      if segment.length == 1 and step in (0, 1):
+        segment = table[-1] = segment._replace(length=2, step=step)
+        continue
+      if step == segment.step:
+        segment = table[-1] = segment._replace(length=segment.length + 1)
+        continue
+    segment = AlignmentSegment(test_frame, reference_frame, 1, 1)
+    table.append(segment)
+  return table
+
+
+def build_barcode_index(table):
+  """Indexes the test frames showing every reference frame.
+
+  Args:
+    table(list of AlignmentSegments): The alignment table.
+  Return:
+    (dict): The test frames, in order, of every reference frame.
+  """
+  index = {}
+  for segment in table:
+    for i in range(segment.length):
+      index.setdefault(segment.reference_frame + segment.step * i, []).append(
+          segment.test_frame + i)
+  return index
+
+
+def get_frame_pairs(table):
+  """Finds the frames to compare from an alignment table.
+
+  Every reference frame is compared once, with the first test frame showing
+  it, so repeated frames and frames shown again after reordering are skipped.
+
+  Return:
+    (list of tuples): The test frame and the reference frame of every
+      comparison, in test frame order, so the test video is read
+      sequentially. The reference frames go backwards where the frames were
+      reordered.
+  """
+  index = build_barcode_index(table)
+  return sorted((test_frames[0], reference_frame)
+                for reference_frame, test_frames in index.iteritems())
+
+
+def align_frames(stats_lines):
+  """Builds the alignment table of the frames of a stats file."""
+  return build_alignment_table(
+      interpolate_missing_frames(read_decoded_frames(stats_lines)))
+
+
+def write_alignment_table(output_file, table):
+  for segment in table:
+    output_file.write('%d %d %d %d\n' % segment)
+
+
+def _parse_args():
+  """Registers the command-line options."""
+  usage = "usage: %prog [options]"
+  parser = optparse.OptionParser(usage=usage)
+
+  parser.add_option('--stats_file', type='string', default='stats.txt',
+                    help=('The stats file written by the barcode decoder, or - '
+                          'to read the stats from standard input. '
+                          'Default: %default'))
+  parser.add_option('--alignment_file', type='string', default='-',
+                    help=('The alignment table to write, or - to write it to '
+                          'standard output. Default: %default'))
+  options = parser.parse_args()[0]
+  return options
+
+
+def _main():
+  """The main function.
+
+  A simple invocation is:
+  ./webrtc/tools/frame_analyzer/frame_alignment.py --stats_file=stats.txt
+  --alignment_file=alignment.txt
+  """
+  options = _parse_args()
+  if options.stats_file == '-':
+    stats_lines = sys.stdin.readlines()
+  else:
+    stats_file = open(options.stats_file)
+    stats_lines = stats_file.readlines()
+    stats_file.close()
+
+  table = align_frames(stats_lines)
+  if options.alignment_file == '-':
+    write_alignment_table(sys.stdout, table)
+  else:
+    alignment_file = open(options.alignment_file, 'w')
+    write_alignment_table(alignment_file, table)
+    alignment_file.close()
+  return 0
+
+
+if __name__ == '__main__':
+  sys.exit(_main())
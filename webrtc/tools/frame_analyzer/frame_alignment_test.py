@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# Copyright (c) 2016 The WebRTC project authors. All Rights Reserved.
+#
+# Use of this source code is governed by a BSD-style license
+# that can be found in the LICENSE file in the root of the source
+# tree. An additional intellectual property rights grant can be found
+# in the file PATENTS.  All contributing project authors may
+# be found in the AUTHORS file in the root of the source tree.
+
+import unittest
+
+import frame_alignment
+from frame_alignment import AlignmentSegment
+
+
+class Test(unittest.TestCase):
+
+  def testReadDecodedFrames(self):
+    stats_lines = ['frame_0000 00000000000\n',
+                   'frame_0001 Barcode error\n',
+                   'frame_0003 00000000002\n',
+                   '\n']
+    self.assertEqual([0, None, None, 2],
+                     frame_alignment.read_decoded_frames(stats_lines))
+
+  def testInterpolateMissingFrames(self):
+    decoded_frames = [None, 0, None, 2, None, None, 5, None, 5, None, None, 9,
+                      None]
+    self.assertEqual(
+        [None, 0, 1, 2, 3, 4, 5, 5, 5, None, None, 9, None],
+        frame_alignment.interpolate_missing_frames(decoded_frames))
+
+  def testBuildAlignmentTableWithDroppedFrames(self):
+    # Reference frames 3 and 7 were dropped.
+    table = frame_alignment.build_alignment_table([0, 1, 2, 4, 5, 6, 8])
+    self.assertEqual([AlignmentSegment(0, 0, 3, 1),
+                      AlignmentSegment(3, 4, 3, 1),
+                      AlignmentSegment(6, 8, 1, 1)], table)
+    self.assertEqual([(0, 0), (1, 1), (2, 2), (3, 4), (4, 5), (5, 6), (6, 8)],
+                     frame_alignment.get_frame_pairs(table))
+
+  def testBuildAlignmentTableWithDuplicatedFrames(self):
+    # Reference frame 1 was shown three times.
+    table = frame_alignment.build_alignment_table([0, 1, 1, 1, 2, 3])
+    self.assertEqual([AlignmentSegment(0, 0, 2, 1),
+                      AlignmentSegment(2, 1, 2, 0),
+                      AlignmentSegment(4, 2, 2, 1)], table)
+    self.assertEqual([(0, 0), (1, 1), (4, 2), (5, 3)],
+                     frame_alignment.get_frame_pairs(table))
+
+  def testBuildAlignmentTableWithUnknownFrames(self):
+    table = frame_alignment.build_alignment_table([None, 5, 6, None, 8])
+    self.assertEqual([AlignmentSegment(1, 5, 2, 1),
+                      AlignmentSegment(4, 8, 1, 1)], table)
+    self.assertEqual([(1, 5), (2, 6), (4, 8)],
+                     frame_alignment.get_frame_pairs(table))
+
+  def testGetFramePairsComparesEveryReferenceFrameOnce(self):
+    # Reference frame 1 is shown again after frame 2.
+    table = frame_alignment.build_alignment_table([0, 1, 2, 1, 3])
+    self.assertEqual([(0, 0), (1, 1), (2, 2), (4, 3)],
+                     frame_alignment.get_frame_pairs(table))
+
+  def testAlignFrames(self):
+    # Reference frame 4 was repeated and the barcodes of test frames 1 and 5
+    # couldn't be decoded. Test frame 1 shows reference frame 1 or 2, so it
+    # is left unknown, while test frame 5 repeats reference frame 4.
+    stats_lines = ['frame_%04d %s\n' % (test_frame, decoded_frame)
+                   for test_frame, decoded_frame in enumerate(
+                       ['00000000000', 'Barcode error', '00000000003',
+                        '00000000004', '00000000004', 'Barcode error',
+                        '00000000004', '00000000005'])]
+    table = frame_alignment.align_frames(stats_lines)
+    self.assertEqual([AlignmentSegment(0, 0, 1, 1),
+                      AlignmentSegment(2, 3, 2, 1),
+                      AlignmentSegment(4, 4, 3, 0),
+                      AlignmentSegment(7, 5, 1, 1)], table)
+    self.assertEqual([(0, 0), (2, 3), (3, 4), (7, 5)],
+                     frame_alignment.get_frame_pairs(table))
+
+
+if __name__ == '__main__':
+  unittest.main()
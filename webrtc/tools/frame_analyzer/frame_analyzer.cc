@@ -32,6 +32,9 @@
  * The tool prints the result to standard output in the Chromium perf format:
  * RESULT <metric>:<label>= <values>
  *
+ * If the stats file name is -, the stats are read from standard input instead,
+ * so they can be piped from the barcode decoder.
+ *
  * The max value for PSNR is 48.0 (between equal frames), as for SSIM it is 1.0.
  *
  * Usage:
@@ -51,7 +54,8 @@ int main(int argc, char** argv) {
       "  - label(string): The label to use for the perf output."
       " Default: MY_TEST\n"
       "  - stats_file(string): The full name of the file containing the stats"
-      " after decoding of the received YUV video. Default: stats.txt\n"
+      " after decoding of the received YUV video, or - to read the stats from"
+      " standard input. Default: stats.txt\n"
       "  - reference_file(string): The reference YUV file to compare against."
       " Default: ref.yuv\n"
       "  - test_file(string): The test YUV file to run the analysis for."
@@ -87,13 +91,38 @@ int main(int argc, char** argv) {
   }
 
   webrtc::test::ResultsContainer results;
+  std::string label = parser.GetFlag("label");
+
+  if (parser.GetFlag("stats_file") == "-") {
+    // The stats are read twice, so standard input is copied to a temporary
+    // file first.
+    FILE* stats_file = tmpfile();
+    if (stats_file == NULL) {
+      fprintf(stderr, "Error: cannot create a temporary stats file!\n");
+      return -1;
+    }
+    char buffer[4096];
+    size_t bytes_read;
+    while ((bytes_read = fread(buffer, 1, sizeof(buffer), stdin)) > 0) {
+      fwrite(buffer, 1, bytes_read, stats_file);
+    }
+
+    rewind(stats_file);
+    webrtc::test::RunAnalysis(parser.GetFlag("reference_file").c_str(),
+                              parser.GetFlag("test_file").c_str(), stats_file,
+                              width, height, &results);
+    webrtc::test::PrintAnalysisResults(label, &results);
+    rewind(stats_file);
+    webrtc::test::PrintMaxRepeatedAndSkippedFrames(stdout, label, stats_file);
+    fclose(stats_file);
+    return 0;
+  }
 
   webrtc::test::RunAnalysis(parser.GetFlag("reference_file").c_str(),
                             parser.GetFlag("test_file").c_str(),
                             parser.GetFlag("stats_file").c_str(), width, height,
                             &results);
 
-  std::string label = parser.GetFlag("label");
   webrtc::test::PrintAnalysisResults(label, &results);
   webrtc::test::PrintMaxRepeatedAndSkippedFrames(label,
                                                  parser.GetFlag("stats_file"));
@@ -225,6 +225,20 @@ double CalculateMetrics(VideoAnalysisMetricsType video_metrics_type,
 void RunAnalysis(const char* reference_file_name, const char* test_file_name,
                  const char* stats_file_name, int width, int height,
                  ResultsContainer* results) {
+  FILE* stats_file = fopen(stats_file_name, "r");
+  if (stats_file == NULL) {
+    fprintf(stderr, "Couldn't open stats file for reading: %s\n",
+            stats_file_name);
+    return;
+  }
+  RunAnalysis(reference_file_name, test_file_name, stats_file, width, height,
+              results);
+  fclose(stats_file);
+}
+
+void RunAnalysis(const char* reference_file_name, const char* test_file_name,
+                 FILE* stats_file, int width, int height,
+                 ResultsContainer* results) {
   // Check if the reference_file_name ends with "y4m".
   bool y4m_mode = false;
   if (std::string(reference_file_name).find("y4m") != std::string::npos) {
@@ -232,7 +246,6 @@ void RunAnalysis(const char* reference_file_name, const char* test_file_name,
   }
 
   int size = GetI420FrameSize(width, height);
-  FILE* stats_file = fopen(stats_file_name, "r");
 
   // String buffer for the lines in the stats file.
   char line[STATS_LINE_LENGTH];
@@ -285,7 +298,6 @@ void RunAnalysis(const char* reference_file_name, const char* test_file_name,
   }
 
   // Cleanup.
-  fclose(stats_file);
   delete[] test_frame;
   delete[] reference_frame;
 }
@@ -303,6 +315,12 @@ void PrintMaxRepeatedAndSkippedFrames(FILE* output, const std::string& label,
             stats_file_name.c_str());
     return;
   }
+  PrintMaxRepeatedAndSkippedFrames(output, label, stats_file);
+  fclose(stats_file);
+}
+
+void PrintMaxRepeatedAndSkippedFrames(FILE* output, const std::string& label,
+                                      FILE* stats_file) {
   char line[STATS_LINE_LENGTH];
 
   int repeated_frames = 1;
@@ -340,7 +358,6 @@ void PrintMaxRepeatedAndSkippedFrames(FILE* output, const std::string& label,
           max_repeated_frames);
   fprintf(output, "RESULT Max_skipped: %s= %d\n", label.c_str(),
           max_skipped_frames);
-  fclose(stats_file);
 }
 
 void PrintAnalysisResults(const std::string& label, ResultsContainer* results) {
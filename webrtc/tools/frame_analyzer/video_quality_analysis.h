@@ -57,6 +57,12 @@ void RunAnalysis(const char* reference_file_name, const char* test_file_name,
                  const char* stats_file_name, int width, int height,
                  ResultsContainer* results);
 
+// Similar to the above, but reads the stats from an open file handle, starting
+// at its current position.
+void RunAnalysis(const char* reference_file_name, const char* test_file_name,
+                 FILE* stats_file, int width, int height,
+                 ResultsContainer* results);
+
 // Compute PSNR or SSIM for an I420 frame (all planes). When we are calculating
 // PSNR values, the max return value (in the case where the test and reference
 // frames are exactly the same) will be 48. In the case of SSIM the max return
@@ -85,6 +91,11 @@ void PrintMaxRepeatedAndSkippedFrames(const std::string& label,
 void PrintMaxRepeatedAndSkippedFrames(FILE* output, const std::string& label,
                                       const std::string& stats_file_name);
 
+// Similar to the above, but reads the stats from an open file handle, starting
+// at its current position.
+void PrintMaxRepeatedAndSkippedFrames(FILE* output, const std::string& label,
+                                      FILE* stats_file);
+
 // Gets the next line from an open stats file.
 bool GetNextStatsLine(FILE* stats_file, char* line);
 
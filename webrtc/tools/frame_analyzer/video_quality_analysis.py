@@ -0,0 +1,618 @@
+#!/usr/bin/env python
+# Copyright (c) 2016 The WebRTC project authors. All Rights Reserved.
+#
+# Use of this source code is governed by a BSD-style license
+# that can be found in the LICENSE file in the root of the source
+# tree. An additional intellectual property rights grant can be found
+# in the file PATENTS.  All contributing project authors may
+# be found in the AUTHORS file in the root of the source tree.
+
+"""Runs PSNR and SSIM on a reference video and a test video with NumPy.
+
+This is a Python version of the frame_analyzer tool, see frame_analyzer.cc,
+for machines without a native build. The metrics are computed the same way as
+libyuv's I420Psnr and I420Ssim, on batches of memory-mapped frames, and the
+results are printed in the same format.
+"""
+
+import hashlib
+import json
+import multiprocessing
+import optparse
+import os
+import shutil
+import sys
+import tempfile
+
+import numpy
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(SCRIPT_DIR, os.pardir, 'barcode_tools'))
+sys.path.append(os.path.join(SCRIPT_DIR, os.pardir, os.pardir, os.pardir,
+                             'tools'))
+
+import frame_alignment
+import helper_functions
+import perf.perf_utils
+
+# The max value for PSNR, between equal frames.
+_PERFECT_PSNR = 48.0
+# Same as the max PSNR of libyuv.
+_MAX_PSNR = 128.0
+# Size of the square windows SSIM is computed over, and the step between them.
+_SSIM_WINDOW = 8
+_SSIM_WINDOW_STEP = 4
+# The SSIM constants (0.01 * 255)^2 and (0.03 * 255)^2, scaled by the number of
+# pixels in a window like libyuv does: 64^2 * c >> 12.
+_SSIM_C1 = 26634
+_SSIM_C2 = 239708
+_DEFAULT_FRAMES_PER_BATCH = 4
+_DEFAULT_FRAMES_PER_TASK = 64
+
+
+def parse_stats_line(line):
+  """Parses a line of the stats file, in the format frame_xxxx yyyy.
+
+  Return:
+    (tuple): The frame number in the test video and the decoded frame number
+      in the reference video, which is None in case of a barcode error.
+  """
+  frame_name, decoded_frame = line.split(' ', 1)
+  test_frame_number = int(frame_name[len('frame_'):])
+  decoded_frame = decoded_frame.strip()
+  if decoded_frame == 'Barcode error':
+    return test_frame_number, None
+  return test_frame_number, int(decoded_frame)
+
+
+def get_frame_pairs(stats_lines):
+  """Finds the frames to compare from the lines of a stats file.
+
+  Frames with a barcode error and frames repeating the previous decoded frame
+  are skipped.
+
+  Return:
+    (list of tuples): The frame number in the test video and the corresponding
+      frame number in the reference video.
+  """
+  frame_pairs = []
+  previous_frame_number = None
+  for line in stats_lines:
+    if not line.strip():
+      continue
+    test_frame_number, decoded_frame_number = parse_stats_line(line)
+    if (decoded_frame_number is None or
+        decoded_frame_number == previous_frame_number):
+      continue
+    frame_pairs.append((test_frame_number, decoded_frame_number))
+    previous_frame_number = decoded_frame_number
+  return frame_pairs
+
+
+def get_max_repeated_and_skipped_frames(stats_lines):
+  """Calculates the longest runs of repeated and skipped frames.
+
+  Like frame_analyzer, frames with a barcode error count as decoded frame 0.
+
+  Return:
+    (tuple): The max number of repeated and skipped frames.
+  """
+  repeated_frames = 1
+  max_repeated_frames = 1
+  max_skipped_frames = 1
+  previous_frame_number = -1
+  for line in stats_lines:
+    if not line.strip():
+      continue
+    decoded_frame_number = parse_stats_line(line)[1] or 0
+
+    if decoded_frame_number == previous_frame_number:
+      repeated_frames += 1
+      max_repeated_frames = max(max_repeated_frames, repeated_frames)
+    else:
+      repeated_frames = 1
+
+    if decoded_frame_number != 0 and previous_frame_number != -1:
+      skipped_frames = decoded_frame_number - previous_frame_number - 1
+      max_skipped_frames = max(max_skipped_frames, skipped_frames)
+    previous_frame_number = decoded_frame_number
+  return max_repeated_frames, max_skipped_frames
+
+
+def calculate_psnr(reference_frames, test_frames):
+  """Calculates the PSNR of I420 frames, over all planes.
+
+  Args:
+    reference_frames(numpy.ndarray): The reference frames, one per row.
+    test_frames(numpy.ndarray): The test frames, one per row.
+  Return:
+    (numpy.ndarray): The PSNR of every frame, at most 48.
+  """
+  differences = (reference_frames.astype(numpy.int32) -
+                 test_frames.astype(numpy.int32))
+  sse = numpy.square(differences).sum(axis=1, dtype=numpy.int64).astype(
+      numpy.float64)
+  psnr = numpy.empty(len(sse))
+  psnr.fill(_MAX_PSNR)
+  nonzero = sse > 0
+  psnr[nonzero] = 10.0 * numpy.log10(
+      255.0 * 255.0 * reference_frames.shape[1] / sse[nonzero])
+  return numpy.minimum(psnr, _PERFECT_PSNR)
+
+
+def _sum_ssim_windows(values):
+  """Sums values over the SSIM windows of every plane.
+
+  The windows are 8x8 and start every 4 pixels, so every window is made of 2x2
+  blocks of 4x4 pixels. The blocks are summed once and shared by the windows
+  overlapping them.
+
+  Args:
+    values(numpy.ndarray): The values to sum, of shape (planes, height, width).
+  Return:
+    (numpy.ndarray): The sum of every window, of shape (planes, window rows,
+      window columns).
+  """
+  planes, height, width = values.shape
+  step = _SSIM_WINDOW_STEP
+  block_rows = len(range(0, height - _SSIM_WINDOW, step)) + 1
+  block_columns = len(range(0, width - _SSIM_WINDOW, step)) + 1
+  # Summing the rows of the blocks first keeps the memory accesses sequential.
+  values = values[:, :block_rows * step, :block_columns * step]
+  block_row_sums = values.reshape(planes, block_rows, step,
+                                  block_columns * step).sum(axis=2,
+                                                            dtype=numpy.int64)
+  blocks = block_row_sums.reshape(planes, block_rows, block_columns,
+                                  step).sum(axis=3)
+  return (blocks[:, :-1, :-1] + blocks[:, 1:, :-1] + blocks[:, :-1, 1:] +
+          blocks[:, 1:, 1:])
+
+
+def calculate_window_statistics(planes):
+  """Calculates the statistics SSIM needs from one of the compared planes.
+
+  Args:
+    planes(numpy.ndarray): The planes, of shape (planes, height, width).
+  Return:
+    (tuple): The sums of the pixels and of the squared pixels over every SSIM
+      window, of shape (planes, window rows, window columns).
+  """
+  # The products of two pixels fit in 16 bits.
+  planes = planes.astype(numpy.uint16)
+  return _sum_ssim_windows(planes), _sum_ssim_windows(planes * planes)
+
+
+def calculate_plane_ssim(reference_planes, test_planes,
+                         reference_statistics=None):
+  """Calculates the SSIM of planes, averaged over 8x8 windows.
+
+  The windows start every 4 pixels, like in libyuv's CalcFrameSsim.
+
+  Args:
+    reference_planes(numpy.ndarray): The reference planes, of shape (planes,
+      height, width).
+    test_planes(numpy.ndarray): The test planes, of the same shape.
+    reference_statistics(tuple): The calculate_window_statistics of the
+      reference planes, if already known.
+  Return:
+    (numpy.ndarray): The SSIM of every plane.
+  """
+  if reference_statistics is None:
+    reference_statistics = calculate_window_statistics(reference_planes)
+  sum_a, sum_sq_a = [statistic.astype(numpy.int64)
+                     for statistic in reference_statistics]
+  reference = reference_planes.astype(numpy.uint16)
+  test = test_planes.astype(numpy.uint16)
+  count = _SSIM_WINDOW * _SSIM_WINDOW
+  sum_b, sum_sq_b = calculate_window_statistics(test_planes)
+  sum_axb = _sum_ssim_windows(reference * test)
+
+  sum_a_x_sum_b = sum_a * sum_b
+  sum_a_sq = sum_a * sum_a
+  sum_b_sq = sum_b * sum_b
+  ssim_n = ((2 * sum_a_x_sum_b + _SSIM_C1) *
+            (2 * count * sum_axb - 2 * sum_a_x_sum_b + _SSIM_C2))
+  ssim_d = ((sum_a_sq + sum_b_sq + _SSIM_C1) *
+            (count * sum_sq_a - sum_a_sq + count * sum_sq_b - sum_b_sq +
+             _SSIM_C2))
+  ssim = ssim_n.astype(numpy.float64) / ssim_d
+  return ssim.reshape(len(ssim), -1).mean(axis=1)
+
+
+def calculate_ssim(reference_frames, test_frames, width, height,
+                   reference_statistics=None):
+  """Calculates the SSIM of I420 frames.
+
+  The SSIM of the Y plane weighs 0.8 and the ones of the U and V planes 0.1.
+
+  Args:
+    reference_frames(numpy.ndarray): The reference frames, one per row.
+    test_frames(numpy.ndarray): The test frames, one per row.
+    width(int): The width of the frames.
+    height(int): The height of the frames.
+    reference_statistics(list of tuples): The calculate_window_statistics of
+      the Y, U and V planes of the reference frames, if already known.
+  Return:
+    (numpy.ndarray): The SSIM of every frame, at most 1.
+  """
+  reference_planes = helper_functions.split_frames_into_planes(
+      reference_frames, width, height)
+  test_planes = helper_functions.split_frames_into_planes(test_frames, width,
+                                                          height)
+  if reference_statistics is None:
+    reference_statistics = [None] * len(reference_planes)
+  ssim_y, ssim_u, ssim_v = [
+      calculate_plane_ssim(reference_plane, test_plane, plane_statistics)
+      for reference_plane, test_plane, plane_statistics in
+      zip(reference_planes, test_planes, reference_statistics)]
+  return 0.8 * ssim_y + 0.1 * (ssim_u + ssim_v)
+
+
+class ReferenceStatistics(object):
+  """The SSIM window statistics of every frame of a reference video.
+
+  The statistics of a reference video only depend on the video, so they are
+  computed once and cached on disk, in a directory named after the path,
+  modification time and size of the video and the frame size. Later instances
+  memory-map the cached NumPy arrays. Only the latest statistics of a video
+  are kept: the ones of its earlier versions are removed once computed.
+  """
+
+  _STATISTICS = ('sum', 'sum_sq')
+  _PLANES = ('y', 'u', 'v')
+
+  def __init__(self, reference_file_name, width, height, cache_directory):
+    """Loads the statistics of a reference video, computing them if needed.
+
+    Args:
+      reference_file_name(string): The reference I420 YUV file.
+      width(int): The width of the frames.
+      height(int): The height of the frames.
+      cache_directory(string): The directory the statistics are cached in.
+    """
+    self.reference_file_name = os.path.abspath(reference_file_name)
+    self.width = width
+    self.height = height
+    self.index = {
+        'file_name': self.reference_file_name,
+        'mtime': os.path.getmtime(self.reference_file_name),
+        'size': os.path.getsize(self.reference_file_name),
+        'width': width,
+        'height': height,
+    }
+    key = hashlib.sha1(json.dumps(self.index, sort_keys=True)).hexdigest()
+    self.directory = os.path.join(
+        cache_directory,
+        '%s_%s' % (os.path.basename(self.reference_file_name), key[:16]))
+    if not os.path.isdir(self.directory):
+      self._compute(cache_directory)
+
+    index_file = open(os.path.join(self.directory, 'index.json'))
+    self.index = json.load(index_file)
+    index_file.close()
+    # One (sum, sum_sq) tuple per plane, of shape (frames, window rows,
+    # window columns).
+    self.statistics = [
+        tuple(numpy.load(self._array_file_name(self.directory, plane,
+                                               statistic), mmap_mode='r')
+              for statistic in self._STATISTICS)
+        for plane in self._PLANES]
+
+  def __len__(self):
+    return self.index['frames']
+
+  def get(self, frame_numbers):
+    """Returns the statistics of frames, as calculate_ssim expects them."""
+    return [tuple(statistic[frame_numbers] for statistic in plane_statistics)
+            for plane_statistics in self.statistics]
+
+  @staticmethod
+  def _array_file_name(directory, plane, statistic):
+    return os.path.join(directory, '%s_%s.npy' % (plane, statistic))
+
+  def _compute(self, cache_directory):
+    """Computes the statistics into the cache directory.
+
+    They are written to a temporary directory which is then renamed, so
+    concurrent computations of the same statistics don't see partial files.
+    """
+    if not os.path.isdir(cache_directory):
+      os.makedirs(cache_directory)
+    temporary_directory = tempfile.mkdtemp(dir=cache_directory)
+    try:
+      self._write_statistics(temporary_directory)
+      os.rename(temporary_directory, self.directory)
+    except OSError:
+      if not os.path.isdir(self.directory):
+        shutil.rmtree(temporary_directory)
+        raise
+      # Another process cached the same statistics first.
+      shutil.rmtree(temporary_directory)
+    self._remove_stale_statistics(cache_directory)
+
+  def _remove_stale_statistics(self, cache_directory):
+    """Removes the cached statistics of earlier versions of the video."""
+    prefix = os.path.basename(self.reference_file_name) + '_'
+    for name in os.listdir(cache_directory):
+      directory = os.path.join(cache_directory, name)
+      if not name.startswith(prefix) or directory == self.directory:
+        continue
+      try:
+        index_file = open(os.path.join(directory, 'index.json'))
+        index = json.load(index_file)
+        index_file.close()
+      except (IOError, ValueError):
+        continue  # Not statistics, or still being written.
+      if (index['file_name'], index['width'], index['height']) == (
+          self.index['file_name'], self.width, self.height):
+        shutil.rmtree(directory, ignore_errors=True)
+
+  def _write_statistics(self, directory, frames_per_batch=16):
+    """Writes the statistics arrays and the index to a directory."""
+    reference_file = helper_functions.YuvFile(self.reference_file_name,
+                                              self.width, self.height)
+    number_of_frames = len(reference_file)
+    arrays = None
+    # An empty batch still gives the shapes of the arrays of an empty video.
+    for start in range(0, number_of_frames, frames_per_batch) or [0]:
+      frames = reference_file[start:start + frames_per_batch]
+      planes = helper_functions.split_frames_into_planes(frames, self.width,
+                                                         self.height)
+      batch_statistics = [calculate_window_statistics(plane)
+                          for plane in planes]
+      if arrays is None:
+        arrays = [
+            [numpy.lib.format.open_memmap(
+                self._array_file_name(directory, plane, statistic),
+                mode='w+', dtype=numpy.int32,
+                shape=(number_of_frames,) + batch_statistic.shape[1:])
+             for statistic, batch_statistic in
+             zip(self._STATISTICS, plane_statistics)]
+            for plane, plane_statistics in
+            zip(self._PLANES, batch_statistics)]
+      for plane_arrays, plane_statistics in zip(arrays, batch_statistics):
+        for array, batch_statistic in zip(plane_arrays, plane_statistics):
+          array[start:start + len(frames)] = batch_statistic
+    for plane_arrays in arrays:
+      for array in plane_arrays:
+        array.flush()
+    reference_file.close()
+
+    self.index['frames'] = number_of_frames
+    index_file = open(os.path.join(directory, 'index.json'), 'w')
+    json.dump(self.index, index_file)
+    index_file.close()
+
+
+def _read_frames(yuv_file, frame_numbers):
+  """Reads frames from a YuvFile.
+
+  Consecutive frames are sliced out of the memory map, so they are read
+  sequentially without being copied first.
+  """
+  first_frame = frame_numbers[0]
+  if list(frame_numbers) == range(first_frame,
+                                  first_frame + len(frame_numbers)):
+    return yuv_file[first_frame:first_frame + len(frame_numbers)]
+  return yuv_file[list(frame_numbers)]
+
+
+def _analyze_frame_pairs(task):
+  """Calculates the PSNR and SSIM of pairs of frames in a worker process.
+
+  Args:
+    task(tuple): The reference and test file names, the frame width and height,
+      the frame pairs to compare, the number of frames per batch and the cache
+      directory of the reference statistics or None.
+  Return:
+    (tuple): The PSNR and the SSIM of the frame pairs.
+  """
+  (reference_file_name, test_file_name, width, height, frame_pairs,
+   frames_per_batch, cache_directory) = task
+  reference_statistics = None
+  if cache_directory:
+    reference_statistics = ReferenceStatistics(reference_file_name, width,
+                                               height, cache_directory)
+  reference_file = helper_functions.YuvFile(reference_file_name, width, height)
+  test_file = helper_functions.YuvFile(test_file_name, width, height)
+  psnr = []
+  ssim = []
+  for start in range(0, len(frame_pairs), frames_per_batch):
+    test_frame_numbers, reference_frame_numbers = zip(
+        *frame_pairs[start:start + frames_per_batch])
+    reference_frames = _read_frames(reference_file, reference_frame_numbers)
+    test_frames = _read_frames(test_file, test_frame_numbers)
+    psnr.extend(calculate_psnr(reference_frames, test_frames))
+    batch_statistics = None
+    if reference_statistics is not None:
+      batch_statistics = reference_statistics.get(list(reference_frame_numbers))
+    ssim.extend(calculate_ssim(reference_frames, test_frames, width, height,
+                               batch_statistics))
+  reference_file.close()
+  test_file.close()
+  return psnr, ssim
+
+
+def run_analysis(reference_file_name, test_file_name, stats_lines, width,
+                 height, processes=None,
+                 frames_per_batch=_DEFAULT_FRAMES_PER_BATCH,
+                 frames_per_task=_DEFAULT_FRAMES_PER_TASK,
+                 cache_directory=None, align_frames=False):
+  """Runs the PSNR and SSIM analysis on the test file.
+
+  The frames of the test file are compared to the frames of the reference file
+  given by the stats file, see get_frame_pairs, or by the alignment of the
+  frames if align_frames is set, see frame_alignment.get_frame_pairs. Frames
+  missing from either file are skipped.
+
+  Args:
+    reference_file_name(string): The reference I420 YUV file.
+    test_file_name(string): The test I420 YUV file.
+    stats_lines(iterable): The lines of the stats file.
+    width(int): The width of the frames.
+    height(int): The height of the frames.
+    processes(int): The number of worker processes. If 1, the frames are
+      analyzed in this process. Defaults to the number of CPUs.
+    frames_per_batch(int): The number of frames compared at a time.
+    frames_per_task(int): The number of frames a worker process analyzes per
+      task.
+    cache_directory(string): The directory to cache the statistics of the
+      reference file in, see ReferenceStatistics. If None, nothing is cached.
+    align_frames(bool): Whether to compare the frames given by the alignment of
+      the frames instead of the raw stats.
+  Return:
+    (list of tuples): The reference frame number, PSNR and SSIM of every
+      compared frame.
+  """
+  if align_frames:
+    frame_pairs = frame_alignment.get_frame_pairs(
+        frame_alignment.align_frames(stats_lines))
+  else:
+    frame_pairs = get_frame_pairs(stats_lines)
+  frame_size = helper_functions.get_i420_frame_size(width, height)
+  reference_frames = os.path.getsize(reference_file_name) / frame_size
+  test_frames = os.path.getsize(test_file_name) / frame_size
+  available_frame_pairs = [
+      (test_frame, reference_frame)
+      for test_frame, reference_frame in frame_pairs
+      if test_frame < test_frames and reference_frame < reference_frames]
+  if len(available_frame_pairs) < len(frame_pairs):
+    print >> sys.stderr, ('Skipping %d frames missing from the video files.' %
+                          (len(frame_pairs) - len(available_frame_pairs)))
+    frame_pairs = available_frame_pairs
+
+  if cache_directory:
+    # Fill the cache before the workers load it.
+    ReferenceStatistics(reference_file_name, width, height, cache_directory)
+  tasks = [(reference_file_name, test_file_name, width, height,
+            frame_pairs[start:start + frames_per_task], frames_per_batch,
+            cache_directory)
+           for start in range(0, len(frame_pairs), frames_per_task)]
+  if processes == 1:
+    task_results = map(_analyze_frame_pairs, tasks)
+  else:
+    process_pool = multiprocessing.Pool(processes=processes)
+    task_results = process_pool.map(_analyze_frame_pairs, tasks)
+    process_pool.close()
+    process_pool.join()
+
+  psnr = []
+  ssim = []
+  for task_psnr, task_ssim in task_results:
+    psnr.extend(task_psnr)
+    ssim.extend(task_ssim)
+  return [(reference_frame, frame_psnr, frame_ssim)
+          for (_, reference_frame), frame_psnr, frame_ssim in
+          zip(frame_pairs, psnr, ssim)]
+
+
+def _format_values(values):
+  return '[%s]' % ','.join('%f' % value for value in values)
+
+
+def print_analysis_results(label, results):
+  """Prints the results of run_analysis in the format of frame_analyzer.
+
+  Args:
+    label(string): The label of the test.
+    results(list of tuples): The results of run_analysis.
+  """
+  perf.perf_utils.PrintPerfResult('Unique_frames_count', label, len(results),
+                                  '')
+  if results:
+    perf.perf_utils.PrintPerfResult(
+        'PSNR', label, _format_values(psnr for _, psnr, _ in results), 'dB')
+    perf.perf_utils.PrintPerfResult(
+        'SSIM', label, _format_values(ssim for _, _, ssim in results),
+        'score')
+
+
+def print_max_repeated_and_skipped_frames(label, stats_lines):
+  """Prints the max repeated and skipped frames in the format of
+  frame_analyzer.
+
+  Args:
+    label(string): The label of the test.
+    stats_lines(iterable): The lines of the stats file.
+  """
+  max_repeated_frames, max_skipped_frames = (
+      get_max_repeated_and_skipped_frames(stats_lines))
+  perf.perf_utils.PrintPerfResult('Max_repeated', label, max_repeated_frames,
+                                  '')
+  perf.perf_utils.PrintPerfResult('Max_skipped', label, max_skipped_frames, '')
+
+
+def _parse_args():
+  """Registers the command-line options."""
+  usage = "usage: %prog [options]"
+  parser = optparse.OptionParser(usage=usage)
+
+  parser.add_option('--label', type='string', default='MY_TEST',
+                    help='The label to use for the perf output. '
+                    'Default: %default')
+  parser.add_option('--reference_file', type='string', default='ref.yuv',
+                    help=('The reference YUV file to compare against. '
+                          'Default: %default'))
+  parser.add_option('--test_file', type='string', default='test.yuv',
+                    help=('The test YUV file to run the analysis for. '
+                          'Default: %default'))
+  parser.add_option('--stats_file', type='string', default='stats.txt',
+                    help=('The stats file written by the barcode decoder, or - '
+                          'to read the stats from standard input. '
+                          'Default: %default'))
+  parser.add_option('--width', type='int', default=-1,
+                    help='The width of the YUV files. Default: %default')
+  parser.add_option('--height', type='int', default=-1,
+                    help='The height of the YUV files. Default: %default')
+  parser.add_option('--processes', type='int',
+                    help=('Number of processes analyzing frames. '
+                          'Default: the number of CPUs.'))
+  parser.add_option('--frames_per_batch', type='int',
+                    default=_DEFAULT_FRAMES_PER_BATCH,
+                    help=('Number of frames compared at a time. '
+                          'Default: %default'))
+  parser.add_option('--align_frames', action='store_true', default=False,
+                    help=('Fill the barcode errors deduced from the '
+                          'neighboring frames and compare every reference '
+                          'frame once, see frame_alignment.py.'))
+  parser.add_option('--cache_dir', type='string',
+                    help=('Directory to cache the statistics of the reference '
+                          'file in, to reuse them in later runs.'))
+  options = parser.parse_args()[0]
+
+  if options.width <= 0 or options.height <= 0:
+    parser.error('The width and height must be > 0.')
+  if options.reference_file.endswith('y4m'):
+    parser.error('Only I420 YUV reference files are supported.')
+  return options
+
+
+def _main():
+  """The main function.
+
+  A simple invocation is:
+  ./webrtc/tools/frame_analyzer/video_quality_analysis.py --label=MY_TEST
+  --reference_file=ref.yuv --test_file=test.yuv --stats_file=stats.txt
+  --width=640 --height=480
+  """
+  options = _parse_args()
+  if options.stats_file == '-':
+    stats_lines = sys.stdin.readlines()
+  else:
+    stats_file = open(options.stats_file)
+    stats_lines = stats_file.readlines()
+    stats_file.close()
+
+  results = run_analysis(options.reference_file, options.test_file,
+                         stats_lines, options.width, options.height,
+                         processes=options.processes,
+                         frames_per_batch=options.frames_per_batch,
+                         cache_directory=options.cache_dir,
+                         align_frames=options.align_frames)
+  print_analysis_results(options.label, results)
+  print_max_repeated_and_skipped_frames(options.label, stats_lines)
+  return 0
+
+
+if __name__ == '__main__':
+  sys.exit(_main())
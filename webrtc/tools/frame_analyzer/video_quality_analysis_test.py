@@ -0,0 +1,180 @@
+#!/usr/bin/env python
+# Copyright (c) 2016 The WebRTC project authors. All Rights Reserved.
+#
+# Use of this source code is governed by a BSD-style license
+# that can be found in the LICENSE file in the root of the source
+# tree. An additional intellectual property rights grant can be found
+# in the file PATENTS.  All contributing project authors may
+# be found in the AUTHORS file in the root of the source tree.
+
+import math
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import numpy
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(SCRIPT_DIR, os.pardir, 'barcode_tools'))
+
+import helper_functions
+import video_quality_analysis
+
+_WIDTH = 32
+_HEIGHT = 24
+
+
+def _random_frames(random, number_of_frames):
+  frame_size = helper_functions.get_i420_frame_size(_WIDTH, _HEIGHT)
+  return random.randint(0, 256, size=(number_of_frames, frame_size)).astype(
+      numpy.uint8)
+
+
+def _add_noise(random, frames, amplitude):
+  noise = random.randint(-amplitude, amplitude + 1, size=frames.shape)
+  return numpy.clip(frames.astype(numpy.int32) + noise, 0, 255).astype(
+      numpy.uint8)
+
+
+def _naive_plane_ssim(reference_plane, test_plane):
+  """Calculates the SSIM of a plane one window at a time, like libyuv."""
+  height, width = reference_plane.shape
+  count = 64
+  ssim = []
+  for i in range(0, height - 8, 4):
+    for j in range(0, width - 8, 4):
+      a = [int(value) for value in reference_plane[i:i + 8, j:j + 8].flat]
+      b = [int(value) for value in test_plane[i:i + 8, j:j + 8].flat]
+      sum_a = sum(a)
+      sum_b = sum(b)
+      sum_sq_a = sum(value * value for value in a)
+      sum_sq_b = sum(value * value for value in b)
+      sum_axb = sum(x * y for x, y in zip(a, b))
+      ssim_n = ((2 * sum_a * sum_b + 26634) *
+                (2 * count * sum_axb - 2 * sum_a * sum_b + 239708))
+      ssim_d = ((sum_a * sum_a + sum_b * sum_b + 26634) *
+                (count * sum_sq_a - sum_a * sum_a + count * sum_sq_b -
+                 sum_b * sum_b + 239708))
+      ssim.append(float(ssim_n) / ssim_d)
+  return sum(ssim) / len(ssim)
+
+
+class Test(unittest.TestCase):
+
+  def setUp(self):
+    self.random = numpy.random.RandomState(0)
+    self.temp_directory = tempfile.mkdtemp()
+
+  def tearDown(self):
+    shutil.rmtree(self.temp_directory)
+
+  def _write_frames(self, name, frames):
+    file_name = os.path.join(self.temp_directory, name)
+    frames.tofile(file_name)
+    return file_name
+
+  def testGetFramePairs(self):
+    stats_lines = ['frame_0000 00000000000\n',
+                   'frame_0001 00000000000\n',
+                   'frame_0002 Barcode error\n',
+                   'frame_0003 00000000003\n',
+                   'frame_0004 00000000002\n',
+                   '\n']
+    self.assertEqual([(0, 0), (3, 3), (4, 2)],
+                     video_quality_analysis.get_frame_pairs(stats_lines))
+
+  def testPsnrOfIdenticalFrames(self):
+    frames = _random_frames(self.random, 3)
+    self.assertEqual([48.0] * 3, video_quality_analysis.calculate_psnr(
+        frames, frames.copy()).tolist())
+
+  def testPsnrOfKnownMse(self):
+    reference_frames = numpy.empty(
+        (3, helper_functions.get_i420_frame_size(_WIDTH, _HEIGHT)),
+        dtype=numpy.uint8)
+    reference_frames.fill(100)
+    test_frames = reference_frames.copy()
+    # Constant differences of 10, 20 and 1 give MSEs of 100, 400 and 1. A MSE
+    # of 1 is above the cap of 48 dB.
+    test_frames[0] += 10
+    test_frames[1] -= 20
+    test_frames[2] += 1
+    psnr = video_quality_analysis.calculate_psnr(reference_frames, test_frames)
+    self.assertAlmostEqual(10 * math.log10(255.0 ** 2 / 100), psnr[0])
+    self.assertAlmostEqual(10 * math.log10(255.0 ** 2 / 400), psnr[1])
+    self.assertEqual(48.0, psnr[2])
+
+  def testPlaneSsimMatchesNaiveWindows(self):
+    reference_planes = self.random.randint(
+        0, 256, size=(2, _HEIGHT, _WIDTH)).astype(numpy.uint8)
+    test_planes = _add_noise(self.random, reference_planes, 30)
+    ssim = video_quality_analysis.calculate_plane_ssim(reference_planes,
+                                                       test_planes)
+    for reference_plane, test_plane, plane_ssim in zip(reference_planes,
+                                                       test_planes, ssim):
+      self.assertAlmostEqual(_naive_plane_ssim(reference_plane, test_plane),
+                             plane_ssim)
+
+  def testSsimOfIdenticalFrames(self):
+    frames = _random_frames(self.random, 2)
+    ssim = video_quality_analysis.calculate_ssim(frames, frames.copy(), _WIDTH,
+                                                 _HEIGHT)
+    for frame_ssim in ssim:
+      self.assertAlmostEqual(1.0, frame_ssim)
+
+  def testSsimWeighsThePlanes(self):
+    reference_frames = _random_frames(self.random, 2)
+    test_frames = _add_noise(self.random, reference_frames, 20)
+    ssim = video_quality_analysis.calculate_ssim(reference_frames, test_frames,
+                                                 _WIDTH, _HEIGHT)
+    reference_planes = helper_functions.split_frames_into_planes(
+        reference_frames, _WIDTH, _HEIGHT)
+    test_planes = helper_functions.split_frames_into_planes(
+        test_frames, _WIDTH, _HEIGHT)
+    for frame in range(len(reference_frames)):
+      y, u, v = [_naive_plane_ssim(reference_plane[frame], test_plane[frame])
+                 for reference_plane, test_plane in zip(reference_planes,
+                                                        test_planes)]
+      self.assertAlmostEqual(0.8 * y + 0.1 * (u + v), ssim[frame])
+
+  def testSplitAnalysisMatchesSingleTask(self):
+    reference_frames = _random_frames(self.random, 12)
+    test_frames = _add_noise(self.random, reference_frames[[0, 1, 1, 3, 2, 4,
+                                                            5, 7, 8, 9, 11]],
+                             10)
+    reference_file_name = self._write_frames('reference.yuv', reference_frames)
+    test_file_name = self._write_frames('test.yuv', test_frames)
+    decoded_frames = ['00000000000', '00000000001', '00000000001',
+                      '00000000003', '00000000002', 'Barcode error',
+                      '00000000005', '00000000007', '00000000008',
+                      '00000000009', '00000000011']
+    stats_lines = ['frame_%04d %s\n' % (frame, decoded_frame)
+                   for frame, decoded_frame in enumerate(decoded_frames)]
+
+    expected = video_quality_analysis.run_analysis(
+        reference_file_name, test_file_name, stats_lines, _WIDTH, _HEIGHT,
+        processes=1, frames_per_batch=100, frames_per_task=100)
+    self.assertEqual([0, 1, 3, 2, 5, 7, 8, 9, 11],
+                     [reference_frame for reference_frame, _, _ in expected])
+    test_frame_numbers = [0, 1, 3, 4, 6, 7, 8, 9, 10]
+    reference_frame_numbers = [reference_frame
+                               for reference_frame, _, _ in expected]
+    self.assertEqual(
+        video_quality_analysis.calculate_psnr(
+            reference_frames[reference_frame_numbers],
+            test_frames[test_frame_numbers]).tolist(),
+        [psnr for _, psnr, _ in expected])
+
+    cache_directory = os.path.join(self.temp_directory, 'cache')
+    for processes, cache in ((1, None), (2, None), (1, cache_directory),
+                             (2, cache_directory)):
+      results = video_quality_analysis.run_analysis(
+          reference_file_name, test_file_name, stats_lines, _WIDTH, _HEIGHT,
+          processes=processes, frames_per_batch=2, frames_per_task=3,
+          cache_directory=cache)
+      self.assertEqual(expected, results)
+
+if __name__ == '__main__':
+  unittest.main()
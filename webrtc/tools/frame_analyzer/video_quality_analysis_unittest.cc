@@ -86,6 +86,19 @@ TEST_F(VideoQualityAnalysisTest, PrintMaxRepeatedAndSkippedFramesNormalFile) {
   PrintMaxRepeatedAndSkippedFrames(logfile_, "NormalStatsFile", stats_filename);
 }
 
+TEST_F(VideoQualityAnalysisTest, PrintMaxRepeatedAndSkippedFramesOpenFile) {
+  FILE* stats_file = tmpfile();
+  ASSERT_TRUE(stats_file != NULL);
+  fputs("frame_0001 0100\n", stats_file);
+  fputs("frame_0002 0101\n", stats_file);
+  fputs("frame_0003 Barcode error\n", stats_file);
+  fputs("frame_0004 0106\n", stats_file);
+  rewind(stats_file);
+
+  PrintMaxRepeatedAndSkippedFrames(logfile_, "OpenStatsFile", stats_file);
+  ASSERT_EQ(0, fclose(stats_file));
+}
+
 
 }  // namespace test
 }  // namespace webrtc
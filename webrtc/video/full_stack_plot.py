@@ -23,14 +23,33 @@ Usage examples:
   ./full_stack_plot.py -c 200 -df psnr vp8.txt vp9.txt --next \\
                        -c 200 -df sender_time vp8.txt vp9.txt --next \\
                        -c 200 -df end_to_end vp8.txt vp9.txt
+
+  Follow the end to end time of a running full stack test, refreshing the
+  graph every 2 seconds.
+  ./full_stack_plot.py --follow --refresh_interval 2 -df end_to_end \\
+                       vp9_data.txt
+
+  Save many graphs in parallel, without a display.
+  ./full_stack_plot.py --batch -df psnr vp8.txt -O psnr.png --next \\
+                       -df end_to_end vp8.txt -O end_to_end.png
+
+The parsed samples of every file are cached next to it, in <file>.cache.npy
+and <file>.cache.json, and reused as long as the file keeps its size and
+modification time. Followed files are not cached.
 """
 
 import argparse
 from collections import defaultdict
 import itertools
+import json
+import multiprocessing
+import os
 import sys
-import matplotlib.pyplot as plt
+import tempfile
+import warnings
 import numpy
+# matplotlib.pyplot is imported by the functions drawing the graphs, so that
+# the data can be loaded and summarized without it.
 
 # Fields
 DROPPED = 0
@@ -50,6 +69,8 @@ RECEIVER_TIME = TOTAL_RAW_FIELDS + 1
 END_TO_END = TOTAL_RAW_FIELDS + 2
 RENDERED_DELTA = TOTAL_RAW_FIELDS + 3
 
+DERIVED_FIELDS = [SENDER_TIME, RECEIVER_TIME, END_TO_END, RENDERED_DELTA]
+
 FIELD_MASK = 255
 
 # Options
@@ -75,9 +96,29 @@ _fields = [
     (RENDERED_DELTA, "rendered_delta", "rendered delta"),
 ]
 
+# Bump when the layout of the cached samples changes.
+_CACHE_VERSION = 1
+
 name_to_id = {field[1]: field[0] for field in _fields}
+id_to_name = {field[0]: field[1] for field in _fields}
 id_to_title = {field[0]: field[2] for field in _fields}
 
+# Fields summarized by Data.calculate_statistics() by default.
+STATISTICS_FIELDS = [SENDER_TIME, RECEIVER_TIME, END_TO_END, RENDERED_DELTA,
+                     ENCODE_TIME, ENCODED_FRAME_SIZE, PSNR, SSIM]
+
+# Statistic name, percentile
+PERCENTILES = [
+    ("min", 0),
+    ("p1", 1),
+    ("p5", 5),
+    ("p50", 50),
+    ("p95", 95),
+    ("p99", 99),
+    ("max", 100),
+]
+STATISTICS = [name for name, _ in PERCENTILES] + ["mean"]
+
 def field_arg_to_id(arg):
   if arg == "none":
     return None
@@ -100,67 +141,244 @@ class PlotLine(object):
 class Data(object):
   """Object representing one full stack test."""
 
-  def __init__(self, filename):
+  def __init__(self, filename, use_cache=True, follow=False):
+    """
+    A followed file may still be written. It is parsed up to its last complete
+    row, ignoring the frame count of the header, and update() reads the rows
+    appended since.
+    """
     self.title = ""
     self.length = 0
     self.samples = defaultdict(list)
 
+    self._time_offset = 0.0
+    self._last_render_time = 0.0
+    # Follow mode state.
+    self._filename = filename if follow else None
+    self._position = 0
+    self._field_ids = None
+    self._buffers = {}
+
+    if follow:
+      self.update()
+      return
+    if use_cache and self._load_cache(filename):
+      return
+    # Take the key before parsing, so a file modified meanwhile isn't cached
+    # under its new key.
+    key = _cache_key(filename)
     self._read_samples(filename)
+    if use_cache:
+      self._save_cache(filename, key)
+
+  def _load_cache(self, filename):
+    """Loads the samples from the cache of the given file, if it is valid.
+
+    The samples are memory-mapped read-only.
+    """
+    header_filename, samples_filename = _cache_filenames(filename)
+    try:
+      with open(header_filename) as f:
+        header = json.load(f)
+      if header["key"] != _cache_key(filename):
+        return False
+      samples = numpy.load(samples_filename, mmap_mode="r")
+    except (IOError, OSError, ValueError, KeyError):
+      return False
+    if samples.shape != (len(header["fields"]), header["length"]):
+      return False
+
+    self.title = header["title"]
+    self.length = header["length"]
+    for row, field_id in enumerate(header["fields"]):
+      self.samples[field_id] = samples[row]
+    return True
+
+  def _save_cache(self, filename, key):
+    """Caches the raw and derived samples next to the given file.
+
+    Failing to write the cache, e.g. in a read-only directory, is not an error.
+    """
+    header_filename, samples_filename = _cache_filenames(filename)
+    field_ids = sorted(self.samples)
+    header = {
+        "key": key,
+        "title": self.title,
+        "length": self.length,
+        "fields": field_ids,
+    }
+    try:
+      # The header is written last, as it validates the samples.
+      _write_atomically(samples_filename, lambda f: numpy.save(
+          f, numpy.array([self.samples[field] for field in field_ids])))
+      _write_atomically(header_filename, lambda f: json.dump(header, f))
+    except (IOError, OSError):
+      pass
 
   def _read_samples(self, filename):
-    """Reads graph data from the given file."""
+    """Reads graph data from the given file.
+
+    The body is parsed in one go and every field is stored as a float64 array.
+    """
     f = open(filename)
-    it = iter(f)
 
-    self.title = it.next().strip()
-    self.length = int(it.next())
-    field_names = [name.strip() for name in it.next().split()]
+    self.title = f.readline().strip()
+    self.length = int(f.readline())
+    field_names = [name.strip() for name in f.readline().split()]
     field_ids = [name_to_id[name] for name in field_names]
 
-    for field_id in field_ids:
-      self.samples[field_id] = [0.0] * self.length
-
-    for sample_id in xrange(self.length):
-      for col, value in enumerate(it.next().split()):
-        self.samples[field_ids[col]][sample_id] = float(value)
+    values = numpy.fromstring(f.read(), dtype=numpy.float64, sep=" ")
+    f.close()
+    if len(values) < self.length * len(field_ids):
+      raise Exception("Expected {} samples of {} fields in {}".format(
+          self.length, len(field_ids), filename))
+    # One contiguous row per field.
+    columns = values[:self.length * len(field_ids)].reshape(
+        self.length, len(field_ids)).T.copy()
+    for col, field_id in enumerate(field_ids):
+      self.samples[field_id] = columns[col]
+    for field_id in DERIVED_FIELDS:
+      self.samples[field_id] = numpy.empty(self.length)
 
     self._subtract_first_input_time()
     self._generate_additional_data()
 
-    f.close()
+  def update(self):
+    """Reads the rows appended to a followed file since the last update.
+
+    Only the new rows are parsed and their derived fields calculated.
 
-  def _subtract_first_input_time(self):
-    offset = self.samples[INPUT_TIME][0]
+    Returns the number of new rows.
+    """
+    if self._filename is None:
+      return 0
+    f = open(self._filename)
+    f.seek(self._position)
+    text = f.read()
+    f.close()
+    # Leave an incomplete last row for the next update.
+    text = text[:text.rfind("\n") + 1]
+
+    body = text
+    if self._field_ids is None:
+      lines = text.split("\n", 3)
+      if len(lines) < 4:
+        return 0
+      self.title = lines[0].strip()
+      self._field_ids = [name_to_id[name] for name in lines[2].split()]
+      body = lines[3]
+    self._position += len(text)
+
+    values = numpy.fromstring(body, dtype=numpy.float64, sep=" ")
+    field_count = len(self._field_ids)
+    if len(values) % field_count:
+      raise Exception("Expected rows of {} fields in {}".format(
+          field_count, self._filename))
+    rows = len(values) // field_count
+    if not rows:
+      return 0
+
+    start = self.length
+    self._reserve(start + rows)
+    self.length = start + rows
+    for field_id, buf in self._buffers.iteritems():
+      self.samples[field_id] = buf[:self.length]
+    columns = values.reshape(rows, field_count)
+    for col, field_id in enumerate(self._field_ids):
+      self.samples[field_id][start:] = columns[:, col]
+
+    self._subtract_first_input_time(start)
+    self._generate_additional_data(start)
+    return rows
+
+  def _reserve(self, length):
+    """Grows the buffers of a followed file to hold at least length rows."""
+    capacity = len(self._buffers.get(INPUT_TIME, []))
+    if length <= capacity:
+      return
+    # Doubling keeps the cost of the copies proportional to the new rows.
+    capacity = max(length, 2 * capacity, 1024)
+    for field_id in self._field_ids + DERIVED_FIELDS:
+      buf = numpy.empty(capacity)
+      if field_id in self._buffers:
+        buf[:self.length] = self._buffers[field_id][:self.length]
+      self._buffers[field_id] = buf
+
+  def _subtract_first_input_time(self, start=0):
+    if start == 0:
+      self._time_offset = self.samples[INPUT_TIME][0]
     for field in [INPUT_TIME, SEND_TIME, RECV_TIME, RENDER_TIME]:
       if field in self.samples:
-        self.samples[field] = [x - offset for x in self.samples[field]]
+        self.samples[field][start:] -= self._time_offset
+
+  def _generate_additional_data(self, start=0):
+    """Calculates sender time, receiver time etc. from the raw data.
 
-  def _generate_additional_data(self):
-    """Calculates sender time, receiver time etc. from the raw data."""
+    Only the samples from start on are calculated.
+    """
     s = self.samples
-    last_render_time = 0
-    for field_id in [SENDER_TIME, RECEIVER_TIME, END_TO_END, RENDERED_DELTA]:
-      s[field_id] = [0] * self.length
-
-    for k in range(self.length):
-      s[SENDER_TIME][k] = s[SEND_TIME][k] - s[INPUT_TIME][k]
-
-      decoded_time = s[RENDER_TIME][k]
-      s[RECEIVER_TIME][k] = decoded_time - s[RECV_TIME][k]
-      s[END_TO_END][k] = decoded_time - s[INPUT_TIME][k]
-      if not s[DROPPED][k]:
-        if k > 0:
-          s[RENDERED_DELTA][k] = decoded_time - last_render_time
-        last_render_time = decoded_time
-
-  def _hide(self, values):
+    tail = slice(start, None)
+    s[SENDER_TIME][tail] = s[SEND_TIME][tail] - s[INPUT_TIME][tail]
+    s[RECEIVER_TIME][tail] = s[RENDER_TIME][tail] - s[RECV_TIME][tail]
+    s[END_TO_END][tail] = s[RENDER_TIME][tail] - s[INPUT_TIME][tail]
+
+    # The rendered delta of a rendered frame is the time since the previous
+    # rendered frame, or since 0 for the first one. It is 0 for the very first
+    # frame and for dropped frames.
+    rendered_delta = s[RENDERED_DELTA][tail]
+    rendered_delta[:] = 0
+    rendered = numpy.flatnonzero(s[DROPPED][tail] == 0)
+    render_times = s[RENDER_TIME][tail][rendered]
+    rendered_delta[rendered] = numpy.diff(
+        numpy.concatenate(([self._last_render_time], render_times)))
+    if len(render_times):
+      self._last_render_time = render_times[-1]
+    if start == 0 and self.length and not s[DROPPED][0]:
+      s[RENDERED_DELTA][0] = 0
+
+  def _hide(self, values, config):
     """
-    Replaces values for dropped frames with None.
+    Replaces values for dropped frames with NaN.
     These values are then skipped by the plot() method.
     """
 
-    return [None if self.samples[DROPPED][k] else values[k]
-            for k in range(len(values))]
+    dropped = config.slice_values(self.samples[DROPPED])
+    return numpy.where(dropped != 0, numpy.nan, values)
+
+  def calculate_statistics(self, fields=None, cycle_length=None):
+    """
+    Calculates the percentiles and the mean of the given fields over the
+    rendered frames, for all the fields at once.
+
+    Returns a dict with the frame count, the dropped frame ratio and the
+    statistics of every field, by field name and statistic name. With a cycle
+    length, the dict also has the same for every cycle of frames under
+    "cycles".
+    """
+
+    if fields is None:
+      fields = STATISTICS_FIELDS
+    fields = [field for field in fields if field in self.samples]
+    dropped = numpy.asarray(self.samples[DROPPED]) != 0
+    values = numpy.array([self.samples[field] for field in fields],
+                         dtype=numpy.float64).reshape(len(fields), self.length)
+    values[:, dropped] = numpy.nan
+
+    result = _statistics_to_dict(fields, _calculate_statistics(values),
+                                 self.length, numpy.count_nonzero(dropped))
+    if cycle_length:
+      cycles = max(-(-self.length // cycle_length), 1)
+      padded = numpy.full((len(fields), cycles * cycle_length), numpy.nan)
+      padded[:, :self.length] = values
+      statistics = _calculate_statistics(
+          padded.reshape(len(fields), cycles, cycle_length))
+      result["cycles"] = []
+      for cycle in range(cycles):
+        cycle_frames = slice(cycle * cycle_length, (cycle + 1) * cycle_length)
+        result["cycles"].append(_statistics_to_dict(
+            fields, statistics[:, :, cycle], len(dropped[cycle_frames]),
+            numpy.count_nonzero(dropped[cycle_frames])))
+    return result
 
   def add_samples(self, config, target_lines_list):
     """Creates graph lines from the current data set with given config."""
@@ -171,19 +389,88 @@ class Data(object):
         continue
 
       field_id = field & FIELD_MASK
-      values = self.samples[field_id]
+      values = config.slice_values(self.samples[field_id])
 
       if field & HIDE_DROPPED:
-        values = self._hide(values)
+        values = self._hide(values, config)
 
       target_lines_list.append(PlotLine(
           self.title + " " + id_to_title[field_id],
           values, field & ~FIELD_MASK))
 
 
+def _cache_filenames(filename):
+  return filename + ".cache.json", filename + ".cache.npy"
+
+
+def _cache_key(filename):
+  stat = os.stat(filename)
+  return {
+      "version": _CACHE_VERSION,
+      "size": stat.st_size,
+      "mtime": stat.st_mtime,
+  }
+
+
+def _write_atomically(filename, write):
+  """Calls write with a temporary file, then renames it to filename."""
+  fd, temp_filename = tempfile.mkstemp(dir=os.path.dirname(filename) or ".")
+  try:
+    with os.fdopen(fd, "wb") as f:
+      write(f)
+    os.rename(temp_filename, filename)
+  finally:
+    # Only left if writing or renaming failed.
+    if os.path.exists(temp_filename):
+      os.remove(temp_filename)
+
+
+def _calculate_statistics(values):
+  """
+  Returns the statistics of the values along the last axis, skipping NaN
+  values, as an array indexed by statistic first.
+
+  The percentiles are interpolated linearly, like numpy.nanpercentile, but
+  for all the rows at once.
+  """
+
+  # NaN values are sorted last.
+  values = numpy.sort(values, axis=-1)
+  counts = numpy.count_nonzero(~numpy.isnan(values), axis=-1)
+  statistics = []
+  for _, percentile in PERCENTILES:
+    position = numpy.maximum(counts - 1, 0) * (percentile / 100.0)
+    lower = numpy.floor(position).astype(int)
+    upper = numpy.ceil(position).astype(int)
+    lower_values = numpy.take_along_axis(values, lower[..., None], -1)[..., 0]
+    upper_values = numpy.take_along_axis(values, upper[..., None], -1)[..., 0]
+    statistics.append(
+        lower_values + (upper_values - lower_values) * (position - lower))
+  with numpy.errstate(invalid="ignore", divide="ignore"):
+    statistics.append(numpy.nansum(values, axis=-1) / counts)
+  statistics = numpy.array(statistics)
+  statistics[:, counts == 0] = numpy.nan
+  return statistics
+
+
+def _statistics_to_dict(fields, statistics, frames, dropped_frames):
+  """Arranges statistics indexed by statistic and field, NaN being None."""
+  return {
+      "frames": frames,
+      "dropped_ratio": float(dropped_frames) / frames if frames else None,
+      "fields": {
+          id_to_name[field]: {
+              name: None if numpy.isnan(value) else float(value)
+              for name, value in zip(STATISTICS, statistics[:, index])
+          }
+          for index, field in enumerate(fields)
+      },
+  }
+
+
 def average_over_cycle(values, length):
   """
-  Returns the list:
+  Returns the array:
     [
         avg(values[0], values[length], ...),
         avg(values[1], values[length + 1], ...),
@@ -191,27 +478,96 @@ def average_over_cycle(values, length):
         avg(values[length - 1], values[2 * length - 1], ...),
     ]
 
-  Skips None values when calculating the average value.
+  Skips NaN values when calculating the average value, and returns NaN where
+  there is no value to average.
   """
 
-  total = [0.0] * length
-  count = [0] * length
-  for k in range(len(values)):
-    if values[k] is not None:
-      total[k % length] += values[k]
-      count[k % length] += 1
+  cycles = -(-len(values) // length)
+  padded = numpy.full(max(cycles, 1) * length, numpy.nan)
+  padded[:len(values)] = values
+  with warnings.catch_warnings():
+    # nanmean warns about the all-NaN columns.
+    warnings.simplefilter("ignore", RuntimeWarning)
+    return numpy.nanmean(padded.reshape(-1, length), axis=0)
 
-  result = [0.0] * length
-  for k in range(length):
-    result[k] = total[k] / count[k] if count[k] else None
-  return result
+
+def decimation_indices(values, buckets):
+  """
+  Returns the sorted indices of the minimum and the maximum value of each of
+  the given number of equal buckets of values, plus the first and the last
+  index, so the decimated line keeps its spikes and its extent.
+
+  NaN values are skipped, but a bucket of only NaN values keeps one so the
+  line still shows the gap.
+  """
+
+  length = len(values)
+  if length <= 2 * buckets:
+    return numpy.arange(length)
+  bucket_size = -(-length // buckets)
+  buckets = -(-length // bucket_size)
+  padded = numpy.full(buckets * bucket_size, numpy.nan)
+  padded[:length] = values
+  padded = padded.reshape(buckets, bucket_size)
+  nan = numpy.isnan(padded)
+  # Rows of only NaN values pick their first one.
+  minimum = numpy.where(nan, numpy.inf, padded).argmin(axis=1)
+  maximum = numpy.where(nan, -numpy.inf, padded).argmax(axis=1)
+  first = numpy.arange(buckets) * bucket_size
+  indices = numpy.concatenate(
+      ([0, length - 1], first + minimum, first + maximum))
+  return numpy.unique(indices)
+
+
+class LevelOfDetail(object):
+  """
+  Keeps the lines of a graph decimated to about the pixel width of its axes.
+
+  The visible part of every line is decimated again whenever the graph is
+  zoomed or panned, so zoomed views show the frames at full resolution.
+  Markers are only drawn at full resolution.
+  """
+
+  def __init__(self, axes):
+    self.axes = axes
+    self.lines = []
+    # The callbacks only keep weak references to bound methods.
+    for ax in axes:
+      ax.callbacks.connect("xlim_changed", lambda ax: self.update(ax))
+
+  def add(self, line, x, y):
+    """Manages a line plotted with all of its x and y values."""
+    self.lines.append((line, x, y, line.get_marker()))
+
+  def update(self, ax=None):
+    """
+    Decimates the visible part of the lines. The changed axes, if any, are
+    given, as twin axes get their new limits after the callback.
+    """
+    ax = ax or self.axes[0]
+    x_min, x_max = ax.get_xlim()
+    buckets = max(int(ax.get_window_extent().width), 1)
+    for line, x, y, marker in self.lines:
+      # Keep a frame beyond each edge, so the line reaches the edges.
+      start = max(numpy.searchsorted(x, x_min, "left") - 1, 0)
+      end = numpy.searchsorted(x, x_max, "right") + 1
+      x_visible = x[start:end]
+      y_visible = y[start:end]
+      indices = decimation_indices(y_visible, buckets)
+      if len(indices) < len(y_visible):
+        line.set_data(x_visible[indices], y_visible[indices])
+        line.set_marker("None")
+      else:
+        line.set_data(x_visible, y_visible)
+        line.set_marker(marker)
 
 
 class PlotConfig(object):
   """Object representing a single graph."""
 
   def __init__(self, fields, data_list, cycle_length=None, frames=None,
-               offset=0, output_filename=None, title="Graph"):
+               offset=0, output_filename=None, title="Graph",
+               full_resolution=False):
     self.fields = fields
     self.data_list = data_list
     self.cycle_length = cycle_length
@@ -219,6 +575,15 @@ class PlotConfig(object):
     self.offset = offset
     self.output_filename = output_filename
     self.title = title
+    self.full_resolution = full_resolution
+
+  def slice_values(self, values):
+    """Returns a view of the values of the frames to show."""
+    if self.offset:
+      values = values[self.offset:]
+    if self.frames:
+      values = values[:self.frames]
+    return values
 
   def plot(self, ax1):
     lines = []
@@ -229,19 +594,11 @@ class PlotConfig(object):
       else:
         data.add_samples(self, lines)
 
-    def _slice_values(values):
-      if self.offset:
-        values = values[self.offset:]
-      if self.frames:
-        values = values[:self.frames]
-      return values
-
     length = None
     for line in lines:
       if line is None:
         continue
 
-      line.values = _slice_values(line.values)
       if self.cycle_length:
         line.values = average_over_cycle(line.values, self.cycle_length)
 
@@ -261,19 +618,25 @@ class PlotConfig(object):
     color_cycle = ["b", "r", "g", "c", "m", "y", "k"]
     color_iter = itertools.cycle(color_cycle)
 
+    level_of_detail = LevelOfDetail([ax for ax in [ax1, ax2] if ax])
+
     for line in lines:
       if not line:
         color_iter.next()
         continue
 
       if self.cycle_length:
-        x = numpy.array(range(self.cycle_length))
+        x = numpy.arange(self.cycle_length)
       else:
-        x = numpy.array(range(self.offset, self.offset + len(line.values)))
-      y = numpy.array(line.values)
+        x = numpy.arange(self.offset, self.offset + len(line.values))
+      y = line.values
       ax = ax2 if line.flags & RIGHT_Y_AXIS else ax1
-      ax.plot(x, y, "o-", label=line.label, markersize=3.0, linewidth=1.0,
-              color=color_iter.next())
+      # The axes are scaled to all the values before the lines are decimated.
+      plotted_line, = ax.plot(x, y, "o-", label=line.label, markersize=3.0,
+                              linewidth=1.0, color=color_iter.next())
+      if not self.full_resolution:
+        level_of_detail.add(plotted_line, x, y)
+    level_of_detail.update()
 
     ax1.grid(True)
     if ax2:
@@ -283,19 +646,37 @@ class PlotConfig(object):
       ax1.legend(loc="best", shadow=True, fontsize="large")
 
 
-def load_files(filenames):
+def load_files(filenames, use_cache=True, follow=False):
   result = []
   for filename in filenames:
     if filename in load_files.cache:
       result.append(load_files.cache[filename])
     else:
-      data = Data(filename)
+      data = Data(filename, use_cache=use_cache, follow=follow)
       load_files.cache[filename] = data
       result.append(data)
   return result
 load_files.cache = {}
 
 
+def _add_global_arguments(parser):
+  parser.add_argument(
+      "--batch", action="store_true",
+      help="Save all the graphs in parallel, without a display. Every graph "
+           "needs an output filename.")
+  parser.add_argument(
+      "--processes", type=int, default=None,
+      help="Number of processes saving the graphs in batch mode. "
+           "Default: one per CPU.")
+  parser.add_argument(
+      "--follow", action="store_true",
+      help="Keep reading the files as they grow and refresh the graphs. "
+           "Applies to all graphs.")
+  parser.add_argument(
+      "--refresh_interval", type=float, default=1.0,
+      help="Seconds between the refreshes of followed graphs.")
+
+
 def get_parser():
   class CustomAction(argparse.Action):
     def __call__(self, parser, namespace, values, option_string=None):
@@ -325,6 +706,10 @@ def get_parser():
       help="Frame count to show or take into account while averaging.")
   parser.add_argument("-t", "--title", nargs=1, action=CustomAction,
                       help="Title of the graph.")
+  parser.add_argument(
+      "--full_resolution", nargs=0, action=CustomAction,
+      help="Plot every frame. By default, the lines are decimated to the "
+           "width of the graph, keeping the minimum and maximum values.")
   parser.add_argument(
       "-O", "--output_filename", nargs=1, action=CustomAction,
       help="Use to save the graph into a file. "
@@ -335,13 +720,14 @@ def get_parser():
   return parser
 
 
-def _plot_config_from_args(args, graph_num):
+def _plot_config_from_args(args, graph_num, follow=False):
   # Pylint complains about using kwargs, so have to do it this way.
   cycle_length = None
   frames = None
   offset = 0
   output_filename = None
   title = "Graph"
+  full_resolution = False
 
   fields = []
   files = []
@@ -357,6 +743,8 @@ def _plot_config_from_args(args, graph_num):
       output_filename = values[0]
     elif key == "title":
       title = values[0]
+    elif key == "full_resolution":
+      full_resolution = True
     elif key == "drop":
       mask |= HIDE_DROPPED
     elif key == "right":
@@ -373,12 +761,13 @@ def _plot_config_from_args(args, graph_num):
   if not fields:
     raise Exception("Missing field argument(s) for graph #{}".format(graph_num))
 
-  return PlotConfig(fields, load_files(files), cycle_length=cycle_length,
-      frames=frames, offset=offset, output_filename=output_filename,
-      title=title)
+  return PlotConfig(fields, load_files(files, follow=follow),
+      cycle_length=cycle_length, frames=frames, offset=offset,
+      output_filename=output_filename, title=title,
+      full_resolution=full_resolution)
 
 
-def plot_configs_from_args(args):
+def plot_configs_from_args(args, follow=False):
   """Generates plot configs for given command line arguments."""
   # The way it works:
   #   First we detect separators -n/--next and split arguments into groups, one
@@ -392,23 +781,122 @@ def plot_configs_from_args(args):
   plot_configs = []
   for index, raw_args in enumerate(args):
     graph_args = parser.parse_args(raw_args).ordered_args
-    plot_configs.append(_plot_config_from_args(graph_args, index))
+    plot_configs.append(_plot_config_from_args(graph_args, index, follow))
   return plot_configs
 
 
-def show_or_save_plots(plot_configs):
+def _draw(fig, config):
+  fig.clf()
+  ax = fig.add_subplot(1, 1, 1)
+  ax.set_title(config.title)
+  config.plot(ax)
+
+
+def _follow(figures, refresh_interval):
+  """
+  Redraws the figures whenever their files grow, until all the shown ones are
+  closed. Saved figures are saved again.
+  """
+  import matplotlib.pyplot as plt
+
+  data_list = set(data for _, config in figures
+                  for data in config.data_list if data)
+  while any(plt.fignum_exists(fig.number) for fig, _ in figures):
+    plt.pause(refresh_interval)
+    if not sum(data.update() for data in data_list):
+      continue
+    for fig, config in figures:
+      if not plt.fignum_exists(fig.number):
+        continue
+      _draw(fig, config)
+      if config.output_filename:
+        fig.savefig(config.output_filename)
+      else:
+        fig.canvas.draw_idle()
+
+
+def show_or_save_plots(plot_configs, follow=False, refresh_interval=1.0):
+  import matplotlib.pyplot as plt
+
+  figures = []
   for config in plot_configs:
     fig = plt.figure(figsize=(14.0, 10.0))
-    ax = fig.add_subplot(1, 1, 1)
-
-    plt.title(config.title)
-    config.plot(ax)
+    _draw(fig, config)
     if config.output_filename:
       print "Saving to", config.output_filename
       fig.savefig(config.output_filename)
-      plt.close(fig)
+      if not follow:
+        plt.close(fig)
+        continue
+    figures.append((fig, config))
+
+  if follow:
+    _follow(figures, refresh_interval)
+  else:
+    plt.show()
 
-  plt.show()
+
+def _save_plot(config):
+  """Saves the graph of the given config."""
+  import matplotlib.pyplot as plt
+
+  fig = plt.figure(figsize=(14.0, 10.0))
+  _draw(fig, config)
+  fig.savefig(config.output_filename)
+  plt.close(fig)
+  return config.output_filename
+
+
+def _init_batch_worker(plot_configs):
+  """Keeps the configs of save_plots_in_parallel in a worker process."""
+  _save_batch_plot.plot_configs = plot_configs
+
+
+def _save_batch_plot(index):
+  """Saves the graph of the given batch config, in a worker process."""
+  return _save_plot(_save_batch_plot.plot_configs[index])
+
+
+def save_plots_in_parallel(plot_configs, processes=None):
+  """
+  Saves the graphs on the Agg backend, in a pool of processes. The workers are
+  forked after the data is loaded and get the configs from the pool
+  initializer, so they share the data.
+  """
+  for index, config in enumerate(plot_configs):
+    if not config.output_filename:
+      raise Exception("Missing output filename for graph #{}".format(index))
+
+  import matplotlib.pyplot as plt
+  plt.switch_backend("Agg")
+  if processes == 1:
+    output_filenames = itertools.imap(_save_plot, plot_configs)
+    pool = None
+  else:
+    pool = multiprocessing.Pool(processes, _init_batch_worker, (plot_configs,))
+    output_filenames = pool.imap(_save_batch_plot, range(len(plot_configs)))
+  try:
+    for output_filename in output_filenames:
+      print "Saved", output_filename
+  finally:
+    if pool:
+      pool.terminate()
+
+
+def main():
+  # The global arguments apply to all the graphs, so they are taken out before
+  # the arguments are split by --next.
+  parser = argparse.ArgumentParser(add_help=False)
+  _add_global_arguments(parser)
+  args, graph_args = parser.parse_known_args(sys.argv[1:])
+  if args.batch and args.follow:
+    raise Exception("--batch and --follow can't be combined")
+  plot_configs = plot_configs_from_args(graph_args, follow=args.follow)
+  if args.batch:
+    save_plots_in_parallel(plot_configs, processes=args.processes)
+  else:
+    show_or_save_plots(plot_configs, follow=args.follow,
+                       refresh_interval=args.refresh_interval)
 
 if __name__ == "__main__":
-  show_or_save_plots(plot_configs_from_args(sys.argv[1:]))
+  main()
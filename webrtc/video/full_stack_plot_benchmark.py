@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+# Copyright (c) 2016 The WebRTC project authors. All Rights Reserved.
+#
+# Use of this source code is governed by a BSD-style license
+# that can be found in the LICENSE file in the root of the source
+# tree. An additional intellectual property rights grant can be found
+# in the file PATENTS.  All contributing project authors may
+# be found in the AUTHORS file in the root of the source tree.
+
+"""Measures how long full_stack_plot takes to load and plot loopback output.
+
+Synthetic files of increasing frame counts are generated in a temporary
+directory and loaded with full_stack_plot.Data, by parsing them and from the
+cache of the parsed samples. Their end to end time is then saved as a PNG
+graph, with and without decimating the lines.
+
+Usage example:
+  ./full_stack_plot_benchmark.py --frames 10000 100000 1000000
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy
+
+import full_stack_plot
+
+_FIELD_NAMES = ["dropped", "input_time_ms", "send_time_ms", "recv_time_ms",
+                "render_time_ms", "encoded_frame_size", "psnr", "ssim",
+                "encode_time_ms"]
+
+
+def write_synthetic_data(filename, frames, seed=0):
+  """Writes a loopback test output file with random but plausible values."""
+  random = numpy.random.RandomState(seed)
+  input_time = 1000000.0 + numpy.arange(frames) * 33.3
+  send_time = input_time + random.uniform(5, 30, frames)
+  recv_time = send_time + random.uniform(10, 100, frames)
+  render_time = recv_time + random.uniform(5, 20, frames)
+  columns = [
+      random.uniform(0, 1, frames) < 0.02,
+      input_time,
+      send_time,
+      recv_time,
+      render_time,
+      random.randint(1000, 50000, frames),
+      random.uniform(25, 45, frames),
+      random.uniform(0.8, 1, frames),
+      random.uniform(2, 20, frames),
+  ]
+  f = open(filename, "w")
+  f.write("synthetic\n{}\n{}\n".format(frames, " ".join(_FIELD_NAMES)))
+  numpy.savetxt(f, numpy.column_stack(columns), fmt="%.10g")
+  f.close()
+
+
+def _time_loading(filename, use_cache):
+  start_time = time.time()
+  full_stack_plot.Data(filename, use_cache=use_cache)
+  return time.time() - start_time
+
+
+def benchmark_loading(frame_counts, working_directory):
+  print "{:>10} {:>10} {:>10} {:>14} {:>10}".format(
+      "frames", "MB", "seconds", "frames/s", "cached")
+  for frames in frame_counts:
+    filename = os.path.join(working_directory, "{}.txt".format(frames))
+    write_synthetic_data(filename, frames)
+    size_mb = os.path.getsize(filename) / 1e6
+
+    seconds = _time_loading(filename, use_cache=False)
+    # The first cached load writes the cache, the second one reads it.
+    _time_loading(filename, use_cache=True)
+    cached_seconds = _time_loading(filename, use_cache=True)
+    print "{:>10} {:>10.1f} {:>10.3f} {:>14.0f} {:>10.4f}".format(
+        frames, size_mb, seconds, frames / seconds, cached_seconds)
+
+
+def _time_rendering(data, output_filename, full_resolution):
+  config = full_stack_plot.PlotConfig(
+      [full_stack_plot.END_TO_END | full_stack_plot.HIDE_DROPPED], [data],
+      output_filename=output_filename, full_resolution=full_resolution)
+  start_time = time.time()
+  fig = plt.figure(figsize=(14.0, 10.0))
+  config.plot(fig.add_subplot(1, 1, 1))
+  fig.savefig(output_filename)
+  plt.close(fig)
+  return time.time() - start_time
+
+
+def benchmark_rendering(frame_counts, working_directory):
+  print "{:>10} {:>12} {:>12} {:>12} {:>12}".format(
+      "frames", "full s", "full KB", "decimated s", "decimated KB")
+  for frames in frame_counts:
+    filename = os.path.join(working_directory, "{}.txt".format(frames))
+    write_synthetic_data(filename, frames)
+    data = full_stack_plot.Data(filename, use_cache=False)
+
+    results = []
+    for full_resolution in [True, False]:
+      output_filename = os.path.join(working_directory, "graph.png")
+      seconds = _time_rendering(data, output_filename, full_resolution)
+      results.extend([seconds, os.path.getsize(output_filename) / 1e3])
+    print "{:>10} {:>12.3f} {:>12.0f} {:>12.3f} {:>12.0f}".format(
+        frames, *results)
+
+
+def main():
+  parser = argparse.ArgumentParser(
+      description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--frames", nargs="+", type=int,
+                      default=[10000, 100000, 1000000],
+                      help="Frame counts of the files to load.")
+  args = parser.parse_args()
+
+  working_directory = tempfile.mkdtemp()
+  try:
+    benchmark_loading(args.frames, working_directory)
+    print
+    benchmark_rendering(args.frames, working_directory)
+  finally:
+    shutil.rmtree(working_directory)
+  return 0
+
+if __name__ == "__main__":
+  sys.exit(main())
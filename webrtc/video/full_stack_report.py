@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+# Copyright (c) 2016 The WebRTC project authors. All Rights Reserved.
+#
+# Use of this source code is governed by a BSD-style license
+# that can be found in the LICENSE file in the root of the source
+# tree. An additional intellectual property rights grant can be found
+# in the file PATENTS.  All contributing project authors may
+# be found in the AUTHORS file in the root of the source tree.
+
+"""Summarize the data generated by loopback tests, without drawing graphs.
+
+The percentiles and the mean of the delays, the encode time, the encoded frame
+size, PSNR and SSIM of the rendered frames are printed side by side for all
+the files, followed by the same numbers as perf results. The series of the
+perf results are named after the files.
+
+Usage examples:
+  Compare two runs of a full stack test, also per cycle of 200 frames, and
+  save the statistics as JSON.
+  ./full_stack_report.py -c 200 --json report.json before.txt after.txt
+"""
+
+import argparse
+import json
+import os
+import sys
+
+import full_stack_plot
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(SCRIPT_DIR, os.pardir, os.pardir, "tools"))
+
+import perf.perf_utils
+
+_units = {
+    full_stack_plot.SENDER_TIME: "ms",
+    full_stack_plot.RECEIVER_TIME: "ms",
+    full_stack_plot.END_TO_END: "ms",
+    full_stack_plot.RENDERED_DELTA: "ms",
+    full_stack_plot.ENCODE_TIME: "ms",
+    full_stack_plot.ENCODED_FRAME_SIZE: "bytes",
+    full_stack_plot.PSNR: "dB",
+    full_stack_plot.SSIM: "score",
+}
+
+
+def get_label(filename):
+  return os.path.splitext(os.path.basename(filename))[0]
+
+
+def calculate_report(filenames, cycle_length=None):
+  """Returns the statistics of every file, in the order of the files."""
+  report = []
+  for filename, data in zip(filenames,
+                            full_stack_plot.load_files(filenames)):
+    statistics = data.calculate_statistics(cycle_length=cycle_length)
+    statistics["filename"] = filename
+    statistics["title"] = data.title
+    report.append(statistics)
+  return report
+
+
+def _format_value(value):
+  return "-" if value is None else "{:.3f}".format(value)
+
+
+def print_table(report):
+  """Prints the statistics of the files side by side."""
+  labels = [get_label(statistics["filename"]) for statistics in report]
+  print "{:<24}".format("") + "".join("{:>16}".format(label)
+                                      for label in labels)
+  print "{:<24}".format("frames") + "".join(
+      "{:>16}".format(statistics["frames"]) for statistics in report)
+  print "{:<24}".format("dropped_ratio") + "".join(
+      "{:>16}".format(_format_value(statistics["dropped_ratio"]))
+      for statistics in report)
+  for field in full_stack_plot.STATISTICS_FIELDS:
+    name = full_stack_plot.id_to_name[field]
+    if not any(name in statistics["fields"] for statistics in report):
+      continue
+    for statistic in full_stack_plot.STATISTICS:
+      row = "{:<24}".format(name + " " + statistic)
+      for statistics in report:
+        value = statistics["fields"].get(name, {}).get(statistic)
+        row += "{:>16}".format(_format_value(value))
+      print row
+
+
+def _format_values(values):
+  # Cycles without values keep their place, so the values stay aligned with
+  # their cycle.
+  return "[%s]" % ",".join("nan" if value is None else "%f" % value
+                           for value in values)
+
+
+def print_perf_results(report):
+  """Prints the statistics of the files, and of their cycles, if any."""
+  for statistics in report:
+    label = get_label(statistics["filename"])
+    if statistics["dropped_ratio"] is not None:
+      perf.perf_utils.PrintPerfResult("dropped_ratio", label,
+                                      statistics["dropped_ratio"], "")
+    for field in full_stack_plot.STATISTICS_FIELDS:
+      name = full_stack_plot.id_to_name[field]
+      if name not in statistics["fields"]:
+        continue
+      for statistic in full_stack_plot.STATISTICS:
+        value = statistics["fields"][name][statistic]
+        if value is not None:
+          perf.perf_utils.PrintPerfResult(name + "_" + statistic, label,
+                                          value, _units[field])
+        if "cycles" in statistics:
+          perf.perf_utils.PrintPerfResult(
+              name + "_" + statistic + "_per_cycle", label,
+              _format_values(cycle["fields"][name][statistic]
+                             for cycle in statistics["cycles"]),
+              _units[field])
+
+
+def main():
+  parser = argparse.ArgumentParser(
+      description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("-c", "--cycle_length", type=int,
+                      help="Also summarize every cycle of this many frames.")
+  parser.add_argument("--json",
+                      help="File to save the statistics to, as JSON.")
+  parser.add_argument("files", nargs="+",
+                      help="List of text-based files generated by loopback "
+                           "tests.")
+  args = parser.parse_args()
+
+  report = calculate_report(args.files, cycle_length=args.cycle_length)
+  print_table(report)
+  print
+  print_perf_results(report)
+  if args.json:
+    with open(args.json, "w") as f:
+      json.dump(report, f, indent=2, sort_keys=True)
+  return 0
+
+if __name__ == "__main__":
+  sys.exit(main())